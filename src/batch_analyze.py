@@ -0,0 +1,91 @@
+"""
+GUI を使わずに複数の SGF を一括解析するコマンド。
+
+    python batch_analyze.py games/ "club/**/*.sgf" --games 3
+
+指定した SGF をジョブキューに登録し、未完了の対局を並行して解析する。
+中断（Ctrl+C・異常終了）しても、もう一度実行すれば未解析の対局・手から再開する。
+"""
+import argparse
+import os
+import sys
+
+# Add src directory to sys.path to handle modular imports
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+from config import OUTPUT_BASE_DIR, BULK_FETCH_WORKERS, BATCH_GAME_WORKERS
+from services.api_client import api_client
+from services.batch_analysis import BatchAnalyzer, BatchJobQueue, QUEUE_FILENAME, discover_sgf_files
+from utils.logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch analysis of SGF files")
+    parser.add_argument("paths", nargs="*", help="SGF files, directories (searched recursively) or glob patterns")
+    parser.add_argument("--queue", default=os.path.join(OUTPUT_BASE_DIR, QUEUE_FILENAME), help="Job queue database")
+    parser.add_argument("--out", default=OUTPUT_BASE_DIR, help="Output directory (one sub-directory per game, named <name>-<content hash>)")
+    parser.add_argument("--games", type=int, default=BATCH_GAME_WORKERS, help="Games analyzed concurrently")
+    parser.add_argument("--workers", type=int, default=BULK_FETCH_WORKERS, help="Concurrent move requests per game")
+    parser.add_argument("--visits", type=int, default=150)
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue games that failed in earlier runs")
+    parser.add_argument("--status", action="store_true", help="Show the queue status and exit")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.queue)), exist_ok=True)
+    queue = BatchJobQueue(args.queue)
+    try:
+        files = discover_sgf_files(args.paths)
+        added = sum(queue.enqueue(p) for p in files)
+        if args.retry_failed:
+            added += queue.retry_failed()
+        if args.paths:
+            print(f"Queued {added} new games ({len(files)} SGF files found).")
+        if args.status:
+            _print_status(queue)
+            return 0
+
+        api_proc = None
+        if not api_client.health_check():
+            from services.bootstrap_service import BootstrapService
+            api_proc = BootstrapService.start_api_server(SRC_DIR)
+
+        analyzer = BatchAnalyzer(queue, out_base=args.out, game_workers=args.games, move_workers=args.workers,
+                                 visits=args.visits)
+
+        def on_game_done(job, stats):
+            q = stats["queue"]
+            print(f"[{stats['games_done']} done, {q['pending'] + q['running']} left] {os.path.basename(job.sgf_path)}"
+                  f" | {stats['games_per_hour']:.1f} games/hour", flush=True)
+
+        try:
+            stats = analyzer.run(on_game_done)
+        except KeyboardInterrupt:
+            print("Stopping... (run again to resume)")
+            analyzer.stop()
+            analyzer.join(timeout=10)
+            stats = analyzer.stats()
+        finally:
+            if api_proc is not None:
+                api_proc.terminate()
+
+        logger.info(f"Batch analysis finished: {stats}", layer="BATCH")
+        print(f"Analyzed {stats['games_done']} games ({stats['moves_analyzed']} moves) "
+              f"at {stats['games_per_hour']:.1f} games/hour; "
+              f"{stats['transposition_share']:.1%} of positions shared across games/orientations.")
+        _print_status(queue)
+        return 1 if stats["queue"]["failed"] else 0
+    finally:
+        queue.close()
+
+
+def _print_status(queue: BatchJobQueue):
+    counts = queue.counts()
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+    for path, error in queue.failures():
+        print(f"  FAILED {path}: {error}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
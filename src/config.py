@@ -1,4 +1,8 @@
 import os
+import secrets
+import stat
+import sys
+import tempfile
 
 # Base Directories
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -12,6 +16,76 @@ KATAGO_EXE = os.path.join(KATAGO_BASE_DIR, "katago_opencl", "katago.exe")
 KATAGO_CONFIG = os.path.join(KATAGO_BASE_DIR, "katago_configs", "analysis.cfg")
 KATAGO_MODEL = os.path.join(KATAGO_BASE_DIR, "weights", "kata20bs530.bin.gz")
 
+# Fake Engine (オフライン検証・ベンチマーク用)
+# GOAI_FAKE_ENGINE=1 を設定すると、本物の KataGo の代わりに決定論的な偽エンジンを起動する
+FAKE_KATAGO_SCRIPT = os.path.join(SRC_DIR, "drivers", "fake_katago.py")
+if os.environ.get("GOAI_FAKE_ENGINE") == "1":
+    KATAGO_EXE = FAKE_KATAGO_SCRIPT
+
+# API Server Concurrency
+# KataGo に同時に投げる解析数（analysis.cfg の numAnalysisThreads に合わせる）
+KATAGO_MAX_CONCURRENCY = int(os.environ.get("KATAGO_MAX_CONCURRENCY", "4"))
+# PV形状解析のワーカープロセス数（0 の場合はスレッドで実行する）
+PV_SHAPE_WORKERS = int(os.environ.get("PV_SHAPE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Engine Broker
+# アドレスを設定すると API サーバーは自前でエンジンを起動せず、engine_broker.py が保持するエンジンを共有する
+# （この場合のみ GOAI_API_WORKERS で uvicorn のワーカー数を増やせる）
+ENGINE_BROKER_ADDRESS = os.environ.get("GOAI_ENGINE_BROKER") or None
+# 接続の認証鍵。未設定の場合はユーザーごとに乱数の鍵を作り、本人だけが読めるファイルに保存して使う（load_broker_authkey）
+ENGINE_BROKER_AUTHKEY = os.environ.get("GOAI_ENGINE_BROKER_AUTHKEY", "").encode("utf-8") or None
+ENGINE_BROKER_CACHE_SIZE = int(os.environ.get("GOAI_ENGINE_BROKER_CACHE", "512"))
+API_WORKERS = int(os.environ.get("GOAI_API_WORKERS", "1"))
+
+# Commentary SLA
+# 解説生成全体の制限時間（秒）。うち LLM 呼び出しのために残す時間を除いた分を盤面解析に使う
+COMMENTARY_SLA_SECONDS = float(os.environ.get("GOAI_COMMENTARY_SLA", "60"))
+COMMENTARY_LLM_RESERVE_SECONDS = float(os.environ.get("GOAI_COMMENTARY_LLM_RESERVE", "15"))
+# 締め切りが迫った場合でも確保する最低探索数
+DEADLINE_MIN_VISITS = int(os.environ.get("GOAI_DEADLINE_MIN_VISITS", "16"))
+
+# API Client Concurrency
+# 要求の種類ごとの同時実行数（初期値, 最小, 最大）。応答時間が伸びると自動的に絞られる
+# interactive: 画面操作・解説生成 / bulk: 一括解析・レポート / prefetch: 先読み（混雑時は破棄）
+API_CLIENT_CONCURRENCY = {
+    "interactive": (8, 2, 32),
+    "bulk": (4, 1, 16),
+    "prefetch": (2, 1, 4),
+}
+# 混雑時に bulk / prefetch の探索数へ掛ける係数
+API_CLIENT_DEGRADED_VISITS_RATIO = 0.5
+
+# Speculative Prefetch
+# 局面の解析が済んだ後に先読みする前後の手数・候補手への応手の数と、先読み専用のワーカー数
+PREFETCH_RADIUS = int(os.environ.get("GOAI_PREFETCH_RADIUS", "3"))
+PREFETCH_REPLIES = int(os.environ.get("GOAI_PREFETCH_REPLIES", "3"))
+PREFETCH_WORKERS = 2
+# 画面操作の解析が、送信済みの同じ局面の先読みの結果を待つ最長時間（秒）。過ぎたら打ち切って送り直す
+PREFETCH_JOIN_TIMEOUT = 1.0
+
+# Bulk Analysis Pipeline
+# SGF 一括解析の各段のワーカー数とキューの長さ。描画は別プロセスで行う（0 の場合はスレッドで描画）
+BULK_FETCH_WORKERS = int(os.environ.get("GOAI_BULK_FETCH_WORKERS", "4"))
+BULK_RENDER_WORKERS = int(os.environ.get("GOAI_BULK_RENDER_WORKERS", "2"))
+BULK_QUEUE_SIZE = 32
+# 進捗・解析結果の UI 通知をまとめて届ける間隔（ミリ秒）。この間の通知は1回に集約する
+UI_NOTIFY_INTERVAL_MS = int(os.environ.get("GOAI_UI_NOTIFY_INTERVAL_MS", "200"))
+
+# Batch Analysis (batch_analyze.py)
+# 同時に解析する対局数（1局の中の同時要求数は BULK_FETCH_WORKERS）
+BATCH_GAME_WORKERS = int(os.environ.get("GOAI_BATCH_GAME_WORKERS", "2"))
+
+# Cache Budgets
+# 解析結果・盤面画像のキャッシュの上限（バイト数、MB 単位で指定）。超えると古いものから追い出す
+ANALYSIS_CACHE_MAX_BYTES = int(float(os.environ.get("GOAI_ANALYSIS_CACHE_MB", "64")) * 1024 * 1024)
+REPORT_ANALYSIS_CACHE_MAX_BYTES = int(float(os.environ.get("GOAI_REPORT_CACHE_MB", "32")) * 1024 * 1024)
+IMAGE_CACHE_MAX_BYTES = int(float(os.environ.get("GOAI_IMAGE_CACHE_MB", "256")) * 1024 * 1024)
+
+# Transposition Sharing
+# 対局・盤面の向き（回転・反転）をまたいで同じ局面の解析結果を共有する置換表の上限と、対象とする最大手数
+TRANSPOSITION_CACHE_MAX_BYTES = int(float(os.environ.get("GOAI_TRANSPOSITION_CACHE_MB", "64")) * 1024 * 1024)
+TRANSPOSITION_MAX_MOVES = int(os.environ.get("GOAI_TRANSPOSITION_MAX_MOVES", "60"))
+
 # Scripts
 ANALYZE_SCRIPT = os.path.join(SRC_DIR, "analyze_sgf.py")
 
@@ -33,4 +107,43 @@ def load_api_key():
                 return f.read().strip()
         except:
             return None
-    return None
\ No newline at end of file
+    return None
+
+def private_runtime_dir() -> str:
+    """ユーザー専用の実行時ディレクトリ（ブローカーのソケット・認証鍵の置き場所。他のユーザーは読み書きできない）"""
+    if sys.platform == "win32":
+        path = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "goai")
+        os.makedirs(path, exist_ok=True)
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    path = os.path.join(base, "goai") if base else os.path.join(tempfile.gettempdir(), f"goai-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    # 他のユーザーが先に作ったディレクトリやシンボリックリンクは使わない
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"Runtime directory is not private to this user: {path}")
+    return path
+
+def load_broker_authkey() -> bytes:
+    """エンジンブローカーの認証鍵（GOAI_ENGINE_BROKER_AUTHKEY が無ければユーザーごとの乱数の鍵を作って使い回す）"""
+    if ENGINE_BROKER_AUTHKEY:
+        return ENGINE_BROKER_AUTHKEY
+    runtime_dir = private_runtime_dir()
+    path = os.path.join(runtime_dir, "engine-broker.key")
+    if not os.path.exists(path):
+        # ブローカーと API ワーカーが同時に起動しても書きかけの鍵を読まないよう、書き終えてからリンクする
+        fd, tmp = tempfile.mkstemp(dir=runtime_dir)  # 0600 で作られる
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_hex(32).encode("ascii"))
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    if sys.platform != "win32":
+        st = os.stat(path)
+        if st.st_uid != os.getuid() or st.st_mode & 0o077:
+            raise PermissionError(f"Engine broker key must be readable only by its owner: {path}")
+    with open(path, "rb") as f:
+        return f.read().strip()
@@ -0,0 +1,251 @@
+"""
+対局の解析結果の固定長レコード形式のアーカイブ（mmap で開く）。
+
+ヘッダの後に1手ごとに同じ大きさのレコード（勝率・目数・float16 の Ownership/Influence・上位 K 件の候補手と PV）を並べる。
+任意の手のレコードや、全手の勝率などの列を、他の手を読み込まずに参照できる。
+"""
+import os
+import struct
+from collections.abc import MutableSequence, Sequence
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from core.board_map import BOARD_MAP_DTYPE
+
+ARCHIVE_FILENAME = "analysis.goaa"
+ARCHIVE_MAGIC = b"GOAIARC1"
+ARCHIVE_VERSION = 1
+DEFAULT_TOP_K = 5
+DEFAULT_PV_LEN = 12
+
+# magic, version, board_size, total_moves, top_k, pv_len, record_size, sgf_hash(sha256)
+_HEADER = struct.Struct("<8sHHIHHI32s")
+HEADER_SIZE = 64
+
+_COLS = "ABCDEFGHJKLMNOPQRST"
+_MOVE_NONE = 0
+_MOVE_PASS = 1
+
+
+def record_dtype(board_size: int, top_k: int, pv_len: int) -> np.dtype:
+    n = board_size * board_size
+    return np.dtype([
+        ("present", "u1"),
+        ("has_ownership", "u1"),
+        ("has_influence", "u1"),
+        ("n_candidates", "u1"),
+        ("winrate", "<f4"),
+        ("score_lead", "<f4"),
+        ("ownership", "<f2", (n,)),
+        ("influence", "<f2", (n,)),
+        ("cand_move", "<u2", (top_k,)),
+        ("cand_winrate", "<f4", (top_k,)),
+        ("cand_score_lead", "<f4", (top_k,)),
+        ("cand_score_loss", "<f4", (top_k,)),
+        ("pv_count", "u1", (top_k,)),
+        ("pv", "<u2", (top_k, pv_len)),
+    ])
+
+
+def encode_move(move: str, board_size: int) -> int:
+    """GTP 座標を2バイトの符号に変換する（0: 無し, 1: パス）"""
+    if not move:
+        return _MOVE_NONE
+    move = move.upper()
+    if move == "PASS":
+        return _MOVE_PASS
+    try:
+        col = _COLS.index(move[0])
+        row = int(move[1:]) - 1
+    except (ValueError, IndexError):
+        return _MOVE_NONE
+    if not (0 <= col < board_size and 0 <= row < board_size):
+        return _MOVE_NONE
+    return 2 + row * board_size + col
+
+
+def decode_move(code: int, board_size: int) -> Optional[str]:
+    if code == _MOVE_NONE:
+        return None
+    if code == _MOVE_PASS:
+        return "pass"
+    row, col = divmod(int(code) - 2, board_size)
+    return f"{_COLS[col]}{row + 1}"
+
+
+def write_archive(path: str, board_size: int, results: Iterable[Optional[AnalysisResult]], sgf_hash: str = "",
+                  top_k: int = DEFAULT_TOP_K, pv_len: int = DEFAULT_PV_LEN) -> str:
+    """手数順の解析結果をアーカイブに書き出す（一時ファイルに書いてから置き換える）"""
+    results = list(results)
+    dtype = record_dtype(board_size, top_k, pv_len)
+    records = np.zeros(len(results), dtype=dtype)
+    n = board_size * board_size
+    for i, r in enumerate(results):
+        if r is None:
+            continue
+        rec = records[i]
+        rec["present"] = 1
+        rec["winrate"] = r.winrate
+        rec["score_lead"] = r.score_lead
+        if r.ownership is not None and np.size(r.ownership) == n:
+            rec["has_ownership"] = 1
+            rec["ownership"] = np.asarray(r.ownership, dtype=BOARD_MAP_DTYPE).ravel()
+        if r.influence is not None and np.size(r.influence) == n:
+            rec["has_influence"] = 1
+            rec["influence"] = np.asarray(r.influence, dtype=BOARD_MAP_DTYPE).ravel()
+        cands = r.candidates[:top_k]
+        rec["n_candidates"] = len(cands)
+        for k, c in enumerate(cands):
+            rec["cand_move"][k] = encode_move(c.move, board_size)
+            rec["cand_winrate"][k] = c.winrate
+            rec["cand_score_lead"][k] = c.score_lead
+            rec["cand_score_loss"][k] = c.score_loss
+            pv = [encode_move(m, board_size) for m in c.pv[:pv_len]]
+            rec["pv_count"][k] = len(pv)
+            rec["pv"][k, :len(pv)] = pv
+
+    digest = bytes.fromhex(sgf_hash) if sgf_hash else b""
+    header = _HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, board_size, len(results), top_k, pv_len,
+                          dtype.itemsize, digest.ljust(32, b"\0"))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(records.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+class AnalysisArchive(Sequence):
+    """
+    アーカイブを読み取り専用で mmap したもの。
+    archive[i] はその手の AnalysisResult（未解析なら None）をその場で組み立てる。
+    column() / ownership() はコピーを返すため、close() の後も呼び出し元の配列は有効なまま使える。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < _HEADER.size:
+            raise ValueError(f"Truncated analysis archive: {path}")
+        magic, version, board_size, total, top_k, pv_len, record_size, digest = _HEADER.unpack_from(raw)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"Not an analysis archive (or unsupported version): {path}")
+        self.board_size = board_size
+        self.top_k = top_k
+        self.pv_len = pv_len
+        self.sgf_hash = digest.hex() if digest.strip(b"\0") else ""
+        dtype = record_dtype(board_size, top_k, pv_len)
+        if dtype.itemsize != record_size:
+            raise ValueError(f"Analysis archive record size mismatch: {path}")
+        self._records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(total,)) if total else \
+            np.zeros(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        rec = self._records[idx]
+        if not rec["present"]:
+            return None
+        candidates = []
+        for k in range(int(rec["n_candidates"])):
+            move = decode_move(rec["cand_move"][k], self.board_size)
+            pv = [decode_move(c, self.board_size) for c in rec["pv"][k, :int(rec["pv_count"][k])]]
+            candidates.append(MoveCandidate(move=move or "pass", winrate=float(rec["cand_winrate"][k]),
+                                            score_lead=float(rec["cand_score_lead"][k]),
+                                            score_loss=float(rec["cand_score_loss"][k]),
+                                            pv=[m for m in pv if m]))
+        return AnalysisResult(
+            winrate=float(rec["winrate"]),
+            score_lead=float(rec["score_lead"]),
+            ownership=rec["ownership"].astype(BOARD_MAP_DTYPE) if rec["has_ownership"] else None,
+            influence=rec["influence"].astype(BOARD_MAP_DTYPE) if rec["has_influence"] else None,
+            candidates=candidates,
+        )
+
+    def has(self, idx: int) -> bool:
+        return bool(self._records[idx]["present"])
+
+    def column(self, name: str) -> np.ndarray:
+        """全手分の列のコピー（"winrate", "score_lead", "present" など。未解析の手は present が 0）"""
+        return np.array(self._records[name])
+
+    def ownership(self, idx: int) -> Optional[np.ndarray]:
+        """1手分の Ownership のコピー（float16 のまま）"""
+        rec = self._records[idx]
+        return np.array(rec["ownership"]) if rec["has_ownership"] else None
+
+    def close(self):
+        """
+        mmap への参照を手放す（以降は空のアーカイブとして振る舞う）。
+        他のスレッドが読み取り中の可能性があるため mmap を明示的には閉じず、参照が無くなった時点で解放させる。
+        """
+        self._records = self._records[:0].copy()
+
+
+class ArchivedMoves(MutableSequence):
+    """
+    アーカイブを元にした手数順の解析結果の一覧（GameState.moves などの list の代わりに使う）。
+    書き込んだ手や末尾に追加した手はメモリ上に持ち、それ以外はアーカイブから読む。
+    """
+
+    def __init__(self, archive: AnalysisArchive):
+        self.archive = archive
+        self._overlay: Dict[int, Any] = {}
+        self._len = len(archive)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _index(self, idx: int) -> int:
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError("ArchivedMoves index out of range")
+        return idx
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._len))]
+        idx = self._index(idx)
+        if idx in self._overlay:
+            return self._overlay[idx]
+        return self.archive[idx] if idx < len(self.archive) else None
+
+    def __setitem__(self, idx, value):
+        self._overlay[self._index(idx)] = value
+
+    def __delitem__(self, idx):
+        raise TypeError("ArchivedMoves does not support deletion")
+
+    def insert(self, idx, value):
+        if idx != self._len:
+            raise TypeError("ArchivedMoves only supports appending")
+        self._len += 1
+        self._overlay[idx] = value
+
+    def columns(self):
+        """(勝率, 目数, 解析済みか) の配列。上書き・追加分を反映したコピーを返す"""
+        n = len(self.archive)
+        wr = np.full(self._len, 0.5, dtype=np.float32)
+        sc = np.zeros(self._len, dtype=np.float32)
+        present = np.zeros(self._len, dtype=bool)
+        wr[:n] = self.archive.column("winrate")
+        sc[:n] = self.archive.column("score_lead")
+        present[:n] = self.archive.column("present").astype(bool)
+        for i, v in self._overlay.items():
+            present[i] = v is not None
+            if v is None:
+                continue
+            if isinstance(v, dict):
+                wr[i] = v.get("winrate", v.get("winrate_black", 0.5))
+                sc[i] = v.get("score_lead", v.get("score", v.get("score_lead_black", 0.0)))
+            else:
+                wr[i] = v.winrate
+                sc[i] = v.score_lead
+        return wr, sc, present
@@ -1,5 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
+import numpy as np
+from core.board_map import to_board_map, board_map_to_list
 
 @dataclass(frozen=True)
 class MoveCandidate:
@@ -16,8 +18,8 @@ class MoveCandidate:
         return cls(
             move=d.get('move', 'pass'),
             winrate=d.get('winrate', d.get('winrate_black', 0.5)),
-            score_lead=d.get('scoreLead', d.get('score_lead_black', 0.0)),
-            score_loss=d.get('scoreLoss', 0.0),
+            score_lead=d.get('scoreLead', d.get('score_lead', d.get('score_lead_black', 0.0))),
+            score_loss=d.get('scoreLoss', d.get('score_loss', 0.0)),
             pv=d.get('pv', [])
         )
 
@@ -26,9 +28,10 @@ class AnalysisResult:
     """ある局面全体の解析結果"""
     winrate: float
     score_lead: float
-    ownership: Optional[List[float]] = None
-    influence: Optional[List[float]] = None
+    ownership: Optional[np.ndarray] = None  # float32配列 (黒地+, 白地-)
+    influence: Optional[np.ndarray] = None
     candidates: List[MoveCandidate] = field(default_factory=list)
+    visits: Optional[int] = None  # エンジンに要求した探索数（締め切りで縮めた後の値。不明な場合は None）
     
     @property
     def best_move(self) -> Optional[str]:
@@ -39,8 +42,8 @@ class AnalysisResult:
         return f"{self.winrate:.1%}"
 
     @classmethod
-    def from_dict(cls, d: Dict[str, Any]) -> 'AnalysisResult':
-        """KataGoの解析レスポンス辞書からオブジェクトを生成"""
+    def from_dict(cls, d: Dict[str, Any], visits: Optional[int] = None) -> 'AnalysisResult':
+        """KataGoの解析レスポンス辞書からオブジェクトを生成（visits は要求した探索数）"""
         if not d:
             return cls(winrate=0.5, score_lead=0.0)
             
@@ -53,8 +56,23 @@ class AnalysisResult:
         
         return cls(
             winrate=root.get('winrate', root.get('winrate_black', 0.5)),
-            score_lead=root.get('scoreLead', root.get('score_lead_black', 0.0)),
-            ownership=d.get('ownership'),
-            influence=d.get('influence'),
-            candidates=candidates
+            score_lead=root.get('scoreLead', root.get('score_lead', root.get('score_lead_black', 0.0))),
+            ownership=to_board_map(d.get('ownership')),
+            influence=to_board_map(d.get('influence')),
+            candidates=candidates,
+            visits=visits
         )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON保存用の辞書に変換する（マップは丸めた float のリストになる）"""
+        return {
+            "winrate": self.winrate,
+            "score_lead": self.score_lead,
+            "ownership": board_map_to_list(self.ownership),
+            "influence": board_map_to_list(self.influence),
+            "candidates": [
+                {"move": c.move, "winrate": c.winrate, "score_lead": c.score_lead,
+                 "score_loss": c.score_loss, "pv": list(c.pv)}
+                for c in self.candidates
+            ]
+        }
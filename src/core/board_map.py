@@ -0,0 +1,73 @@
+import base64
+from typing import Any, Optional
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack は任意依存（無い場合は JSON + base64 で代替する）
+    msgpack = None
+
+# Ownership / Influence の内部表現（19x19 = 361要素の1次元配列、KataGo行順）
+BOARD_MAP_DTYPE = np.float32
+
+# API のマップ符号化形式
+MAP_ENCODING_LIST = "list"      # 従来互換: float のリスト
+MAP_ENCODING_F16B64 = "f16b64"  # float16 のリトルエンディアンバイト列を base64 化
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+# 解析結果の出どころ（engine: エンジンで探索 / cache: エンジン側のキャッシュ / shared: 実行中の同一解析に相乗り）
+ANALYSIS_SOURCE_HEADER = "X-Analysis-Source"
+ANALYSIS_SOURCE_ENGINE = "engine"
+ANALYSIS_SOURCE_CACHE = "cache"
+ANALYSIS_SOURCE_SHARED = "shared"
+
+
+def to_board_map(values: Any) -> Optional[np.ndarray]:
+    """リスト・配列・符号化済み辞書を float32 配列に変換する（空の場合は None）"""
+    if values is None:
+        return None
+    if isinstance(values, dict):
+        return decode_board_map(values)
+    arr = np.asarray(values, dtype=BOARD_MAP_DTYPE)
+    return arr if arr.size else None
+
+
+def encode_board_map(arr: Optional[np.ndarray], encoding: str = MAP_ENCODING_LIST, binary: bool = False) -> Any:
+    """
+    マップを転送用に符号化する。
+    binary=True の場合は msgpack 用に base64 を使わず生バイト列のまま返す。
+    """
+    if arr is None:
+        return []
+    if encoding == MAP_ENCODING_F16B64:
+        raw = np.asarray(arr, dtype="<f2").tobytes()
+        return {
+            "dtype": "float16",
+            "shape": [int(np.size(arr))],
+            "data": raw if binary else base64.b64encode(raw).decode("ascii"),
+        }
+    return board_map_to_list(arr)
+
+
+def decode_board_map(obj: Any) -> Optional[np.ndarray]:
+    """encode_board_map の逆変換"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        data = obj.get("data", b"")
+        raw = base64.b64decode(data) if isinstance(data, str) else bytes(data)
+        dtype = "<f2" if obj.get("dtype") == "float16" else "<f4"
+        arr = np.frombuffer(raw, dtype=dtype).astype(BOARD_MAP_DTYPE)
+        return arr if arr.size else None
+    return to_board_map(obj)
+
+
+def board_map_to_list(arr: Optional[np.ndarray], ndigits: int = 4) -> list:
+    """JSON保存用に丸めた float のリストへ変換する"""
+    if arr is None:
+        return []
+    return np.round(np.asarray(arr, dtype=np.float64), ndigits).tolist()
+
+
+def has_values(arr: Optional[Any]) -> bool:
+    """マップにデータが含まれているか（配列の真偽値評価を避けるためのヘルパー）"""
+    return arr is not None and len(arr) > 0
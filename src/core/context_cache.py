@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from core.board_simulator import BoardSimulator, SimulationContext
+from core.game_board import GameBoard
+
+
+def prefix_hashes(history: List[List[str]]) -> List[int]:
+    """履歴の各接頭辞のハッシュ（hashes[i] は先頭 i 手分）を1回の走査で求める"""
+    hashes = [0]
+    h = 0
+    for move in history:
+        h = hash((h, str(move[0]).upper()[:1], str(move[1] or "pass").upper()))
+        hashes.append(h)
+    return hashes
+
+
+class ContextCache:
+    """
+    復元済みの SimulationContext を履歴の接頭辞ハッシュで保持する LRU。
+    キャッシュ済みの接頭辞を延長した履歴は、追加された手だけを差分で適用して復元する。
+    """
+
+    def __init__(self, simulator: Optional[BoardSimulator] = None, max_entries: int = 64):
+        self.simulator = simulator or BoardSimulator()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int, int], SimulationContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 統計: 完全一致 / 接頭辞からの差分復元 / 初手からの復元、差分で適用した手数
+        self.exact_hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.moves_applied = 0
+
+    def get(self, history: List[List[str]], board_size: int = 19) -> SimulationContext:
+        hashes = prefix_hashes(history)
+        n = len(history)
+
+        base, k = None, 0
+        with self._lock:
+            for i in range(n, -1, -1):
+                ctx = self._entries.get((board_size, i, hashes[i]))
+                if ctx is not None:
+                    self._entries.move_to_end((board_size, i, hashes[i]))
+                    base, k = ctx, i
+                    break
+            if k == n and base is not None:
+                self.exact_hits += 1
+                return base
+            if base is None:
+                self.misses += 1
+            else:
+                self.prefix_hits += 1
+            self.moves_applied += n - k
+
+        # 初手からの場合も空の盤面を起点とした差分復元として扱う（全体再生時のログ出力を避ける）
+        initial_board = base.board if base is not None else GameBoard(board_size)
+        ctx = self.simulator.reconstruct_to_context(
+            list(history), board_size, initial_board=initial_board, previous_history_len=k
+        )
+
+        with self._lock:
+            self._entries[(board_size, n, hashes[n])] = ctx
+            self._entries.move_to_end((board_size, n, hashes[n]))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ctx
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses,
+                "moves_applied": self.moves_applied,
+            }
@@ -0,0 +1,212 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from core.board_simulator import BoardSimulator, SimulationContext
+from core.game_board import GameBoard, Color
+from core.point import Point
+from core.zobrist import get_zobrist_table
+
+
+class StalePositionError(ValueError):
+    """position_id が指す局面がセッションの現在の手順と一致しない"""
+
+
+class GameSession:
+    """
+    API サーバー側で保持する対局セッション。
+    既知の手順 (line) と現在の手数 (current) を持ち、各局面の SimulationContext と
+    Zobrist キーを手前の局面からの差分で構築・保持する（巻き戻しは保持済みの局面を再利用する）。
+    """
+
+    def __init__(self, session_id: str, board_size: int = 19, metadata: Optional[dict] = None):
+        self.session_id = session_id
+        self.board_size = board_size
+        self.metadata = metadata or {}
+        self.line: List[List[str]] = []
+        self.current = 0
+        self.last_update = time.time()
+        self.lock = threading.RLock()
+
+        self._simulator = BoardSimulator(board_size)
+        self._zobrist = get_zobrist_table(board_size)
+        root_board = GameBoard(board_size)
+        self._contexts: List[SimulationContext] = [SimulationContext(
+            board=root_board, prev_board=None, history=[], last_move=None, last_color=None,
+            board_size=board_size, captured_points=[]
+        )]
+        self._keys: List[int] = [self._zobrist.board_key(root_board, Color.BLACK)]
+        self._to_move: List[Color] = [Color.BLACK]
+
+    # --- 手順の変更 (差分操作) ---
+
+    def set_line(self, history: List[List[str]], move_index: Optional[int] = None):
+        """手順全体を置き換える（共通する先頭部分の局面は再利用する）"""
+        with self.lock:
+            common = 0
+            for old, new in zip(self.line, history):
+                if _normalize(old) != _normalize(new):
+                    break
+                common += 1
+            self._truncate(common)
+            self.line = [list(m[:2]) for m in history]
+            self.jump(len(self.line) if move_index is None else move_index)
+
+    def push(self, moves: List[List[str]]):
+        """現在の局面に手を追加する（現在の局面より先の既知手順は破棄する）"""
+        with self.lock:
+            self._truncate(self.current)
+            self.line = self.line[:self.current] + [list(m[:2]) for m in moves]
+            self.jump(len(self.line))
+
+    def pop(self, count: int = 1):
+        """count 手戻る（既知手順は保持するため jump で再び進める）"""
+        with self.lock:
+            self.jump(max(0, self.current - count))
+
+    def jump(self, move_index: int):
+        """既知手順上の指定手数へ移動する"""
+        with self.lock:
+            if not 0 <= move_index <= len(self.line):
+                raise IndexError(f"move_index {move_index} is out of range (0..{len(self.line)})")
+            self._advance_to(move_index)
+            self.current = move_index
+            self.last_update = time.time()
+
+    # --- 参照 ---
+
+    def context_at(self, move_index: Optional[int] = None) -> SimulationContext:
+        with self.lock:
+            idx = self._resolve_index(move_index)
+            self._advance_to(idx)
+            return self._contexts[idx]
+
+    def key_at(self, move_index: Optional[int] = None) -> int:
+        with self.lock:
+            idx = self._resolve_index(move_index)
+            self._advance_to(idx)
+            return self._keys[idx]
+
+    def history_up_to(self, move_index: Optional[int] = None) -> List[List[str]]:
+        with self.lock:
+            return [list(m) for m in self.line[:self._resolve_index(move_index)]]
+
+    def position_id(self, move_index: Optional[int] = None) -> str:
+        """局面を指す ID（セッションID・手数・Zobristキー）。手順が変わると無効になる"""
+        with self.lock:
+            idx = self._resolve_index(move_index)
+            return f"{self.session_id}:{idx}:{self.key_at(idx):016x}"
+
+    def to_state(self) -> dict:
+        with self.lock:
+            return {
+                "session_id": self.session_id,
+                "board_size": self.board_size,
+                "current_move_index": self.current,
+                "total_moves": len(self.line),
+                "metadata": self.metadata,
+                "position_id": self.position_id(),
+                "zobrist": f"{self.key_at():016x}",
+                "last_update": self.last_update,
+            }
+
+    # --- 内部処理 ---
+
+    def _resolve_index(self, move_index: Optional[int]) -> int:
+        idx = self.current if move_index is None else move_index
+        if not 0 <= idx <= len(self.line):
+            raise IndexError(f"move_index {idx} is out of range (0..{len(self.line)})")
+        return idx
+
+    def _truncate(self, n: int):
+        """n 手目より先に構築済みの局面を破棄する"""
+        del self._contexts[n + 1:]
+        del self._keys[n + 1:]
+        del self._to_move[n + 1:]
+
+    def _advance_to(self, move_index: int):
+        """構築済みの最終局面から move_index まで1手ずつ差分で進める"""
+        while len(self._contexts) <= move_index:
+            n = len(self._contexts) - 1
+            base = self._contexts[n]
+            move = self.line[n]
+            ctx = self._simulator.reconstruct_to_context(
+                self.line[:n + 1], self.board_size, initial_board=base.board, previous_history_len=n
+            )
+
+            color = Color.from_str(move[0]) or self._to_move[n]
+            placed = ctx.last_move if ctx.last_move and ctx.board.get(ctx.last_move) == color else None
+            captured = _captured_stones(base.board, ctx.board, placed, color) if placed else []
+            key = self._zobrist.update_key(self._keys[n], self._to_move[n], color, placed,
+                                           captured, base.board.ko_point, ctx.board.ko_point)
+            self._contexts.append(ctx)
+            self._keys.append(key)
+            self._to_move.append(color.opposite())
+
+
+def _captured_stones(before: GameBoard, after: GameBoard, placed: Point, color: Color) -> List[Point]:
+    """着手により盤上から消えた相手の石（着手点に隣接する連のみを調べる）"""
+    opponent = color.opposite()
+    captured = set()
+    for n in placed.neighbors(before.side):
+        if n in captured or before.get(n) != opponent or after.get(n) is not None:
+            continue
+        group, _ = before.get_group_and_liberties(n)
+        captured |= group
+    return list(captured)
+
+
+def _normalize(move) -> Tuple[str, str]:
+    return str(move[0]).upper()[:1], str(move[1] or "pass").upper()
+
+
+class SessionStore:
+    """セッションの保持（上限を超えた場合は最も古く使われたものから破棄する）"""
+
+    def __init__(self, max_sessions: int = 16):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.active_session_id: Optional[str] = None  # 最後に更新されたセッション（/game/state 互換用）
+
+    def create(self, session_id: Optional[str] = None, board_size: int = 19, metadata: Optional[dict] = None) -> GameSession:
+        session = GameSession(session_id or uuid.uuid4().hex[:12], board_size, metadata)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if self.active_session_id == session_id:
+                self.active_session_id = None
+            return self._sessions.pop(session_id, None) is not None
+
+    def resolve_position(self, position_id: str) -> Tuple[GameSession, int]:
+        """position_id をセッションと手数に解決する（手順が変わっていれば StalePositionError）"""
+        try:
+            session_id, idx_str, key_hex = position_id.split(":")
+            idx = int(idx_str)
+        except ValueError:
+            raise KeyError(f"Malformed position_id: {position_id}")
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        with session.lock:
+            if idx > len(session.line) or f"{session.key_at(idx):016x}" != key_hex:
+                raise StalePositionError(f"Position {position_id} no longer matches session line")
+        return session, idx
+
+    def __len__(self):
+        return len(self._sessions)
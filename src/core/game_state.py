@@ -3,6 +3,7 @@ from core.game_board import GameBoard, Color
 from core.point import Point
 from utils.logger import logger
 import sys
+import numpy as np
 
 class GoGameState:
     def __init__(self):
@@ -199,6 +200,10 @@ class GoGameState:
     def calculate_mistakes(self):
         if not self.moves or len(self.moves) < 2: 
             return [], []
+        # アーカイブ上の解析結果は勝率・目数の列だけを読む
+        columns = getattr(self.moves, "columns", None)
+        if columns is not None:
+            return self._mistakes_from_columns(*columns())
         
         mb, mw = [], []
         # インデックス範囲を moves の長さに厳密に合わせる
@@ -211,17 +216,17 @@ class GoGameState:
                 
                 if isinstance(prev, dict):
                     wr_before = prev.get('winrate', prev.get('winrate_black', 0.5))
-                    sc_before = prev.get('score', prev.get('score_lead_black', 0.0))
+                    sc_before = prev.get('score', prev.get('score_lead', prev.get('score_lead_black', 0.0)))
                 else:
                     wr_before = getattr(prev, 'winrate', getattr(prev, 'winrate_black', 0.5))
-                    sc_before = getattr(prev, 'score', getattr(prev, 'score_lead_black', 0.0))
+                    sc_before = getattr(prev, 'score', getattr(prev, 'score_lead', getattr(prev, 'score_lead_black', 0.0)))
 
                 if isinstance(curr, dict):
                     wr_after = curr.get('winrate', curr.get('winrate_black', 0.5))
-                    sc_after = curr.get('score', curr.get('score_lead_black', 0.0))
+                    sc_after = curr.get('score', curr.get('score_lead', curr.get('score_lead_black', 0.0)))
                 else:
                     wr_after = getattr(curr, 'winrate', getattr(curr, 'winrate_black', 0.5))
-                    sc_after = getattr(curr, 'score', getattr(curr, 'score_lead_black', 0.0))
+                    sc_after = getattr(curr, 'score', getattr(curr, 'score_lead', getattr(curr, 'score_lead_black', 0.0)))
                 
                 if (i % 2 != 0): # Black turn (1, 3, 5...)
                     # 黒が打った結果、黒の勝率がどれだけ下がったか
@@ -235,3 +240,17 @@ class GoGameState:
         mb.sort(key=lambda x: x[1], reverse=True)
         mw.sort(key=lambda x: x[1], reverse=True)
         return mb[:3], mw[:3]
+
+    @staticmethod
+    def _mistakes_from_columns(wr, sc, present):
+        """calculate_mistakes の列版（wr/sc: 黒から見た勝率・目数, present: 解析済みか）"""
+        mb, mw = [], []
+        for i in (np.nonzero(present[1:] & present[:-1])[0] + 1):
+            i = int(i)
+            if i % 2 != 0:
+                mb.append((float(sc[i-1] - sc[i]), float(wr[i-1] - wr[i]), i))
+            else:
+                mw.append((float(sc[i] - sc[i-1]), float(wr[i] - wr[i-1]), i))
+        mb.sort(key=lambda x: x[1], reverse=True)
+        mw.sort(key=lambda x: x[1], reverse=True)
+        return mb[:3], mw[:3]
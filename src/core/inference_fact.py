@@ -45,6 +45,7 @@ class UrgencyMetadata(BaseFactMetadata):
     urgency: float              # 緊急度の値（目数）
     is_critical: bool           # 急場判定フラグ
     next_player: str           # 手順予測の開始プレイヤー
+    opponent_pv: List[str] = field(default_factory=list) # 放置した場合の相手の連打手順（失敗図用）
 
 @dataclass
 class GamePhaseMetadata(BaseFactMetadata):
@@ -0,0 +1,50 @@
+"""
+読み筋（PV）上の将来局面に対する形状検知。
+API サーバーのワーカープロセスで実行されるため、katago_api（エンジンを起動する）を
+import してはならない。
+"""
+from typing import List, Optional
+
+from core.board_simulator import BoardSimulator
+from core.shape_detector import ShapeDetector
+
+NO_FACTS_TEXT = "特になし"
+
+# ワーカープロセスごとに一度だけ生成する（ShapeDetector は検知中に状態を書き換えるためスレッド間で共有しない）
+_simulator: Optional[BoardSimulator] = None
+_detector: Optional[ShapeDetector] = None
+
+
+def _get_tools():
+    global _simulator, _detector
+    if _simulator is None:
+        _simulator = BoardSimulator()
+        _detector = ShapeDetector()
+    return _simulator, _detector
+
+
+def parse_future_sequence(pv_str: str) -> List[str]:
+    """"D16 -> E17" のような形式を手のリストに変換する"""
+    return [m.strip() for m in pv_str.split(" -> ")] if pv_str else []
+
+
+def analyze_pv_shapes(history: list, board_size: int, future_sequences: List[str]) -> List[str]:
+    """
+    各候補手の読み筋を1手ずつ進めて形状検知を行い、候補手ごとの要約テキストを返す。
+    盤面は直前の局面から差分で進めるため、読み筋の長さに対して線形の計算量で済む。
+    """
+    simulator, detector = _get_tools()
+    curr_ctx = simulator.reconstruct_to_context(history, board_size)
+
+    texts = []
+    for pv_str in future_sequences:
+        all_future_facts = []
+        future_ctx = curr_ctx
+        for move in parse_future_sequence(pv_str):
+            future_ctx = simulator.simulate_sequence(future_ctx, [move])
+            facts = detector.detect_facts(future_ctx)
+            if facts:
+                fact_text = "\n".join([f"    - {f.description}" for f in facts])
+                all_future_facts.append(f"  [{move}の局面]:\n{fact_text}")
+        texts.append("\n".join(all_future_facts) if all_future_facts else NO_FACTS_TEXT)
+    return texts
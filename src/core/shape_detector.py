@@ -39,12 +39,12 @@ class DetectionContext:
         """指定座標のOwnershipを取得する (黒地: +1.0, 白地: -1.0)"""
         # analysis_result が AnalysisResult オブジェクトか辞書かに対応
         ownership = getattr(self.analysis_result, 'ownership', None)
-        if not ownership:
+        if ownership is None or len(ownership) == 0:
             return 0.0
         
         idx = pt.row * self.board_size + pt.col
         if 0 <= idx < len(ownership):
-            return ownership[idx]
+            return float(ownership[idx])
         return 0.0
 
 class ShapeDetector:
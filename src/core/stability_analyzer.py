@@ -11,7 +11,10 @@ class StabilityAnalyzer:
 
     def analyze_to_facts(self, board: GameBoard, ownership_map, uncertainty_map=None) -> List[InferenceFact]:
         """解析結果を InferenceFact のリストとして返す"""
-        results = self.analyze(board, ownership_map, uncertainty_map)
+        return self.facts_from_groups(self.analyze(board, ownership_map, uncertainty_map))
+
+    def facts_from_groups(self, results: List[StabilityMetadata]) -> List[InferenceFact]:
+        """analyze() の結果（グループごとの安定度）を InferenceFact のリストに変換する"""
         facts = []
         
         for r in results:
@@ -58,14 +61,14 @@ class StabilityAnalyzer:
                 
         return facts
 
-    def analyze(self, board: GameBoard, ownership_map, uncertainty_map=None) -> List[StabilityMetadata]:
-        """グループごとの安定度と不確実性を分析する"""
-        if not ownership_map:
+    def analyze(self, board: GameBoard, ownership_map, uncertainty_map=None, chains=None) -> List[StabilityMetadata]:
+        """グループごとの安定度と不確実性を分析する（chains に find_chains() の結果を渡すと連の探索を省略する）"""
+        if ownership_map is None or len(ownership_map) == 0:
             return []
 
         from core.analysis_config import AnalysisConfig
 
-        groups = self._find_strategic_groups(board, ownership_map)
+        groups = self._find_strategic_groups(board, ownership_map, chains)
         analysis_results = []
 
         crit_thresh = AnalysisConfig.get("CRITICAL_THRESHOLD") # e.g. 0.2
@@ -81,13 +84,13 @@ class StabilityAnalyzer:
             
             # 不確実性の計算（uncertainty_mapがあれば使用、なければ0）
             avg_uncertainty = 0.0
-            if uncertainty_map:
+            if uncertainty_map is not None and len(uncertainty_map):
                 total_unc = 0.0
                 for p in stones:
                     kata_row = (self.board_size - 1) - p.row
                     idx = kata_row * self.board_size + p.col
                     if idx < len(uncertainty_map):
-                        total_unc += uncertainty_map[idx]
+                        total_unc += float(uncertainty_map[idx])
                 avg_uncertainty = total_unc / len(stones) if stones else 0.0
             
             analysis_results.append(StabilityMetadata(
@@ -102,9 +105,8 @@ class StabilityAnalyzer:
             
         return analysis_results
 
-    def _find_strategic_groups(self, board: GameBoard, ownership_map):
-        visited = set()
-        physical_groups = self._find_physical_groups(board)
+    def _find_strategic_groups(self, board: GameBoard, ownership_map, chains=None):
+        physical_groups = chains if chains is not None else self.find_chains(board)
         
         group_data = []
         for color_obj, stones in physical_groups:
@@ -112,7 +114,7 @@ class StabilityAnalyzer:
             for p in stones:
                 kata_row = (self.board_size - 1) - p.row
                 idx = kata_row * self.board_size + p.col
-                total_own += ownership_map[idx]
+                total_own += float(ownership_map[idx])
             avg_own = total_own / len(stones)
             group_data.append({
                 "color_obj": color_obj,
@@ -149,7 +151,8 @@ class StabilityAnalyzer:
 
         return merged_groups
 
-    def _find_physical_groups(self, board: GameBoard):
+    def find_chains(self, board: GameBoard):
+        """盤上の連（色と石のリスト）を列挙する"""
         visited = set()
         groups = [] 
 
@@ -181,7 +184,7 @@ class StabilityAnalyzer:
         グループ周辺の影響力平均値を算出する。
         影響力マップは黒プラス、白マイナスの前提。
         """
-        if not influence_map:
+        if influence_map is None or len(influence_map) == 0:
             return 0.0
 
         targets = set()
@@ -209,6 +212,6 @@ class StabilityAnalyzer:
             kata_row = (self.board_size - 1) - p.row
             idx = kata_row * self.board_size + p.col
             if 0 <= idx < len(influence_map):
-                total += influence_map[idx]
+                total += float(influence_map[idx])
                 
         return total / len(all_targets)
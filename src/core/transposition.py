@@ -0,0 +1,175 @@
+"""
+盤面の対称性（回転・反転の8通り）を同一視した局面キーと、それを使った解析結果の共有（置換表）。
+別の対局・別の向きでも同じ局面に到達していれば、1度の解析結果を座標を変換して使い回す。
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from core.coordinate_transformer import CoordinateTransformer
+from core.game_board import GameBoard, Color
+from core.point import Point
+from core.zobrist import get_zobrist_table
+from utils.lru_cache import SizedLRUCache
+
+# (転置, 行の反転, 列の反転)。この順に適用する（行は GTP と同じく下から数える）
+SYMMETRIES: List[Tuple[bool, bool, bool]] = [(t, fr, fc) for t in (False, True) for fr in (False, True)
+                                             for fc in (False, True)]
+IDENTITY = 0
+
+
+def transform_point(row: int, col: int, sym: int, board_size: int, inverse: bool = False) -> Tuple[int, int]:
+    t, fr, fc = SYMMETRIES[sym]
+    n1 = board_size - 1
+    if inverse:
+        if fc: col = n1 - col
+        if fr: row = n1 - row
+        if t: row, col = col, row
+        return row, col
+    if t: row, col = col, row
+    if fr: row = n1 - row
+    if fc: col = n1 - col
+    return row, col
+
+
+def transform_move(move: Optional[str], sym: int, board_size: int, inverse: bool = False) -> Optional[str]:
+    """GTP 座標の手を変換する（パスや解釈できない文字列はそのまま返す）"""
+    rc = CoordinateTransformer.gtp_to_indices_static(move)
+    if rc is None:
+        return move
+    return CoordinateTransformer.indices_to_gtp_static(*transform_point(*rc, sym, board_size, inverse))
+
+
+def transform_map(values, sym: int, board_size: int, inverse: bool = False) -> Optional[np.ndarray]:
+    """
+    Ownership / Influence のマップを変換する。
+    マップは KataGo と同じく上の行から並ぶため、下から数える行に並べ替えてから回転・反転する。
+    """
+    if values is None or np.size(values) != board_size * board_size:
+        return values
+    arr = np.asarray(values)
+    grid = arr.reshape(board_size, board_size)[::-1]
+    t, fr, fc = SYMMETRIES[sym]
+    if inverse:
+        if fc: grid = grid[:, ::-1]
+        if fr: grid = grid[::-1]
+        if t: grid = grid.T
+    else:
+        if t: grid = grid.T
+        if fr: grid = grid[::-1]
+        if fc: grid = grid[:, ::-1]
+    return np.ascontiguousarray(grid[::-1]).reshape(-1)
+
+
+def transform_result(result: AnalysisResult, sym: int, board_size: int, inverse: bool = False) -> AnalysisResult:
+    """解析結果の盤上の座標（候補手・PV・マップ）を全て変換した新しい結果を返す"""
+    if sym == IDENTITY:
+        return result
+    return AnalysisResult(
+        winrate=result.winrate,
+        score_lead=result.score_lead,
+        ownership=transform_map(result.ownership, sym, board_size, inverse),
+        influence=transform_map(result.influence, sym, board_size, inverse),
+        candidates=[MoveCandidate(move=transform_move(c.move, sym, board_size, inverse), winrate=c.winrate,
+                                  score_lead=c.score_lead, score_loss=c.score_loss,
+                                  pv=[transform_move(m, sym, board_size, inverse) for m in c.pv])
+                    for c in result.candidates],
+        visits=result.visits,
+    )
+
+
+def board_after(history: List[List[str]], board_size: int) -> Tuple[GameBoard, Color]:
+    """履歴を初手から並べた盤面と次の手番"""
+    board = GameBoard(board_size)
+    next_color = Color.BLACK
+    for color, move in history:
+        c_obj = Color.from_str(str(color)) or next_color
+        pt = Point.from_gtp(str(move))
+        if pt is None:
+            board.apply_pass()
+        else:
+            board.play(pt, c_obj)
+        next_color = c_obj.opposite()
+    return board, next_color
+
+
+def canonical_key(board: GameBoard, next_color: Color) -> Tuple[int, int]:
+    """
+    8通りの向きの Zobrist キーのうち最小のものと、その向きへの変換番号を返す。
+    同じキーの局面同士は、それぞれの変換で同じ向き（正規形）に揃う。
+    """
+    size = board.board_size
+    table = get_zobrist_table(size)
+    stones = board.list_occupied_points()
+    ko = board.ko_point
+    best_key, best_sym = None, IDENTITY
+    for sym in range(len(SYMMETRIES)):
+        key = table.white_to_move if next_color == Color.WHITE else 0
+        for pt, color in stones:
+            key ^= table.stone(Point(*transform_point(pt.row, pt.col, sym, size)), color)
+        if ko is not None:
+            key ^= table.ko(Point(*transform_point(ko.row, ko.col, sym, size)))
+        if best_key is None or key < best_key:
+            best_key, best_sym = key, sym
+    return best_key, best_sym
+
+
+class TranspositionTable:
+    """
+    正規形の局面キーで引く解析結果の表（対局をまたいで共有する）。
+    結果は正規形の向きに変換して保持し、取り出すときに問い合わせた局面の向きへ戻す。
+    max_moves を超える手数の局面は、対局間で一致することがまず無いため対象にしない。
+    """
+
+    def __init__(self, max_bytes: int, max_moves: int = 60):
+        self.max_moves = max_moves
+        self._cache = SizedLRUCache("transposition", max_bytes)
+        self._lock = threading.Lock()
+        self.lookups: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+        self.transformed_hits = 0
+
+    def key_for(self, history: List[List[str]], board_size: int, *params) -> Optional[Tuple[tuple, int]]:
+        """(表のキー, 正規形への変換番号)。対象外の局面は None"""
+        if len(history) > self.max_moves:
+            return None
+        board, next_color = board_after(history, board_size)
+        key, sym = canonical_key(board, next_color)
+        return (board_size, key) + tuple(params), sym
+
+    def get(self, key: Optional[Tuple[tuple, int]], board_size: int, kind: str = "all") -> Optional[AnalysisResult]:
+        if key is None:
+            return None
+        table_key, sym = key
+        cached = self._cache.get(table_key)
+        with self._lock:
+            self.lookups[kind] = self.lookups.get(kind, 0) + 1
+            if cached is not None:
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+        if cached is None:
+            return None
+        stored_sym, result = cached
+        if stored_sym != sym:
+            with self._lock:
+                self.transformed_hits += 1
+        return transform_result(result, sym, board_size, inverse=True)
+
+    def put(self, key: Optional[Tuple[tuple, int]], board_size: int, result: AnalysisResult):
+        if key is None or result is None:
+            return
+        table_key, sym = key
+        self._cache[table_key] = (sym, transform_result(result, sym, board_size))
+
+    def hit_rate(self, kind: str) -> float:
+        with self._lock:
+            lookups = self.lookups.get(kind, 0)
+            return self.hits.get(kind, 0) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"entries": len(self._cache), "transformed_hits": self.transformed_hits,
+                     "lookups": dict(self.lookups), "hits": dict(self.hits)}
+        stats["hit_rate"] = {kind: round(self.hit_rate(kind), 3) for kind in stats["lookups"]}
+        return stats
@@ -0,0 +1,58 @@
+import random
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from core.game_board import GameBoard, Color
+from core.point import Point
+
+
+class ZobristTable:
+    """
+    局面の Zobrist ハッシュ用の乱数表。
+    石の配置・手番・コウの位置を 64bit 値の XOR で表し、着手ごとに差分で更新できる。
+    """
+
+    def __init__(self, board_size: int = 19, seed: int = 0x60A1):
+        rng = random.Random(seed * 31 + board_size)
+        n = board_size * board_size
+        self.board_size = board_size
+        self._stones = {Color.BLACK: [rng.getrandbits(64) for _ in range(n)],
+                        Color.WHITE: [rng.getrandbits(64) for _ in range(n)]}
+        self._ko = [rng.getrandbits(64) for _ in range(n)]
+        self.white_to_move = rng.getrandbits(64)
+
+    def stone(self, pt: Point, color: Color) -> int:
+        return self._stones[color][pt.row * self.board_size + pt.col]
+
+    def ko(self, pt: Optional[Point]) -> int:
+        return self._ko[pt.row * self.board_size + pt.col] if pt else 0
+
+    def board_key(self, board: GameBoard, next_color: Color = Color.BLACK) -> int:
+        """盤面全体からキーを計算する（差分更新の基準値・検証用）"""
+        key = self.white_to_move if next_color == Color.WHITE else 0
+        for pt, color in board.list_occupied_points():
+            key ^= self.stone(pt, color)
+        return key ^ self.ko(board.ko_point)
+
+    def update_key(self, key: int, to_move: Color, color: Color, placed: Optional[Point], captured: Iterable[Point],
+                   old_ko: Optional[Point], new_ko: Optional[Point]) -> int:
+        """
+        1手分の差分でキーを更新する（更新後の手番は color の相手番）。
+        to_move は更新前のキーが表す手番、placed は盤上に実際に置かれた石（パスや不正手の場合は None）、
+        captured は打ち上げた相手の石。
+        """
+        if color != to_move:
+            key ^= self.white_to_move  # 置き石などで同じ色が続く場合の手番補正
+        if placed is not None:
+            key ^= self.stone(placed, color)
+        opponent = color.opposite()
+        for pt in captured:
+            key ^= self.stone(pt, opponent)
+        key ^= self.ko(old_ko) ^ self.ko(new_ko)
+        return key ^ self.white_to_move
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_table(board_size: int = 19) -> ZobristTable:
+    """盤サイズごとに共有される乱数表（プロセス内で値は固定）"""
+    return ZobristTable(board_size)
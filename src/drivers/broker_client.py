@@ -0,0 +1,144 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from config import load_broker_authkey
+from drivers.katago_driver import MAX_TIME_GRACE
+from utils.metrics import metrics
+
+BROKER_CLIENT_TIME = metrics.histogram("engine_broker_client_seconds", "Round-trip time of requests to the engine broker")
+
+
+class BrokerEngineClient:
+    """
+    engine_broker.py に接続するクライアント。KataGoDriver と同じ呼び出し方
+    （analyze_situation / query / is_alive / close）で、ブローカーが保持するエンジンを使う。
+    1本の接続上で複数のリクエストを同時に送り、受信スレッドが ID ごとに結果を振り分ける。
+    接続は初回利用時に確立し、切断された場合は次の呼び出しで再接続する。
+    """
+
+    supervisor = None  # エンジンの監視はブローカー側で行う
+
+    def __init__(self, address, authkey=None, timeout=60, connect_timeout=10):
+        self.address = address
+        self.authkey = authkey or load_broker_authkey()
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending = {}  # request id -> (Future, 送信した接続)
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._closed = False
+
+    # --- 接続管理 ---
+
+    def _connection(self):
+        with self._conn_lock:
+            if self._conn is None:
+                deadline = time.monotonic() + self.connect_timeout
+                while True:
+                    try:
+                        self._conn = Client(self.address, authkey=self.authkey)
+                        break
+                    except (OSError, EOFError):
+                        if time.monotonic() >= deadline: raise
+                        time.sleep(0.2)  # ブローカーの起動待ち
+                threading.Thread(target=self._read_loop, args=(self._conn,), daemon=True, name="broker-client").start()
+            return self._conn
+
+    def _read_loop(self, conn):
+        try:
+            while True:
+                msg = conn.recv()
+                with self._pending_lock:
+                    future, _ = self._pending.pop(msg.get("id"), (None, None))
+                if future is None: continue  # タイムアウト済み
+                if "error" in msg:
+                    future.set_result({"error": msg["error"]})
+                else:
+                    future.set_result(msg.get("result"))
+        except (EOFError, OSError):
+            pass
+        with self._conn_lock:
+            if self._conn is conn: self._conn = None
+        conn.close()
+        self._fail_pending(conn, "Engine broker disconnected")
+
+    def _fail_pending(self, conn, message):
+        """切断された接続で送信済みのリクエストをエラーで完了させる"""
+        with self._pending_lock:
+            lost = [rid for rid, (_, c) in self._pending.items() if c is conn]
+            futures = [self._pending.pop(rid)[0] for rid in lost]
+        for f in futures:
+            if not f.done(): f.set_result({"error": message})
+
+    def _call(self, op, timeout=None, **kwargs):
+        if self._closed: return {"error": "Engine closed"}
+        t0 = time.perf_counter()
+        try:
+            conn = self._connection()
+        except (OSError, EOFError) as e:
+            return {"error": f"Engine broker unavailable: {e}"}
+        except AuthenticationError as e:
+            # 鍵の異なる相手（別のユーザーが先に待ち受けているなど）とは通信しない
+            return {"error": f"Engine broker authentication failed: {e}"}
+        req_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[req_id] = (future, conn)
+        try:
+            with self._send_lock:
+                conn.send({"id": req_id, "op": op, "kwargs": kwargs})
+            result = future.result(timeout=timeout or self.timeout)
+        except (OSError, EOFError) as e:
+            with self._conn_lock:
+                if self._conn is conn: self._conn = None  # 次の呼び出しで再接続する
+            result = {"error": f"Engine broker disconnected: {e}"}
+        except FutureTimeoutError:
+            result = {"error": "Read timeout"}
+        finally:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+        BROKER_CLIENT_TIME.observe(time.perf_counter() - t0, op=op)
+        return result
+
+    # --- KataGoDriver 互換 ---
+
+    def analyze_situation(self, moves, board_size=19, priority=False, visits=500, include_ownership=True, include_influence=True,
+                          max_time=None, tag=None):
+        return self._call("analyze_situation", timeout=self._timeout_for(max_time), moves=[list(m) for m in moves],
+                          board_size=board_size, priority=priority, visits=visits, include_ownership=include_ownership,
+                          include_influence=include_influence, max_time=max_time, tag=tag)
+
+    def query(self, moves, board_size=19, visits=500, priority=False, include_ownership=True, include_influence=True,
+              max_time=None, tag=None):
+        return self._call("query", timeout=self._timeout_for(max_time), moves=[list(m) for m in moves], board_size=board_size,
+                          visits=visits, priority=priority, include_ownership=include_ownership,
+                          include_influence=include_influence, max_time=max_time, tag=tag)
+
+    def cancel(self, tag):
+        """ブローカー上で tag を付けて送信したクエリを打ち切る（打ち切った数を返す）"""
+        result = self._call("cancel", timeout=5, tag=tag)
+        return result if isinstance(result, int) else 0
+
+    def _timeout_for(self, max_time):
+        """探索時間の上限がある場合は、ブローカー側の猶予を含めた時間だけ待つ"""
+        return None if max_time is None else max_time + MAX_TIME_GRACE + 1.0
+
+    def status(self) -> dict:
+        return self._call("status", timeout=5)
+
+    def is_alive(self):
+        status = self.status()
+        return bool(status.get("alive")) if "error" not in status else False
+
+    def close(self):
+        self._closed = True
+        with self._conn_lock:
+            conn, self._conn = self._conn, None
+        if conn: conn.close()
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+from utils.logger import logger
+
+
+class EngineSupervisor:
+    """
+    KataGo プロセスを監視し、異常終了時にバックオフ付きで再起動するスーパーバイザ。
+    再起動後は直近に解析した局面を低Visitsで投げ直し、NNキャッシュを温めてから
+    待機中のクエリを再開させる。
+    """
+
+    def __init__(self, driver, backoff_initial: float = 0.5, backoff_max: float = 10.0,
+                 warmup_positions: int = 8, warmup_visits: int = 2,
+                 poll_interval: float = 0.2, ready_timeout: float = 60.0, stable_after: float = 60.0):
+        self.driver = driver
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.warmup_visits = warmup_visits
+        self.poll_interval = poll_interval
+        self.ready_timeout = ready_timeout
+        self.stable_after = stable_after
+
+        # 統計情報
+        self.restart_count = 0
+        self.failed_restarts = 0
+        self.replayed_queries = 0
+        self.last_crash_time: Optional[float] = None
+        self.last_time_to_ready: Optional[float] = None
+        self.last_warmup_seconds: Optional[float] = None
+
+        self._recent = deque(maxlen=warmup_positions)
+        self._recent_lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._crash_event = threading.Event()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._consecutive_failures = 0
+        self._ready_since = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """監視スレッドを開始する（エンジンは起動済みであること）"""
+        if self.driver.is_alive():
+            self._mark_ready()
+        self._thread = threading.Thread(target=self._watch_loop, name="EngineSupervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._crash_event.set()
+        self._ready.set()  # 待機中の呼び出し元を解放する
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set() and not self._stopped.is_set()
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        """エンジンがクエリを受け付けられる状態になるまで待機する"""
+        return self._ready.wait(timeout) and not self._stopped.is_set()
+
+    def notify_crash(self):
+        """
+        ドライバがプロセスの異常終了を検知した際に呼ぶ（ポーリングを待たずに再起動する）。
+        受付停止は実際に再起動する _restart で行う（誤検知でプロセスが生きていた場合に停止したままにしない）。
+        """
+        self._crash_event.set()
+
+    def record_position(self, moves, board_size: int):
+        """ウォームアップ用に直近の解析局面を記録する"""
+        if self._recent.maxlen == 0:
+            return
+        with self._recent_lock:
+            self._recent.append((list(moves), board_size))
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.is_ready,
+            "restart_count": self.restart_count,
+            "failed_restarts": self.failed_restarts,
+            "replayed_queries": self.replayed_queries,
+            "consecutive_failures": self._consecutive_failures,
+            "last_crash_time": self.last_crash_time,
+            "last_time_to_ready": self.last_time_to_ready,
+            "last_warmup_seconds": self.last_warmup_seconds,
+        }
+
+    def _mark_ready(self):
+        self._ready_since = time.time()
+        self._ready.set()
+
+    def _watch_loop(self):
+        while not self._stopped.is_set():
+            self._crash_event.wait(self.poll_interval)
+            self._crash_event.clear()
+            if self._stopped.is_set():
+                break
+            if self.driver.is_alive():
+                if not self._ready.is_set():
+                    self._mark_ready()
+                # 一定時間安定稼働したらバックオフをリセットする
+                if self._consecutive_failures and time.time() - self._ready_since > self.stable_after:
+                    self._consecutive_failures = 0
+                continue
+            self._restart()
+
+    def _restart(self):
+        with self._restart_lock:
+            if self._stopped.is_set() or self.driver.is_alive():
+                return
+            self._ready.clear()
+            crash_time = time.time()
+            self.last_crash_time = crash_time
+            code = self.driver.process.poll() if self.driver.process else None
+            logger.error(f"KataGo process died (exit code: {code}). Restarting...", layer="SUPERVISOR")
+
+            while not self._stopped.is_set():
+                delay = min(self.backoff_max, self.backoff_initial * (2 ** self._consecutive_failures))
+                self._consecutive_failures += 1
+                if self._stopped.wait(delay):
+                    return
+
+                self.driver.spawn_process(log_mode="a")
+                if self.driver.probe(timeout=self.ready_timeout):
+                    break
+                self.failed_restarts += 1
+                logger.warning(f"KataGo restart attempt failed (consecutive: {self._consecutive_failures})", layer="SUPERVISOR")
+                self.driver.kill_process()
+
+            if self._stopped.is_set():
+                return
+
+            self.restart_count += 1
+            self.last_time_to_ready = time.time() - crash_time
+            # 応答を待っている呼び出し元を優先し、ウォームアップより先に再送する
+            self.replayed_queries += self.driver.replay_pending()
+            self._warmup()
+            self._mark_ready()
+            logger.info(f"KataGo restarted (count: {self.restart_count}, time to ready: {self.last_time_to_ready:.2f}s, "
+                        f"warmup: {self.last_warmup_seconds:.2f}s)", layer="SUPERVISOR")
+
+    def _warmup(self):
+        """直近の局面を低Visitsで解析し、NNキャッシュを温める"""
+        t0 = time.time()
+        with self._recent_lock:
+            positions = list(self._recent)
+        for moves, board_size in positions:
+            if self._stopped.is_set() or not self.driver.is_alive():
+                break
+            self.driver.warm_position(moves, board_size, visits=self.warmup_visits)
+        self.last_warmup_seconds = time.time() - t0
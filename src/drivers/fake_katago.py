@@ -0,0 +1,261 @@
+"""
+KataGo Analysis Engine の代替となる決定論的な偽エンジン。
+
+本物の KataGo バイナリやモデルが無い環境（CPUのみのCI等）で、
+KataGoDriver / katago_api / 一括解析パイプラインを検証・ベンチマークするために使用する。
+標準入力から KataGo の解析クエリ(JSON Lines)を受け取り、局面から導出した
+シード値で勝率・Ownership・Influence・PV を生成して標準出力へ返す。
+
+起動例:
+    python fake_katago.py analysis -config x.cfg -model x.bin.gz --latency-ms 20
+
+KataGoDriver からは固定引数で起動されるため、各オプションは環境変数でも指定できる:
+    FAKE_KATAGO_LATENCY_MS     1クエリあたりの基本遅延 (ms)
+    FAKE_KATAGO_MS_PER_VISIT   maxVisits 1 あたりの追加遅延 (ms)（overrideSettings.maxTime があればそれを上限とする）
+    FAKE_KATAGO_CONCURRENCY    同時に処理するクエリ数
+    FAKE_KATAGO_SEED           出力のシード
+    FAKE_KATAGO_CRASH_AFTER    N件目のクエリ受信時にプロセスを異常終了させる
+    FAKE_KATAGO_STALL_AFTER    N件目以降のクエリで応答を停止する
+    FAKE_KATAGO_STALL_SECONDS  停止時間 (0 の場合は無期限)
+    FAKE_KATAGO_MALFORMED_RATE 応答の前に壊れた行を出力する確率 (0.0 - 1.0)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+COLS = "ABCDEFGHJKLMNOPQRST"
+VERSION = "1.12.4-fake"
+
+
+def _env(name, default, cast):
+    val = os.environ.get(name)
+    if val is None or val == "":
+        return default
+    try:
+        return cast(val)
+    except ValueError:
+        return default
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Deterministic fake KataGo analysis engine")
+    parser.add_argument("mode", nargs="?", default="analysis")
+    # KataGo 互換の引数（値は無視する）
+    parser.add_argument("-config", default=None)
+    parser.add_argument("-model", default=None)
+    parser.add_argument("--latency-ms", type=float, default=_env("FAKE_KATAGO_LATENCY_MS", 0.0, float))
+    parser.add_argument("--ms-per-visit", type=float, default=_env("FAKE_KATAGO_MS_PER_VISIT", 0.0, float))
+    parser.add_argument("--concurrency", type=int, default=_env("FAKE_KATAGO_CONCURRENCY", 4, int))
+    parser.add_argument("--seed", type=int, default=_env("FAKE_KATAGO_SEED", 0, int))
+    parser.add_argument("--crash-after", type=int, default=_env("FAKE_KATAGO_CRASH_AFTER", 0, int))
+    parser.add_argument("--stall-after", type=int, default=_env("FAKE_KATAGO_STALL_AFTER", 0, int))
+    parser.add_argument("--stall-seconds", type=float, default=_env("FAKE_KATAGO_STALL_SECONDS", 0.0, float))
+    parser.add_argument("--malformed-rate", type=float, default=_env("FAKE_KATAGO_MALFORMED_RATE", 0.0, float))
+    return parser.parse_args(argv)
+
+
+def gtp_to_rc(vertex, board_size):
+    """GTP座標を (KataGo行, 列) に変換する。行0が盤面の最上段。"""
+    if not vertex or vertex.lower() == "pass" or len(vertex) < 2:
+        return None
+    col = COLS.find(vertex[0].upper())
+    if col < 0 or not vertex[1:].isdigit():
+        return None
+    row = int(vertex[1:])
+    if not (1 <= row <= board_size) or col >= board_size:
+        return None
+    return board_size - row, col
+
+
+def rc_to_gtp(r, c, board_size):
+    return f"{COLS[c]}{board_size - r}"
+
+
+class FakeAnalysis:
+    """局面（着手列）から決定論的な解析結果を生成する"""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def _position_seed(self, query):
+        key = json.dumps([query.get("moves", []), query.get("boardXSize", 19), query.get("komi"), self.seed],
+                         sort_keys=True)
+        return int(hashlib.sha256(key.encode()).hexdigest()[:16], 16)
+
+    def analyze(self, query):
+        size = int(query.get("boardXSize", 19))
+        moves = query.get("moves", [])
+        rng = random.Random(self._position_seed(query))
+
+        # 取り石の処理は行わず、着手点だけを配置した簡易盤面
+        stones = {}
+        for color, vertex in moves:
+            rc = gtp_to_rc(vertex, size)
+            if rc:
+                stones[rc] = 1.0 if str(color).upper().startswith("B") else -1.0
+
+        white_to_move = len(moves) % 2 == 1
+        sign = -1.0 if white_to_move else 1.0  # 手番側視点へ変換
+
+        # 黒視点の Ownership: 石の周囲に減衰する影響 + 局面依存のノイズ
+        black_own = []
+        for r in range(size):
+            for c in range(size):
+                v = rng.uniform(-0.15, 0.15)
+                for (sr, sc), s in stones.items():
+                    d = abs(sr - r) + abs(sc - c)
+                    if d <= 3:
+                        v += s * (0.9 if d == 0 else 0.5 / d)
+                black_own.append(max(-1.0, min(1.0, v)))
+
+        bias = sum(black_own) / len(black_own)
+        black_winrate = max(0.01, min(0.99, 0.5 + bias * 2.0 + rng.uniform(-0.05, 0.05)))
+        black_score = bias * size * size * 0.5 + rng.uniform(-1.0, 1.0)
+
+        empties = [(r, c) for r in range(size) for c in range(size) if (r, c) not in stones]
+        rng.shuffle(empties)
+        visits = int(query.get("maxVisits", 100))
+
+        move_infos = []
+        for order, (r, c) in enumerate(empties[:5]):
+            pv_points = [(r, c)] + [p for p in empties[5:] if p != (r, c)][order:order + 9]
+            cand_wr = max(0.01, min(0.99, black_winrate - 0.02 * order))
+            cand_score = black_score - 0.7 * order
+            move_infos.append({
+                "move": rc_to_gtp(r, c, size),
+                "order": order,
+                "visits": max(1, visits // (order + 2)),
+                "winrate": 0.5 + sign * (cand_wr - 0.5),
+                "scoreLead": sign * cand_score,
+                "prior": round(1.0 / (order + 2), 4),
+                "pv": [rc_to_gtp(pr, pc, size) for pr, pc in pv_points],
+            })
+
+        resp = {
+            "id": query["id"],
+            "isDuringSearch": False,
+            "turnNumber": len(moves),
+            "moveInfos": move_infos,
+            "rootInfo": {
+                "winrate": 0.5 + sign * (black_winrate - 0.5),
+                "scoreLead": sign * black_score,
+                "visits": visits,
+                "currentPlayer": "W" if white_to_move else "B",
+            },
+        }
+        if query.get("includeOwnership"):
+            resp["ownership"] = [round(sign * v, 4) for v in black_own]
+        if query.get("includeInfluence"):
+            inf = []
+            for i, v in enumerate(black_own):
+                r, c = divmod(i, size)
+                edge = min(r, c, size - 1 - r, size - 1 - c)
+                inf.append(round(sign * v * (0.6 + 0.1 * min(edge, 4)), 4))
+            resp["influence"] = inf
+        return resp
+
+
+class FakeKataGo:
+    """標準入出力で KataGo Analysis Engine のプロトコルを話すサーバー"""
+
+    def __init__(self, args, stdin=None, stdout=None):
+        self.args = args
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.analysis = FakeAnalysis(args.seed)
+        self.fault_rng = random.Random(args.seed ^ 0x5F5F)
+        self.write_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.terminated = set()
+        self.closing = threading.Event()
+        self.received = 0
+        self.executor = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+
+    def _write(self, obj):
+        line = json.dumps(obj)
+        with self.write_lock:
+            if self.args.malformed_rate > 0 and self.fault_rng.random() < self.args.malformed_rate:
+                self.stdout.write('{"id": "corrupt", "moveInfos": [\n')
+            self.stdout.write(line + "\n")
+            self.stdout.flush()
+
+    def _handle_query(self, query, index):
+        if self.args.stall_after and index >= self.args.stall_after:
+            # stall_seconds が 0 の場合は入力が閉じられるまで応答しない
+            self.closing.wait(self.args.stall_seconds or None)
+            if self.closing.is_set():
+                return
+
+        delay = self.args.latency_ms + self.args.ms_per_visit * int(query.get("maxVisits", 0))
+        max_time = (query.get("overrideSettings") or {}).get("maxTime")
+        if max_time is not None:
+            delay = min(delay, float(max_time) * 1000.0)
+        deadline = time.time() + delay / 1000.0
+        while time.time() < deadline:
+            with self.pending_lock:
+                if query["id"] in self.terminated:
+                    break
+            time.sleep(min(0.005, max(0.0, deadline - time.time())))
+
+        try:
+            self._write(self.analysis.analyze(query))
+        except Exception as e:
+            self._write({"id": query.get("id"), "error": f"Internal error: {e}"})
+
+    def handle_line(self, line):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            query = json.loads(line)
+        except json.JSONDecodeError:
+            self._write({"error": "Could not parse input line as json request"})
+            return
+        if "id" not in query:
+            self._write({"error": "Request did not specify an id"})
+            return
+
+        action = query.get("action")
+        if action == "query_version":
+            self._write({"id": query["id"], "version": VERSION, "git_hash": "fake"})
+            return
+        if action == "terminate":
+            with self.pending_lock:
+                self.terminated.add(query.get("terminateId"))
+            self._write({"id": query["id"], "action": "terminate", "terminateId": query.get("terminateId")})
+            return
+        if action == "clear_cache":
+            self._write({"id": query["id"], "action": "clear_cache"})
+            return
+        if "moves" not in query:
+            self._write({"id": query["id"], "error": "'moves' field is required", "field": "moves"})
+            return
+
+        self.received += 1
+        if self.args.crash_after and self.received >= self.args.crash_after:
+            sys.stderr.write("FAKE KATAGO: injected crash\n")
+            sys.stderr.flush()
+            os._exit(3)
+        self.executor.submit(self._handle_query, query, self.received)
+
+    def serve(self):
+        sys.stderr.write(f"KataGo v{VERSION}\nStarted, ready to begin handling requests\n")
+        sys.stderr.flush()
+        for line in self.stdin:
+            self.handle_line(line)
+        self.closing.set()
+        self.executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    FakeKataGo(parse_args(argv)).serve()
+
+
+if __name__ == "__main__":
+    main()
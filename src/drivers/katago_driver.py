@@ -3,8 +3,48 @@ import json
 import os
 import sys
 import threading
+import itertools
 import time
-import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
+from drivers.engine_supervisor import EngineSupervisor
+from utils.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson は任意依存（無い場合は標準の json を使う）
+    orjson = None
+
+if orjson is not None:
+    _loads = orjson.loads
+    def _dumps(obj): return orjson.dumps(obj).decode("utf-8")
+else:
+    _loads = json.loads
+    _dumps = json.dumps
+
+ENGINE_QUEUE_WAIT = metrics.histogram("katago_driver_queue_wait_seconds", "Time a query waited in the driver before being sent to the engine")
+ENGINE_QUERY_TIME = metrics.histogram("katago_engine_query_seconds", "Time from sending a query to receiving its final response")
+ENGINE_VISITS_PER_SECOND = metrics.histogram("katago_engine_visits_per_second", "Search speed per query (root visits / engine time)",
+                                             buckets=(50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000))
+ENGINE_QUERIES = metrics.counter("katago_engine_queries_total", "Engine queries by outcome")
+ENGINE_IN_FLIGHT = metrics.gauge("katago_engine_in_flight", "Queries sent to the engine and awaiting a response")
+
+# maxTime を指定したクエリの応答待ちに上乗せする猶予（秒）。過ぎた場合は terminate を送って打ち切る
+MAX_TIME_GRACE = 1.0
+# cancel(tag) で打ち切られたクエリの応答
+CANCELLED = "Cancelled"
+
+
+class _PendingQuery:
+    """応答待ちのクエリ（再起動後に再送できるよう本文を保持する）"""
+    __slots__ = ("query", "future", "replays", "tag")
+
+    def __init__(self, query, tag=None):
+        self.query = query
+        self.future = Future()
+        self.replays = 0
+        self.tag = tag  # cancel(tag) でまとめて打ち切るための呼び出し元の識別子
+
 
 class KataGoDriver:
     _instance = None
@@ -18,20 +58,36 @@ class KataGoDriver:
                     cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, katago_path=None, config_path=None, model_path=None):
+    def __init__(self, katago_path=None, config_path=None, model_path=None, supervise=True, warmup_positions=8):
         if self._initialized: return
         self.katago_path = katago_path
         self.config_path = config_path
         self.model_path = model_path
         self.process = None
-        self.comm_lock = threading.Lock() 
-        self.priority_mode = threading.Event() 
+        self._write_lock = threading.Lock()
+        self._pending = {}  # query id -> _PendingQuery
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        self._query_counter = itertools.count(1)
+        self.max_replays = 2
+        self.query_timeout = 30
+        self.restart_wait_timeout = 30
+        ENGINE_IN_FLIGHT.set_function(lambda: len(self._pending))
         self.start_engine()
+        self.supervisor = EngineSupervisor(self, warmup_positions=warmup_positions) if supervise else None
+        if self.supervisor: self.supervisor.start()
         self._initialized = True
 
     def start_engine(self):
         if self.process and self.process.poll() is None: return
+        self.spawn_process()
+
+    def spawn_process(self, log_mode="w"):
+        """エンジンプロセスを起動する（再起動時は log_mode="a" でログを追記する）"""
         cmd = [self.katago_path, "analysis", "-config", self.config_path, "-model", self.model_path]
+        if self.katago_path and self.katago_path.endswith(".py"):
+            # 偽エンジン (drivers/fake_katago.py) などのスクリプトは現在のインタプリタで起動する
+            cmd.insert(0, sys.executable)
         env = os.environ.copy()
         env["PYTHONIOENCODING"] = "utf-8"
         try:
@@ -39,27 +95,155 @@ class KataGoDriver:
             if os.name == 'nt':
                 startupinfo = subprocess.STARTUPINFO()
                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                            text=True, bufsize=1, startupinfo=startupinfo, encoding='utf-8', env=env)
-            threading.Thread(target=self._consume_stderr, daemon=True).start()
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    text=True, bufsize=1, startupinfo=startupinfo, encoding='utf-8', env=env)
+            self.process = proc
+            threading.Thread(target=self._consume_stderr, args=(proc, log_mode), daemon=True).start()
+            threading.Thread(target=self._read_stdout, args=(proc,), name="KataGoReader", daemon=True).start()
             print("DEBUG: KataGo Engine started.")
         except Exception as e: print(f"Error starting KataGo: {e}")
 
-    def _consume_stderr(self):
-        with open("katago_debug.log", "w", encoding="utf-8") as f:
-            while self.process and self.process.poll() is None:
-                line = self.process.stderr.readline()
+    def _consume_stderr(self, proc, log_mode="w"):
+        with open("katago_debug.log", log_mode, encoding="utf-8") as f:
+            while proc.poll() is None:
+                line = proc.stderr.readline()
                 if not line: break
                 f.write(line); f.flush()
 
-    def query(self, moves, board_size=19, visits=500, priority=False, include_ownership=True, include_influence=True):
-        if not self.process or self.process.poll() is not None: self.start_engine()
-        if priority: self.priority_mode.set()
-        query_id = f"q_{int(time.time() * 1000)}"
-        
+    def _read_stdout(self, proc):
+        """
+        標準出力の読み取りスレッド。
+        readline はデータ到着までブロックするためポーリング遅延が無く、
+        各行は一度だけデコードして ID で待機中のクエリへ振り分ける。
+        """
+        for line in iter(proc.stdout.readline, ""):
+            if not line.strip(): continue
+            try:
+                resp = _loads(line)
+            except ValueError:
+                continue  # 壊れた行は読み飛ばす
+            if not isinstance(resp, dict): continue
+            # 探索途中の報告や警告のみの行は最終応答ではない
+            if resp.get("isDuringSearch") or ("warning" in resp and "error" not in resp): continue
+            with self._pending_lock:
+                pending = self._pending.pop(resp.get("id"), None)
+            if pending and not pending.future.done():
+                pending.future.set_result(resp)
+        self._on_stdout_closed(proc)
+
+    def _on_stdout_closed(self, proc):
+        """出力が閉じられた（プロセス終了）際の後始末"""
+        if proc is not self.process: return  # 再起動前の古いプロセス
+        if self.supervisor and not self._closed:
+            # 待機中のクエリは保持したまま再起動させ、replay_pending で再送する
+            self.supervisor.notify_crash()
+            return
+        self._fail_pending("Engine closed" if self._closed else "Engine crashed")
+
+    def _fail_pending(self, message):
+        with self._pending_lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for p in pending:
+            if not p.future.done(): p.future.set_result({"error": message})
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def kill_process(self):
+        if self.process:
+            try: self.process.kill()
+            except Exception: pass
+
+    def _next_query_id(self):
+        return f"q_{next(self._query_counter)}"
+
+    def _write(self, obj):
+        proc = self.process
+        with self._write_lock:
+            proc.stdin.write(_dumps(obj) + "\n"); proc.stdin.flush()
+
+    def submit(self, query, tag=None):
+        """クエリを送信し、応答を受け取る Future を返す（応答は読み取りスレッドが設定する）"""
+        pending = _PendingQuery(query, tag)
+        with self._pending_lock:
+            self._pending[query["id"]] = pending
+        try:
+            self._write(query)
+        except (OSError, ValueError, AttributeError):
+            # パイプ切断: スーパーバイザ配下では再起動後に再送されるため保持する
+            if self.supervisor and not self._closed:
+                self.supervisor.notify_crash()
+            else:
+                with self._pending_lock:
+                    self._pending.pop(query["id"], None)
+                pending.future.set_result({"error": "Engine crashed"})
+        return pending.future
+
+    def _request(self, query, timeout=None, tag=None):
+        """クエリを送信して応答を待つ（タイムアウト時はエンジン側の探索も打ち切る）"""
+        future = self.submit(query, tag)
+        try:
+            return future.result(timeout or self.query_timeout)
+        except FutureTimeout:
+            with self._pending_lock:
+                self._pending.pop(query["id"], None)
+            try: self._write({"id": self._next_query_id(), "action": "terminate", "terminateId": query["id"]})
+            except Exception: pass
+            return {"error": "Read timeout"}
+
+    def cancel(self, tag):
+        """tag を付けて送信した応答待ちのクエリを全て打ち切る（エンジンへ terminate を送り、待機側には即座に返す）"""
+        with self._pending_lock:
+            ids = [qid for qid, p in self._pending.items() if p.tag == tag]
+            cancelled = [self._pending.pop(qid) for qid in ids]
+        for p in cancelled:
+            try: self._write({"id": self._next_query_id(), "action": "terminate", "terminateId": p.query["id"]})
+            except Exception: pass
+            if not p.future.done(): p.future.set_result({"error": CANCELLED})
+        if cancelled:
+            print(f"DEBUG: Cancelled {len(cancelled)} engine queries (tag={tag}).")
+        return len(cancelled)
+
+    def replay_pending(self):
+        """再起動直後に、応答を受け取れなかったクエリを新しいプロセスへ再送する（再送件数を返す）"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        replayed = 0
+        for p in pending:
+            p.replays += 1
+            if p.replays > self.max_replays:
+                with self._pending_lock:
+                    self._pending.pop(p.query["id"], None)
+                p.future.set_result({"error": "Engine crashed"})
+                continue
+            try:
+                self._write(p.query)
+                replayed += 1
+            except Exception:
+                break
+        if replayed:
+            print(f"DEBUG: Replayed {replayed} in-flight queries after engine restart.")
+        return replayed
+
+    def probe(self, timeout=30):
+        """query_version でエンジンが応答可能かを確認する"""
+        if not self.is_alive(): return False
+        try:
+            resp = self._request({"id": self._next_query_id(), "action": "query_version"}, timeout=timeout)
+        except Exception:
+            return False
+        return "error" not in resp
+
+    def warm_position(self, moves, board_size=19, visits=2):
+        """NNキャッシュのウォームアップ用に低Visitsで解析する（結果は破棄）"""
+        query = self._build_query(moves, board_size, visits, include_ownership=False, include_influence=False)
+        try: self._request(query)
+        except Exception: pass
+
+    def _build_query(self, moves, board_size, visits, include_ownership, include_influence, priority=False, max_time=None):
         # KataGo Analysis Query Format
         query = {
-            "id": query_id,
+            "id": self._next_query_id(),
             "moves": moves,
             "rules": "japanese",
             "komi": 6.5,
@@ -71,34 +255,51 @@ class KataGoDriver:
             "includeOwnershipStdev": False,
             "maxVisits": visits
         }
-        
-        lock_timeout = 60 if priority else 1
+        # 複数クエリを同時に投げるため、優先度はエンジン側のスケジューリングに委ねる
+        if priority: query["priority"] = 1
+        # 締め切りがある場合は探索時間の上限を指定し、エンジン側で打ち切らせる
+        if max_time is not None: query["overrideSettings"] = {"maxTime": round(max_time, 3)}
+        return query
+
+    def query(self, moves, board_size=19, visits=500, priority=False, include_ownership=True, include_influence=True,
+              max_time=None, tag=None):
+        """
+        max_time（秒）を指定すると探索をその時間で打ち切り、応答待ちも max_time + MAX_TIME_GRACE 秒までとする。
+        tag を付けたクエリは cancel(tag) で打ち切れる。
+        """
+        if self._closed: return {"error": "Engine closed"}
+        if not self.supervisor and not self.is_alive(): self.start_engine()
         try:
-            lock_acquired = self.comm_lock.acquire(timeout=lock_timeout)
-            if not lock_acquired: return {"error": "Engine busy"}
-            try:
-                self.process.stdin.write(json.dumps(query) + "\n"); self.process.stdin.flush()
-                start_time = time.time()
-                while True:
-                    if self.process.poll() is not None: return {"error": "Engine crashed"}
-                    line = self.process.stdout.readline()
-                    if not line:
-                        if time.time() - start_time > 30: return {"error": "Read timeout"}
-                        time.sleep(0.05); continue
-                    try:
-                        resp = json.loads(line)
-                        if resp.get("id") == query_id:
-                            return resp
-                    except: continue
-            finally:
-                self.comm_lock.release()
-                if priority: self.priority_mode.clear()
+            # 再起動中であれば、準備完了まで待ってから送信（クラッシュ時の再送は replay_pending が行う）
+            t_enqueue = time.perf_counter()
+            ready_timeout = self.restart_wait_timeout if max_time is None else min(self.restart_wait_timeout, max_time)
+            if self.supervisor and not self.supervisor.wait_until_ready(ready_timeout):
+                ENGINE_QUERIES.inc(result="not_ready")
+                return {"error": "Engine not ready"}
+            t_sent = time.perf_counter()
+            ENGINE_QUEUE_WAIT.observe(t_sent - t_enqueue)
+
+            query = self._build_query(moves, board_size, visits, include_ownership, include_influence, priority, max_time)
+            resp = self._request(query, timeout=None if max_time is None else max_time + MAX_TIME_GRACE, tag=tag)
+            elapsed = time.perf_counter() - t_sent
+            if "error" in resp:
+                ENGINE_QUERIES.inc(result={"Read timeout": "timeout", CANCELLED: "cancelled"}.get(resp["error"], "error"))
+                return resp
+
+            ENGINE_QUERIES.inc(result="ok")
+            ENGINE_QUERY_TIME.observe(elapsed)
+            root_visits = resp.get("rootInfo", {}).get("visits")
+            if root_visits and elapsed > 0:
+                ENGINE_VISITS_PER_SECOND.observe(root_visits / elapsed)
+            if self.supervisor:
+                self.supervisor.record_position(moves, board_size)
+            return resp
         except Exception as e:
-            if priority: self.priority_mode.clear()
+            ENGINE_QUERIES.inc(result="error")
             return {"error": str(e)}
-        return {"error": "Unknown error"}
 
-    def analyze_situation(self, moves, board_size=19, priority=False, visits=500, include_ownership=True, include_influence=True):
+    def analyze_situation(self, moves, board_size=19, priority=False, visits=500, include_ownership=True, include_influence=True,
+                          max_time=None, tag=None):
         clean_moves = []
         for m in moves:
             if isinstance(m, (list, tuple)) and len(m) >= 2:
@@ -110,7 +311,9 @@ class KataGoDriver:
             priority=priority, 
             visits=visits,
             include_ownership=include_ownership,
-            include_influence=include_influence
+            include_influence=include_influence,
+            max_time=max_time,
+            tag=tag
         )
         if "error" in data: return data
 
@@ -128,19 +331,18 @@ class KataGoDriver:
         final_winrate = 1.0 - current_winrate if is_white_turn else current_winrate
         final_score = -current_score if is_white_turn else current_score
         
-        # Ownershipの抽出と正規化 (data直下にある場合とrootInfoにある場合の両対応)
+        # Ownership/Influenceの抽出と正規化 (data直下にある場合とrootInfoにある場合の両対応)
+        # float32配列のまま符号反転し、リスト内包表記によるコピーを避ける
+        sign = np.float32(-1.0 if is_white_turn else 1.0)
+        final_ownership = None
         raw_ownership = data.get('ownership') or root.get('ownership')
         if raw_ownership:
-            final_ownership = [-v for v in raw_ownership] if is_white_turn else raw_ownership
-        else:
-            final_ownership = []
+            final_ownership = np.asarray(raw_ownership, dtype=np.float32) * sign
 
-        # Influenceの抽出と正規化
+        final_influence = None
         raw_influence = data.get('influence') or root.get('influence')
         if raw_influence:
-            final_influence = [-v for v in raw_influence] if is_white_turn else raw_influence
-        else:
-            final_influence = []
+            final_influence = np.asarray(raw_influence, dtype=np.float32) * sign
 
         res = {
             "winrate": final_winrate, 
@@ -165,4 +367,7 @@ class KataGoDriver:
         return res
 
     def close(self):
+        self._closed = True
+        if self.supervisor: self.supervisor.stop()
         if self.process: self.process.terminate()
+        self._fail_pending("Engine closed")
@@ -0,0 +1,210 @@
+"""
+エンジンブローカー。
+KataGo エンジンと解析結果キャッシュを1プロセスで保持し、ローカルソケット（Windows では名前付きパイプ）経由で
+複数の API ワーカープロセスから共有できるようにする。クライアントは drivers/broker_client.py を使う。
+
+    python engine_broker.py [--address ADDRESS]
+    GOAI_ENGINE_BROKER=ADDRESS python katago_api.py
+"""
+import argparse
+import getpass
+import os
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
+from utils.single_flight import SingleFlight
+from utils.metrics import metrics
+from config import (KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL, KATAGO_MAX_CONCURRENCY,
+                    ENGINE_BROKER_ADDRESS, ENGINE_BROKER_CACHE_SIZE, load_broker_authkey, private_runtime_dir)
+
+BROKER_REQUESTS = metrics.counter("engine_broker_requests_total", "Broker requests by operation and cache result")
+BROKER_CLIENTS = metrics.gauge("engine_broker_clients", "Connected broker clients")
+
+
+def default_broker_address() -> str:
+    """
+    ユーザーごとの待ち受けアドレス（Unix ではユーザー専用ディレクトリ内のソケット）。
+    名前付きパイプは他のユーザーからも見えるが、接続時に双方が認証鍵を確かめるため鍵を持たない相手とは通信しない。
+    """
+    if sys.platform == "win32":
+        return rf"\\.\pipe\goai-engine-broker-{getpass.getuser()}"
+    return os.path.join(private_runtime_dir(), "engine-broker.sock")
+
+
+class EngineBroker:
+    """
+    接続ごとのスレッドでリクエスト（{"id", "op", "kwargs"}）を受け取り、エンジン呼び出しは共有のスレッドプールで実行する。
+    同一局面の解析は全クライアント共通の LRU キャッシュと SingleFlight でまとめる。
+    """
+
+    def __init__(self, driver, address=None, authkey=None,
+                 max_concurrency=KATAGO_MAX_CONCURRENCY, cache_size=ENGINE_BROKER_CACHE_SIZE):
+        self.driver = driver
+        self.address = address or default_broker_address()
+        self.authkey = authkey or load_broker_authkey()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._flight = SingleFlight("broker")
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="broker-engine")
+        self._listener = None
+        self._connections = set()
+        self._conn_lock = threading.Lock()
+        self._closed = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        BROKER_CLIENTS.set_function(lambda: len(self._connections))
+
+    # --- 接続管理 ---
+
+    def start(self):
+        """待ち受けを開始する（受け付けはバックグラウンドスレッドで行う）"""
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.unlink(self.address)  # 前回異常終了時のソケットファイル
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, daemon=True, name="broker-accept").start()
+        print(f"DEBUG: Engine broker listening on {self.address}")
+        return self
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._closed: break
+                print(f"DEBUG: Broker accept failed: {e}")
+                continue
+            with self._conn_lock:
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True, name="broker-conn").start()
+
+    def _serve(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(req_id, future):
+            try:
+                msg = {"id": req_id, "result": future.result()}
+            except Exception as e:
+                msg = {"id": req_id, "error": str(e)}
+            try:
+                with send_lock:
+                    conn.send(msg)
+            except (OSError, EOFError):
+                pass  # クライアント切断済み
+
+        try:
+            while not self._closed:
+                req = conn.recv()
+                if req.get("op") == "cancel":
+                    # エンジン呼び出しでスレッドプールが埋まっていても待たずに打ち切る
+                    future = Future()
+                    future.set_result(self.handle("cancel", req.get("kwargs") or {}))
+                    reply(req.get("id"), future)
+                    continue
+                future = self._executor.submit(self.handle, req.get("op"), req.get("kwargs") or {})
+                future.add_done_callback(lambda f, req_id=req.get("id"): reply(req_id, f))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._conn_lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    # --- リクエスト処理 ---
+
+    def handle(self, op, kwargs):
+        if op == "analyze_situation":
+            return self.analyze_situation(**kwargs)
+        BROKER_REQUESTS.inc(op=op or "unknown", cache="none")
+        if op == "query":
+            return self.driver.query(**kwargs)
+        if op == "cancel":
+            return self.driver.cancel(**kwargs)
+        if op == "status":
+            return self.status()
+        raise ValueError(f"Unknown broker operation: {op}")
+
+    def analyze_situation(self, moves, board_size=19, priority=False, visits=500,
+                          include_ownership=True, include_influence=True, max_time=None, tag=None):
+        key = (tuple((str(m[0]).upper(), str(m[1]).lower()) for m in moves if isinstance(m, (list, tuple)) and len(m) >= 2),
+               board_size, visits, include_ownership, include_influence)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is not None:
+            BROKER_REQUESTS.inc(op="analyze_situation", cache="hit")
+            return dict(cached, cached=True)  # 呼び出し元が応答時間をエンジンの負荷として数えないよう印を付ける
+
+        BROKER_REQUESTS.inc(op="analyze_situation", cache="miss")
+        # 打ち切り（cancel）や探索時間の制限が他の呼び出し元に波及しないよう、tag・時間制限の有無ごとにまとめる
+        res = self._flight.do((key, tag, max_time is None), self.driver.analyze_situation, moves, board_size=board_size, priority=priority,
+                              visits=visits, include_ownership=include_ownership, include_influence=include_influence,
+                              max_time=max_time, tag=tag)
+        # 探索時間で打ち切った結果は、時間制限の無いリクエストに返さないようキャッシュしない
+        if "error" not in res and max_time is None:
+            with self._cache_lock:
+                self.cache_misses += 1
+                self._cache[key] = res
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return res
+
+    def status(self) -> dict:
+        supervisor = getattr(self.driver, "supervisor", None)
+        with self._cache_lock:
+            cache = {"entries": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses}
+        return {
+            "alive": self.driver.is_alive(),
+            "supervisor": supervisor.stats() if supervisor else None,
+            "clients": len(self._connections),
+            "cache": cache,
+            "coalescing": self._flight.stats(),
+        }
+
+    def close(self):
+        self._closed = True
+        if self._listener:
+            self._listener.close()
+        with self._conn_lock:
+            for conn in list(self._connections):
+                _shutdown(conn)
+            self._connections.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _shutdown(conn):
+    """受信待ちのスレッドがいても接続を確実に切断する（close だけでは recv が戻らない場合がある）"""
+    try:
+        if sys.platform != "win32":
+            socket.socket(fileno=os.dup(conn.fileno())).shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared KataGo engine broker")
+    parser.add_argument("--address", default=ENGINE_BROKER_ADDRESS or default_broker_address())
+    args = parser.parse_args()
+
+    from drivers.katago_driver import KataGoDriver
+    driver = KataGoDriver(KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL)
+    broker = EngineBroker(driver, args.address).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
 import queue
-import json
 import threading
 import traceback
 import sys
@@ -14,6 +13,7 @@ from core.game_board import GameBoard, Color
 from core.point import Point
 from core.coordinate_transformer import CoordinateTransformer
 from utils.board_renderer import GoBoardRenderer
+from core.analysis_archive import ArchivedMoves
 from services.ai_commentator import GeminiCommentator
 from services.report_generator import ReportGenerator
 from services.term_visualizer import TermVisualizer
@@ -42,6 +42,8 @@ class GoReplayApp(GoAppBase):
         event_bus.subscribe(AppEvents.PROGRESS_UPDATED, lambda val: self.progress_bar.config(value=val))
         event_bus.subscribe("AI_DIAGRAMS_READY", self._on_ai_diagrams_ready)
         event_bus.subscribe("ANALYSIS_RESULT_READY", self._on_state_updated)
+        event_bus.subscribe(AppEvents.ANALYSIS_PROGRESS, self._on_analysis_progress)
+        event_bus.subscribe(AppEvents.ANALYSIS_COMPLETED, lambda *_: self.root.after(0, self._on_analysis_completed))
 
         # 再生モード固有の初期化
         self.transformer = CoordinateTransformer()
@@ -58,6 +60,7 @@ class GoReplayApp(GoAppBase):
         # UI State
         self.moves_m_b = [None] * 3
         self.moves_m_w = [None] * 3
+        self._store_cursor = None  # 解析ストアの読み込み済み位置
 
         # Callbacks
         callbacks = {
@@ -117,7 +120,7 @@ class GoReplayApp(GoAppBase):
                 elif isinstance(d, dict) and 'ownership' in d: # Dict
                     ownership = d['ownership']
             
-            if ownership:
+            if ownership is not None and len(ownership):
                 # 座標変換: bottom-up (r) -> top-down (kata_row)
                 bs = self.game.board_size
                 kata_row = (bs - 1) - r
@@ -284,6 +287,7 @@ class GoReplayApp(GoAppBase):
                 self.report_generator.renderer = self.renderer
                 
             self.lbl_status.config(text="Starting Analysis...")
+            self._store_cursor = None
             # AnalysisServiceに委譲
             self.analysis_service.start_sgf_analysis(path, self.renderer)
             self._monitor_images_on_disk()
@@ -295,25 +299,36 @@ class GoReplayApp(GoAppBase):
         import glob
         files = glob.glob(os.path.join(self.controller.image_dir, "move_*.png"))
         if len(files) > 0 and not self.controller.image_cache: self.show_image(0)
+        self._sync_analysis_data()
         if self.analysis_service.analyzing_sgf:
-            self._sync_analysis_data()
             self.root.after(2000, self._monitor_images_on_disk)
 
     def _sync_analysis_data(self):
-        if not self.controller.image_dir: return
-        p = os.path.join(self.controller.image_dir, "analysis.json")
-        if os.path.exists(p):
-            try:
-                with open(p, "r", encoding="utf-8") as f: d = json.load(f)
-                self.game.moves = d.get("moves", [])
-                mb, mw = self.game.calculate_mistakes()
-                # 内部情報の更新とUI通知のリクエスト
-                for i in range(3):
-                    self._upd_mistake_ui("b", i, mb)
-                    self._upd_mistake_ui("w", i, mw)
-                self.update_display()
-            except Exception as e:
-                logger.error(f"Error in _sync_analysis_data: {e}")
+        """解析ストアに前回以降に追記された手だけを取り込む"""
+        try:
+            results, self._store_cursor = self.analysis_service.read_stored_results(self._store_cursor)
+            if not results: return
+            for idx, result in results.items():
+                while len(self.game.moves) <= idx:
+                    self.game.moves.append(None)
+                self.game.moves[idx] = result
+            mb, mw = self.game.calculate_mistakes()
+            # 内部情報の更新とUI通知のリクエスト
+            for i in range(3):
+                self._upd_mistake_ui("b", i, mb)
+                self._upd_mistake_ui("w", i, mw)
+            self.update_display()
+        except Exception as e:
+            logger.error(f"Error in _sync_analysis_data: {e}")
+
+    def _on_analysis_completed(self):
+        """一括解析の完了後は、手ごとの結果をアーカイブ（mmap）から読むように切り替える"""
+        # 間引きで未配信の差分を先に反映する
+        event_bus.flush(AppEvents.ANALYSIS_PROGRESS)
+        self._sync_analysis_data()
+        archive = self.analysis_service.get_archive()
+        if archive is not None and len(archive) >= len(self.game.moves):
+            self.game.moves = ArchivedMoves(archive)
 
     def _upd_mistake_ui(self, color, idx, mistakes):
         store = self.moves_m_b if color == "b" else self.moves_m_w
@@ -332,8 +347,8 @@ class GoReplayApp(GoAppBase):
         import glob
         files = glob.glob(os.path.join(self.controller.image_dir, "move_*.png"))
         if len(files) > 0 and not self.controller.image_cache: self.show_image(0)
+        self._sync_analysis_data()
         if self.analysis_service.analyzing_sgf:
-            self._sync_analysis_data()
             self.root.after(2000, self._monitor_images_on_disk)
 
     def show_image(self, n):
@@ -394,21 +409,10 @@ class GoReplayApp(GoAppBase):
         self.lbl_counter.config(text=f"{curr} / {self.game.total_moves}")
         
         # --- イベント発行によるUI更新 ---
-        wrs = []
-        for m in moves:
-            if m is None:
-                wrs.append(0.5)
-            elif hasattr(m, 'winrate'):
-                wrs.append(m.winrate)
-            elif isinstance(m, dict):
-                wrs.append(m.get('winrate', m.get('winrate_black', 0.5)))
-            else:
-                wrs.append(0.5)
-
         event_bus.publish(AppEvents.STATE_UPDATED, {
             "winrate_text": wr_text,
             "score_text": sc_text,
-            "winrate_history": wrs,
+            "winrate_history": self._winrate_history(moves),
             "current_move": curr
         })
         
@@ -428,6 +432,21 @@ class GoReplayApp(GoAppBase):
         # BoardViewでの二重描画を防ぐため、candidatesは渡さない（レンダラー側で描画済み）
         self.board_view.update_board(img, self.info_view.review_mode.get(), [], **kwargs)
 
+    @staticmethod
+    def _winrate_history(moves):
+        """勝率グラフ用の各手の勝率（未解析の手は 0.5）"""
+        wrs = []
+        for m in moves:
+            if m is None:
+                wrs.append(0.5)
+            elif hasattr(m, 'winrate'):
+                wrs.append(m.winrate)
+            elif isinstance(m, dict):
+                wrs.append(m.get('winrate', m.get('winrate_black', 0.5)))
+            else:
+                wrs.append(0.5)
+        return wrs
+
     def generate_commentary(self):
         """AI解説をサービス経由で非同期実行する"""
         if not self.gemini: return
@@ -478,6 +497,25 @@ class GoReplayApp(GoAppBase):
             print(f"ERROR in _process_state_update: {e}")
             traceback.print_exc()
 
+    def _on_analysis_progress(self, data):
+        """一括解析の差分の反映（イベントバスで間引かれ、GUI スレッドで届く）"""
+        try:
+            updates = data["updates"]
+            for idx, result in updates.items():
+                while len(self.game.moves) <= idx:
+                    self.game.moves.append(None)
+                self.game.moves[idx] = result
+            self.progress_bar.config(maximum=data["total"], value=data["completed"])
+
+            # 表示中の手が含まれていれば盤面ごと、そうでなければグラフだけを1度描き直す
+            curr = self.controller.current_move
+            if curr in updates:
+                self.update_display()
+            else:
+                self.info_view.update_graph(self._winrate_history(self.game.moves), curr)
+        except Exception as e:
+            logger.error(f"Error in _on_analysis_progress: {e}", layer="GUI")
+
     def _on_ai_diagrams_ready(self, res):
         """AIが生成した図を表示する"""
         if res.get("rec_path"):
@@ -576,7 +614,8 @@ class GoReplayApp(GoAppBase):
 
         # 分析サービスへ依頼 (表示更新はイベントバス経由で自動で行われる)
         self.info_view.analysis_tab.btn_comment.config(state="disabled", text="Analyzing...")
-        self.analysis_service.request_analysis(history, bs)
+        # 解析後は本譜の前後の局面を先読みする
+        self.analysis_service.request_analysis(history, bs, line=self.game.get_history_up_to(self.game.total_moves))
         
         # ボタン復帰のための遅延処理（またはイベント購読を検討）
         self.root.after(500, lambda: self.info_view.analysis_tab.btn_comment.config(state="normal", text="Ask AI Agent"))
@@ -20,6 +20,8 @@ class GoAppBase(ABC):
         
         if not self.is_child:
             self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+            # 間引き対象のイベントは Tk のメインループ上で配信する
+            event_bus.set_dispatcher(self.root.after)
         
         # 1. コア・サービスと状態の初期化
         self.game = GoGameState()
@@ -69,8 +71,11 @@ class GoAppBase(ABC):
         for event_type, callback in self._subscriptions:
             event_bus.unsubscribe(event_type, callback)
         self._subscriptions = []
+        if not self.is_child:
+            event_bus.set_dispatcher(None)
 
         # 2. スレッドの停止
+        self.analysis_service.cancel_prefetch()
         try:
             self.task_manager.shutdown()
         except: pass
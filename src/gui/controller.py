@@ -1,8 +1,11 @@
 import os
 import json
+import uuid
 from PIL import Image
 from services.api_client import GoAPIClient
 from utils.logger import logger
+from utils.lru_cache import SizedLRUCache
+from config import IMAGE_CACHE_MAX_BYTES
 
 class AppController:
     """アプリケーションの状態管理とロジックを担当するController"""
@@ -11,13 +14,15 @@ class AppController:
         self.game = game_state
         self.api_client = GoAPIClient()
         self.current_move = 0
-        self.image_cache = {}
+        self.image_cache = SizedLRUCache("gui_images", IMAGE_CACHE_MAX_BYTES, on_evict=self._on_image_evicted)
         self.image_dir = None
         self.current_sgf_name = "unknown"
+        # APIサーバー側で盤面を保持するセッション（手数移動は差分のみ送信する）
+        self.session_id = f"gui-{uuid.uuid4().hex[:8]}"
 
     def set_image_dir(self, path):
         self.image_dir = path
-        self.image_cache = {}
+        self.image_cache.clear()
         logger.info(f"Image directory set to: {path}", layer="CONTROLLER")
 
     def get_current_image(self):
@@ -25,8 +30,9 @@ class AppController:
         if not self.image_dir: return None
         
         n = self.current_move
-        if n in self.image_cache:
-            return self.image_cache[n]
+        img = self.image_cache.get(n)
+        if img is not None:
+            return img
             
         p = os.path.join(self.image_dir, f"move_{n:03d}.png")
         if os.path.exists(p):
@@ -41,21 +47,17 @@ class AppController:
                 return None
         return None
 
+    def _on_image_evicted(self, n, img):
+        logger.debug(f"Evicted cached image for move {n}", layer="CONTROLLER")
+
     def sync_state_to_api(self):
-        """現在の状態をAPIサーバーへ同期"""
+        """現在の状態をAPIサーバーのセッションへ同期（手順に変化が無ければ手数の移動のみ送信）"""
         logger.debug(f"Syncing state to API at move {self.current_move}", layer="CONTROLLER")
-        history = self.game.get_history_up_to(self.current_move)
-        # 直近10手に制限して負荷軽減（Rev 18.0の方針を継承）
-        history_mini = history[-10:] if len(history) > 10 else history
-        
-        metadata = self.game.get_metadata()
-        state = {
-            "history": history_mini,
-            "current_move_index": self.current_move,
-            "total_moves": self.game.total_moves,
-            "metadata": metadata
-        }
-        self.api_client.sync_game_state(state)
+        line = self.game.get_history_up_to(self.game.total_moves)
+        self.api_client.sync_session(
+            self.session_id, line, min(self.current_move, len(line)),
+            board_size=self.game.board_size, metadata=self.game.get_metadata()
+        )
 
     def next_move(self):
         if self.current_move < self.game.total_moves:
@@ -174,6 +174,7 @@ class TestPlayApp(GoAppBase):
         )
 
     def reset_game(self, size):
+        self.analysis_service.cancel_prefetch()
         self.game.new_game(size)
         self.transformer = CoordinateTransformer(size)
         self.board_view.transformer = self.transformer
@@ -284,7 +285,10 @@ class TestPlayApp(GoAppBase):
                     
                     # 検討モードでなければ解析をリクエスト
                     h = self.game.get_history_up_to(self.current_move)
-                    self.analysis_service.request_analysis(h, self.game.board_size)
+                    # 解析後は前後の局面と候補手への応手を先読みする
+                    self.analysis_service.request_analysis(h, self.game.board_size,
+                                                           line=self.game.get_history_up_to(self.game.total_moves),
+                                                           prefetch_replies=True)
                     self.update_display()
             else:
                 self.game.toggle_mark(self.current_move, row, col, tool)
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 import os
@@ -7,30 +7,126 @@ import json
 import time
 import traceback
 import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # Core imports
-from drivers.katago_driver import KataGoDriver
+from drivers.katago_driver import KataGoDriver, CANCELLED
+from drivers.broker_client import BrokerEngineClient
 from core.shape_detector import ShapeDetector
 from core.board_simulator import BoardSimulator, SimulationContext
-from config import KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL
+from core.board_map import (encode_board_map, msgpack, MAP_ENCODING_LIST, MAP_ENCODING_F16B64, MSGPACK_MEDIA_TYPE,
+                            ANALYSIS_SOURCE_HEADER, ANALYSIS_SOURCE_ENGINE, ANALYSIS_SOURCE_CACHE, ANALYSIS_SOURCE_SHARED)
+from core.pv_shape_analysis import analyze_pv_shapes
+from core.game_session import SessionStore, StalePositionError
+from core.context_cache import ContextCache
+from utils.single_flight import AsyncSingleFlight
+from utils.deadline import Deadline
+from utils.metrics import metrics, SIZE_BUCKETS, PROMETHEUS_CONTENT_TYPE
+from config import (KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL, KATAGO_MAX_CONCURRENCY, PV_SHAPE_WORKERS,
+                    ENGINE_BROKER_ADDRESS, API_WORKERS)
 
 app = FastAPI(title="KataGo Intelligence Service")
 
 # Singleton engine
-katago = KataGoDriver(KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL)
+# ブローカーが設定されていればその共有エンジンを使う（接続は初回利用時。uvicorn の各ワーカーから接続できる）。
+# 自前で起動する場合、spawn 方式のワーカープロセスがこのモジュールを再 import した際はエンジンを起動しない
+if ENGINE_BROKER_ADDRESS:
+    katago = BrokerEngineClient(ENGINE_BROKER_ADDRESS)
+elif multiprocessing.parent_process() is None:
+    katago = KataGoDriver(KATAGO_EXE, KATAGO_CONFIG, KATAGO_MODEL)
+else:
+    katago = None
 detector = ShapeDetector()
 simulator = BoardSimulator()
+# /detect 系で復元した盤面（履歴の接頭辞で再利用し、追加分の手だけを適用する）
+context_cache = ContextCache(simulator)
 
-# Request Queue Lock
-engine_lock = asyncio.Lock()
+# エンジン呼び出しはイベントループを塞がないよう専用スレッドで実行し、
+# 同時実行数はエンジンの処理能力に合わせたセマフォで制限する
+engine_slots = asyncio.Semaphore(KATAGO_MAX_CONCURRENCY)
+engine_executor = ThreadPoolExecutor(max_workers=KATAGO_MAX_CONCURRENCY, thread_name_prefix="engine")
+
+# 同一条件の解析が同時に届いた場合は1回のエンジンクエリにまとめる
+analysis_flight = AsyncSingleFlight("analyze")
+
+# 締め切り付きリクエストで、エンジン探索の後に残しておく時間（PV形状解析とレスポンスの送信）
+ENGINE_RESPONSE_RESERVE = 1.0
+# 残り時間がこれを下回る場合は PV形状解析を省略する
+PV_SHAPE_MIN_SECONDS = 0.5
+DEADLINE_EXCEEDED = "Deadline exceeded"
+# /cancel で打ち切られた tag（後から届いた同じ tag の要求もエンジンに送らない）
+CANCELLED_TAGS_MAX = 256
+cancelled_tags: "OrderedDict[str, float]" = OrderedDict()
+
+# Metrics (/metrics で公開)
+API_QUEUE_WAIT = metrics.histogram("api_engine_queue_wait_seconds", "Time an analysis waited for a free engine slot")
+API_CANCELLED = metrics.counter("api_cancelled_total", "Analysis requests dropped by /cancel by stage (queued/engine)")
+API_DEADLINE_DEGRADED = metrics.counter("api_deadline_degraded_total", "Analysis work skipped or shortened to meet a request deadline")
+API_REQUEST_TIME = metrics.histogram("api_request_seconds", "End-to-end handling time per endpoint")
+API_RESPONSE_SIZE = metrics.histogram("api_response_bytes", "Encoded response body size per endpoint", buckets=SIZE_BUCKETS)
+PV_SHAPE_TIME = metrics.histogram("api_pv_shape_seconds", "PV shape analysis time per analyzed position")
+DETECT_TIME = metrics.histogram("api_shape_detect_seconds", "Board reconstruction and shape detection time per endpoint")
+COALESCING = metrics.gauge("api_analysis_coalescing", "Single-flight statistics for /analyze (executed/absorbed/in_flight)")
+for _kind in ("executed", "absorbed", "in_flight"):
+    COALESCING.set_function(lambda k=_kind: analysis_flight.stats()[k], kind=_kind)
+CONTEXT_CACHE = metrics.gauge("api_context_cache", "Reconstructed board cache statistics for /detect (entries/hits/moves_applied)")
+for _kind in ("entries", "exact_hits", "prefix_hits", "misses", "moves_applied"):
+    CONTEXT_CACHE.set_function(lambda k=_kind: context_cache.stats()[k], kind=_kind)
+if katago and katago.supervisor:
+    metrics.gauge("katago_engine_restarts", "Engine restarts performed by the supervisor").set_function(
+        lambda: katago.supervisor.restart_count)
+
+# CPU負荷の高いPV形状解析はワーカープロセスで実行する（初回利用時に生成）
+_shape_pool = None
+
+def get_shape_pool():
+    global _shape_pool
+    if _shape_pool is None and PV_SHAPE_WORKERS > 0:
+        _shape_pool = ProcessPoolExecutor(max_workers=PV_SHAPE_WORKERS)
+    return _shape_pool
+
+async def run_pv_shape_analysis(history, board_size, future_sequences):
+    """PV形状解析をワーカープロセスで実行する（プールが壊れた場合は作り直してスレッドで実行）"""
+    global _shape_pool
+    loop = asyncio.get_running_loop()
+    with PV_SHAPE_TIME.time():
+        pool = get_shape_pool()
+        if pool is not None:
+            try:
+                return await loop.run_in_executor(pool, analyze_pv_shapes, history, board_size, future_sequences)
+            except BrokenProcessPool:
+                print("DEBUG: PV shape worker pool broken. Recreating.")
+                _shape_pool = None
+        return await asyncio.to_thread(analyze_pv_shapes, history, board_size, future_sequences)
 
 class AnalysisRequest(BaseModel):
-    history: list
+    history: list = []
+    position_id: str = None # セッション上の局面ID（指定時は history の代わりに使用）
     board_size: int = 19
     visits: int = 100
     include_pv_shapes: bool = True
     include_ownership: bool = True
     include_influence: bool = True
+    map_encoding: str = MAP_ENCODING_LIST # "list" | "f16b64" (Ownership/Influenceの符号化形式)
+    deadline_ms: int = None # 呼び出し元の残り時間（指定時は探索時間を制限し、間に合わない処理を省く）
+    cancel_tag: str = None # /cancel でまとめて打ち切るための識別子（一括解析の実行ごとなど）
+
+class BatchAnalysisRequest(BaseModel):
+    histories: list
+    board_size: int = 19
+    visits: int = 100
+    include_pv_shapes: bool = True
+    include_ownership: bool = True
+    include_influence: bool = True
+    map_encoding: str = MAP_ENCODING_LIST
+    deadline_ms: int = None
+    cancel_tag: str = None
+
+class CancelRequest(BaseModel):
+    tag: str
 
 class GameState(BaseModel):
     history: list = []
@@ -39,8 +135,26 @@ class GameState(BaseModel):
     metadata: dict = {}
     last_update: float = 0
 
+class SessionCreateRequest(BaseModel):
+    session_id: str = None
+    board_size: int = 19
+    history: list = []
+    move_index: int = None # 省略時は手順の最後
+    metadata: dict = {}
+
+class SessionPushRequest(BaseModel):
+    moves: list
+
+class SessionPopRequest(BaseModel):
+    count: int = 1
+
+class SessionJumpRequest(BaseModel):
+    move_index: int
+
 # In-memory session state
 current_game_state = GameState()
+# 名前付きセッション（盤面を差分で保持し、局面IDで解析・検知できる）
+sessions = SessionStore()
 
 def sanitize_history(history):
     if not history: return []
@@ -51,6 +165,38 @@ def sanitize_history(history):
         return new_h
     return [m for m in history if isinstance(m, (list, tuple)) and len(m) >= 2]
 
+def history_key(history) -> tuple:
+    """同一局面の判定に使う正規化済みキー（手番色・座標の大小文字や pass 表記の揺れを吸収する）"""
+    key = []
+    for move in history:
+        m = str(move[1] or "pass").upper()
+        key.append((str(move[0]).upper()[:1], m))
+    return tuple(key)
+
+def wants_msgpack(request: Request) -> bool:
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+def encode_maps(payload: dict, encoding: str, binary: bool = False) -> dict:
+    """解析結果の Ownership/Influence を転送形式に符号化する"""
+    for key in ("ownership", "influence"):
+        if key in payload:
+            payload[key] = encode_board_map(payload.get(key), encoding, binary=binary)
+    return payload
+
+def encode_response(content: dict, request: Request):
+    if wants_msgpack(request):
+        resp = Response(content=msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE)
+    else:
+        resp = JSONResponse(content=content)
+    API_RESPONSE_SIZE.observe(len(resp.body), endpoint=request.url.path)
+    return resp
+
+def encode_analysis_response(payload: dict, request: Request, encoding: str):
+    """Ownership/Influence を符号化し、Accept ヘッダに応じて JSON か msgpack で返す"""
+    use_msgpack = wants_msgpack(request)
+    encode_maps(payload, MAP_ENCODING_F16B64 if use_msgpack else encoding, binary=use_msgpack)
+    return encode_response(payload, request)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     return JSONResponse(
@@ -58,99 +204,309 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"error": "Internal Server Error", "detail": str(exc), "traceback": traceback.format_exc()},
     )
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 形式のメトリクス"""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/health")
 async def health():
-    return {"status": "ok", "engine": "running" if katago.process else "stopped"}
+    broker = None
+    if isinstance(katago, BrokerEngineClient):
+        # エンジンの状態はブローカーに問い合わせる（プロセス間通信のためイベントループ外で待つ）
+        broker = await asyncio.to_thread(katago.status)
+        engine_state = "running" if broker.get("alive") else "stopped"
+        supervisor = broker.get("supervisor")
+    else:
+        engine_state = "running" if katago.is_alive() else ("restarting" if katago.supervisor else "stopped")
+        supervisor = katago.supervisor.stats() if katago.supervisor else None
+    return {
+        "status": "ok",
+        "engine": engine_state,
+        "supervisor": supervisor,
+        "broker": broker,
+        "coalescing": analysis_flight.stats(),
+        "context_cache": context_cache.stats()
+    }
+
+def position_error_response(e: Exception):
+    """局面解決エラーを HTTP ステータスに対応付ける"""
+    if isinstance(e, StalePositionError):
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    if isinstance(e, KeyError):
+        return JSONResponse(status_code=404, content={"error": str(e).strip("'")})
+    return JSONResponse(status_code=400, content={"error": str(e)})
+
+def resolve_request_position(req: AnalysisRequest):
+    """リクエストの対象局面を (履歴, 構築済みコンテキストまたは None) として返す"""
+    if not req.position_id:
+        return sanitize_history(req.history), None
+    session, idx = sessions.resolve_position(req.position_id)
+    req.board_size = session.board_size
+    return session.history_up_to(idx), session.context_at(idx)
+
+async def run_analysis(clean_history: list, req, deadline: Deadline = None) -> dict:
+    """
+    1局面を解析し、PV形状解析を付加した結果（失敗時は error を含む辞書）を返す。
+    deadline がある場合はエンジンの探索時間をその残り時間に収め、間に合わない再試行や PV形状解析を省く。
+    """
+    loop = asyncio.get_running_loop()
+
+    # KataGo Analysis
+    tag = getattr(req, "cancel_tag", None)
+    if tag and tag in cancelled_tags:
+        API_CANCELLED.inc(stage="queued")
+        return {"error": CANCELLED}
+    res = {"error": "Engine initialization failed"}
+    t_enqueue = time.perf_counter()
+    async with engine_slots:
+        API_QUEUE_WAIT.observe(time.perf_counter() - t_enqueue)
+        for attempt in range(3):
+            if tag and tag in cancelled_tags:
+                API_CANCELLED.inc(stage="queued" if attempt == 0 else "engine")
+                res = {"error": CANCELLED}
+                break
+            max_time = deadline.timeout(reserve=ENGINE_RESPONSE_RESERVE) if deadline else None
+            if max_time is not None and max_time <= 0:
+                API_DEADLINE_DEGRADED.inc(stage="engine")
+                res = {"error": DEADLINE_EXCEEDED}
+                break
+            # include_influence パラメータをドライバに渡す
+            res = await loop.run_in_executor(engine_executor, lambda: katago.analyze_situation(
+                clean_history,
+                board_size=req.board_size,
+                priority=True,
+                visits=req.visits,
+                include_ownership=req.include_ownership,
+                include_influence=req.include_influence,
+                max_time=max_time,
+                tag=tag
+            ))
+            if "error" not in res: break
+            if res["error"] == CANCELLED:
+                API_CANCELLED.inc(stage="engine")
+                break
+            await asyncio.sleep(0.5 * (attempt + 1))
+
+    if "error" in res:
+        return res
+
+    # Future Shape Analysis (PV解析)
+    top_candidates = res.get('top_candidates', [])
+    if req.include_pv_shapes and deadline and deadline.remaining() < PV_SHAPE_MIN_SECONDS:
+        API_DEADLINE_DEGRADED.inc(stage="pv_shapes")
+        for cand in top_candidates:
+            cand["future_shape_analysis"] = "（制限時間のため省略）"
+    elif req.include_pv_shapes:
+        texts = await run_pv_shape_analysis(
+            clean_history, req.board_size, [cand.get('future_sequence', "") for cand in top_candidates]
+        )
+        for cand, text in zip(top_candidates, texts):
+            cand["future_shape_analysis"] = text
+    else:
+        for cand in top_candidates:
+            cand["future_shape_analysis"] = "（高速解析モード：個別検討で表示）"
+
+    return {
+        "winrate_black": res.get('winrate', 0.5),
+        "score_lead_black": res.get('score', 0.0),
+        "ownership": res.get('ownership'),
+        "influence": res.get('influence'),
+        "top_candidates": top_candidates,
+        "source": ANALYSIS_SOURCE_CACHE if res.get("cached") else ANALYSIS_SOURCE_ENGINE,
+    }
+
+async def analyze_position(clean_history: list, req, deadline: Deadline = None) -> dict:
+    """run_analysis を同一局面・同一条件の同時リクエスト間で共有する（呼び出し元ごとに浅いコピーを返す）"""
+    # 打ち切り（/cancel）や締め切りによる縮小が他の呼び出し元に波及しないよう、cancel_tag・締め切りの区分ごとにまとめる
+    key = (history_key(clean_history), req.board_size, req.visits,
+           req.include_pv_shapes, req.include_ownership, req.include_influence, req.cancel_tag, Deadline.bucket(deadline))
+    shared = analysis_flight.in_flight(key)
+    payload = dict(await analysis_flight.do(key, run_analysis, clean_history, req, deadline))
+    if shared and "error" not in payload:
+        payload["source"] = ANALYSIS_SOURCE_SHARED
+    return payload
+
+def analysis_error_response(payload: dict):
+    """
+    解析失敗を HTTP ステータスに対応付ける
+    （締め切り超過は 504、呼び出し元による打ち切りは 499 とし、サーバー障害の 503 と区別する）
+    """
+    status = {DEADLINE_EXCEEDED: 504, CANCELLED: 499}.get(payload.get("error"), 503)
+    return JSONResponse(status_code=status, content=payload)
 
 @app.post("/analyze")
-async def analyze(req: AnalysisRequest):
-    async with engine_lock:
+async def analyze(req: AnalysisRequest, request: Request):
+    try:
+        print(f"DEBUG: Starting analysis for {len(req.history)} moves (PV shapes: {req.include_pv_shapes}, influence: {req.include_influence})")
         try:
-            print(f"DEBUG: Starting analysis for {len(req.history)} moves (PV shapes: {req.include_pv_shapes}, influence: {req.include_influence})")
-            clean_history = sanitize_history(req.history)
-            
-            # KataGo Analysis
-            res = {"error": "Engine initialization failed"}
-            for attempt in range(3):
-                # include_influence パラメータをドライバに渡す
-                res = katago.analyze_situation(
-                    clean_history, 
-                    board_size=req.board_size, 
-                    priority=True, 
-                    visits=req.visits,
-                    include_ownership=req.include_ownership,
-                    include_influence=req.include_influence
-                )
-                if "error" not in res: break
-                await asyncio.sleep(0.5 * (attempt + 1))
-
-            if "error" in res:
-                return JSONResponse(status_code=503, content=res)
-            
-            final_wr = res.get('winrate', 0.5)
-            final_score = res.get('score', 0.0)
-            final_own = res.get('ownership', [])
-            final_inf = res.get('influence', [])
-            
-            # Future Shape Analysis (PV解析)
-            top_candidates = res.get('top_candidates', [])
-            if req.include_pv_shapes:
-                # 基点となるコンテキストを復元
-                curr_ctx = simulator.reconstruct_to_context(clean_history, req.board_size)
-                
-                for cand in top_candidates:
-                    pv_str = cand.get('future_sequence', "")
-                    # "D16 -> E17" のような形式をパース
-                    pv_list = [m.strip() for m in pv_str.split(" -> ")] if pv_str else []
-                    all_future_facts = []
-                    
-                    # 1手ずつシミュレートして形状検知
-                    for i in range(1, len(pv_list) + 1):
-                        sub_pv = pv_list[:i]
-                        # SimulationContextを使用して未来の盤面を構築
-                        future_ctx = simulator.simulate_sequence(curr_ctx, sub_pv)
-                        
-                        # 形状検知を実行
-                        facts = detector.detect_facts(future_ctx)
-                        if facts:
-                            fact_text = "\n".join([f"    - {f.description}" for f in facts])
-                            last_move = pv_list[i-1]
-                            all_future_facts.append(f"  [{last_move}の局面]:\n{fact_text}")
-                    
-                    cand["future_shape_analysis"] = "\n".join(all_future_facts) if all_future_facts else "特になし"
-            else:
-                for cand in top_candidates:
-                    cand["future_shape_analysis"] = "（高速解析モード：個別検討で表示）"
-                
-            return {
-                "winrate_black": final_wr,
-                "score_lead_black": final_score,
-                "ownership": final_own,
-                "influence": final_inf,
-                "top_candidates": top_candidates
-            }
-
-        except Exception as e:
-            traceback.print_exc()
-            return JSONResponse(status_code=500, content={"error": str(e), "traceback": traceback.format_exc()})
+            clean_history, _ = resolve_request_position(req)
+        except (KeyError, IndexError, StalePositionError) as e:
+            return position_error_response(e)
+        with API_REQUEST_TIME.time(endpoint="/analyze"):
+            payload = await analyze_position(clean_history, req, Deadline.from_ms(req.deadline_ms))
+            if "error" in payload:
+                return analysis_error_response(payload)
+            source = payload.pop("source", ANALYSIS_SOURCE_ENGINE)
+            resp = encode_analysis_response(payload, request, req.map_encoding)
+            resp.headers[ANALYSIS_SOURCE_HEADER] = source
+            return resp
+
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e), "traceback": traceback.format_exc()})
+
+@app.post("/cancel")
+async def cancel(req: CancelRequest):
+    """
+    cancel_tag を付けた解析をまとめて打ち切る。
+    エンジン上で探索中のクエリには terminate を送り、以降に届く同じ tag の要求はエンジンに送らない。
+    """
+    cancelled_tags[req.tag] = time.time()
+    while len(cancelled_tags) > CANCELLED_TAGS_MAX:
+        cancelled_tags.popitem(last=False)
+    terminated = await asyncio.get_running_loop().run_in_executor(None, katago.cancel, req.tag) if katago else 0
+    print(f"DEBUG: Cancel requested (tag={req.tag}, terminated={terminated})")
+    return {"tag": req.tag, "terminated": terminated}
+
+@app.post("/analyze/batch")
+async def analyze_batch(req: BatchAnalysisRequest, request: Request):
+    """
+    複数局面をまとめて解析する。同一局面は1回だけ解析し、残りはエンジンへ同時に投入する。
+    結果はリクエストの順序で返す（失敗した局面は error を含む）。
+    """
+    try:
+        histories = [sanitize_history(h) for h in req.histories]
+        unique = {}  # 正規化キー -> 代表となる履歴
+        keys = []
+        for h in histories:
+            key = history_key(h)
+            unique.setdefault(key, h)
+            keys.append(key)
+        print(f"DEBUG: Starting batch analysis ({len(histories)} positions, {len(unique)} unique)")
+
+        with API_REQUEST_TIME.time(endpoint="/analyze/batch"):
+            deadline = Deadline.from_ms(req.deadline_ms)
+            outcomes = await asyncio.gather(*[analyze_position(h, req, deadline) for h in unique.values()], return_exceptions=True)
+
+        use_msgpack = wants_msgpack(request)
+        encoding = MAP_ENCODING_F16B64 if use_msgpack else req.map_encoding
+        by_key = {}
+        sources = set()
+        for key, out in zip(unique.keys(), outcomes):
+            if isinstance(out, Exception):
+                out = {"error": str(out)}
+            sources.add(out.pop("source", None))
+            by_key[key] = out if "error" in out else encode_maps(out, encoding, binary=use_msgpack)
+
+        resp = encode_response({
+            "results": [by_key[k] for k in keys],
+            "unique_positions": len(unique)
+        }, request)
+        # 1局面でもエンジンで探索していれば、応答時間はエンジンの負荷を表す
+        reused = sources - {None}
+        resp.headers[ANALYSIS_SOURCE_HEADER] = ANALYSIS_SOURCE_CACHE if reused and ANALYSIS_SOURCE_ENGINE not in reused \
+            else ANALYSIS_SOURCE_ENGINE
+        return resp
+
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e), "traceback": traceback.format_exc()})
 
 @app.post("/game/state")
 async def update_game_state(state: GameState):
     global current_game_state
     current_game_state = state
     current_game_state.last_update = time.time()
+    sessions.active_session_id = None
     return {"status": "updated"}
 
 @app.get("/game/state")
 async def get_game_state():
+    # セッションで同期しているクライアントがあれば、その現在局面を従来形式で返す（MCP 互換）
+    session = sessions.get(sessions.active_session_id) if sessions.active_session_id else None
+    if session:
+        with session.lock:
+            return GameState(
+                history=session.history_up_to(),
+                current_move_index=session.current,
+                total_moves=len(session.line),
+                metadata=session.metadata,
+                last_update=session.last_update
+            )
     return current_game_state
 
+def session_response(session):
+    sessions.active_session_id = session.session_id
+    return session.to_state()
+
+@app.post("/sessions")
+async def create_session(req: SessionCreateRequest):
+    """セッションを作成する（同じIDが既にあれば手順を置き換え、共通部分の局面は再利用する）"""
+    session = sessions.get(req.session_id) if req.session_id else None
+    if session is None or session.board_size != req.board_size:
+        session = sessions.create(req.session_id, req.board_size, req.metadata)
+    session.metadata = req.metadata or session.metadata
+    try:
+        session.set_line(sanitize_history(req.history), req.move_index)
+    except IndexError as e:
+        return position_error_response(e)
+    return session_response(session)
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str, include_history: bool = False):
+    session = sessions.get(session_id)
+    if session is None:
+        return position_error_response(KeyError(f"Unknown session: {session_id}"))
+    state = session.to_state()
+    if include_history:
+        state["history"] = session.history_up_to()
+    return state
+
+@app.post("/sessions/{session_id}/push")
+async def push_session(session_id: str, req: SessionPushRequest):
+    session = sessions.get(session_id)
+    if session is None:
+        return position_error_response(KeyError(f"Unknown session: {session_id}"))
+    session.push(sanitize_history(req.moves))
+    return session_response(session)
+
+@app.post("/sessions/{session_id}/pop")
+async def pop_session(session_id: str, req: SessionPopRequest):
+    session = sessions.get(session_id)
+    if session is None:
+        return position_error_response(KeyError(f"Unknown session: {session_id}"))
+    session.pop(req.count)
+    return session_response(session)
+
+@app.post("/sessions/{session_id}/jump")
+async def jump_session(session_id: str, req: SessionJumpRequest):
+    session = sessions.get(session_id)
+    if session is None:
+        return position_error_response(KeyError(f"Unknown session: {session_id}"))
+    try:
+        session.jump(req.move_index)
+    except IndexError as e:
+        return position_error_response(e)
+    return session_response(session)
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    return {"deleted": sessions.delete(session_id)}
+
 @app.post("/detect")
 async def detect(req: AnalysisRequest):
     try:
-        clean_history = sanitize_history(req.history)
-        ctx = simulator.reconstruct_to_context(clean_history, req.board_size)
-        facts = detector.detect_facts(ctx)
+        try:
+            clean_history, ctx = resolve_request_position(req)
+        except (KeyError, IndexError, StalePositionError) as e:
+            return position_error_response(e)
+        with DETECT_TIME.time(endpoint="/detect"):
+            # セッションの局面IDが指定された場合は構築済みの盤面をそのまま使い、
+            # それ以外はキャッシュ済みの最長の接頭辞から差分で復元する
+            if ctx is None:
+                ctx = context_cache.get(clean_history, req.board_size)
+            facts = detector.detect_facts(ctx)
         
         # 構造化データとして返す
         fact_list = []
@@ -171,9 +527,16 @@ async def detect(req: AnalysisRequest):
 @app.post("/detect/ids")
 async def detect_ids(req: AnalysisRequest):
     try:
-        clean_history = sanitize_history(req.history)
-        ctx = simulator.reconstruct_to_context(clean_history, req.board_size)
-        facts = detector.detect_facts(ctx)
+        try:
+            clean_history, ctx = resolve_request_position(req)
+        except (KeyError, IndexError, StalePositionError) as e:
+            return position_error_response(e)
+        with DETECT_TIME.time(endpoint="/detect/ids"):
+            # セッションの局面IDが指定された場合は構築済みの盤面をそのまま使い、
+            # それ以外はキャッシュ済みの最長の接頭辞から差分で復元する
+            if ctx is None:
+                ctx = context_cache.get(clean_history, req.board_size)
+            facts = detector.detect_facts(ctx)
         # 属性からIDを抽出 (BaseFactMetadataサブクラスであることを考慮)
         from core.inference_fact import ShapeMetadata
         ids = list(set([f.metadata.key for f in facts if isinstance(f.metadata, ShapeMetadata)]))
@@ -183,4 +546,9 @@ async def detect_ids(req: AnalysisRequest):
         return JSONResponse(status_code=500, content={"error": str(e), "traceback": traceback.format_exc()})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
+    if ENGINE_BROKER_ADDRESS and API_WORKERS > 1:
+        # エンジンはブローカー側にあるため、HTTP 処理・形状検出を複数プロセスに分散できる
+        # （セッションと盤面キャッシュはワーカーごとに保持される）
+        uvicorn.run("katago_api:app", host="127.0.0.1", port=8000, log_level="info", workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
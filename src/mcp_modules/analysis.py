@@ -31,13 +31,13 @@ class AnalysisModule(McpModuleBase):
         # リソースは最新の同期済み状態を優先
         hist, size = self.resolve_context(None, None)
         res = api_client.analyze_move(hist, size)
-        return json.dumps(res.ownership) if res and res.ownership else "Ownership data unavailable."
+        return json.dumps(res.to_dict()["ownership"]) if res and res.ownership is not None else "Ownership data unavailable."
 
     def get_influence_map(self) -> str:
         """現在の局面における全19x19マスの影響力（厚み）の生数値データを取得します。"""
         hist, size = self.resolve_context(None, None)
         res = api_client.analyze_move(hist, size)
-        return json.dumps(res.influence) if res and res.influence else "Influence data unavailable."
+        return json.dumps(res.to_dict()["influence"]) if res and res.influence is not None else "Influence data unavailable."
 
     def get_regional_stats(self) -> str:
         """盤面を9エリアに分割した、地と勢力の詳細な戦略統計レポートを取得します。"""
@@ -79,8 +79,7 @@ class AnalysisModule(McpModuleBase):
             collector = orch.analyze_full(target_history)
             phase = collector.get_game_phase()
             
-            from dataclasses import asdict
-            data = asdict(res)
+            data = res.to_dict()
             data["game_phase"] = phase
             
             return json.dumps(data, indent=2, ensure_ascii=False)
@@ -97,8 +96,7 @@ class AnalysisModule(McpModuleBase):
             add_moves = [m.to_list() for m in sequence]
             res = api_client.analyze_simulation(base_history, add_moves, target_size)
             if not res: return "Error: Simulation failed."
-            from dataclasses import asdict
-            return json.dumps(asdict(res), indent=2, ensure_ascii=False)
+            return json.dumps(res.to_dict(), indent=2, ensure_ascii=False)
         except Exception as e:
             return f"Error: {str(e)}"
 
@@ -108,18 +106,18 @@ class AnalysisModule(McpModuleBase):
         """
         try:
             base_history, target_size = self.resolve_context(None, board_size)
+            # 全シナリオを1回のバッチリクエストで同時に解析する
+            sequences = [[m.to_list() for m in seq] for seq in scenarios]
+            batch = api_client.analyze_batch_simulations(base_history, sequences, target_size)
             results = []
-            for i, seq in enumerate(scenarios):
-                add_moves = [m.to_list() for m in seq]
-                res = api_client.analyze_simulation(base_history, add_moves, target_size)
+            for i, res in enumerate(batch):
                 if res:
-                    from dataclasses import asdict
                     results.append({
                         "scenario_index": i,
                         "winrate": res.winrate,
                         "winrate_label": res.winrate_label,
                         "score_lead": res.score_lead,
-                        "data": asdict(res)
+                        "data": res.to_dict()
                     })
             
             if len(results) >= 2:
@@ -54,7 +54,7 @@ class LocalSolverModule(McpModuleBase):
             # これにより「局所的な証明」に近い精度を担保する
             res = api_client.analyze_move(full_hist, size, visits=visits)
             
-            if not res or not res.ownership:
+            if not res or res.ownership is None:
                 return "Error: Failed to analyze local situation."
 
             # 3. 局所データの抽出
@@ -66,7 +66,7 @@ class LocalSolverModule(McpModuleBase):
                     p = Point(r, c)
                     if ctx.board.is_on_board(p):
                         idx = r * size + c
-                        own = res.ownership[idx]
+                        own = float(res.ownership[idx])
                         local_ownership.append({
                             "coord": p.to_gtp(),
                             "ownership": own,
@@ -3,10 +3,12 @@ from google.genai import types
 import os
 import json
 import traceback
-from config import KNOWLEDGE_DIR, GEMINI_MODEL_NAME, load_api_key, TARGET_LEVEL
+from config import (KNOWLEDGE_DIR, GEMINI_MODEL_NAME, load_api_key, TARGET_LEVEL,
+                    COMMENTARY_SLA_SECONDS, COMMENTARY_LLM_RESERVE_SECONDS)
 from core.knowledge_manager import KnowledgeManager
 from services.analysis_orchestrator import AnalysisOrchestrator
 from services.persona import PersonaFactory
+from utils.deadline import Deadline
 
 class GeminiCommentator:
     def __init__(self, api_key):
@@ -28,15 +30,22 @@ class GeminiCommentator:
                 content = content.replace("{" + k + "}", str(v))
             return content
 
-    async def generate_commentary(self, move_idx, history, board_size=19, prev_analysis=None):
-        """【事実先行型】Orchestratorから得た構造化データに基づき、AIによる解説を生成する (非同期版)"""
+    async def generate_commentary(self, move_idx, history, board_size=19, prev_analysis=None, analysis_lookup=None,
+                                  deadline=None):
+        """
+        【事実先行型】Orchestratorから得た構造化データに基づき、AIによる解説を生成する (非同期版)。
+        全体を deadline（省略時は COMMENTARY_SLA_SECONDS）に収め、盤面解析には LLM 用の時間を残した締め切りを渡す。
+        """
+        deadline = deadline or Deadline(COMMENTARY_SLA_SECONDS)
         try:
             from utils.logger import logger
             import asyncio
             logger.info(f"AI Commentary Generation Start (Move {move_idx})", layer="AI_COMMENTATOR")
             
             # 1. Orchestratorによる一括並列解析
-            collector = await self.orchestrator.analyze_full(history, board_size, prev_analysis=prev_analysis)
+            collector = await self.orchestrator.analyze_full(history, board_size, prev_analysis=prev_analysis,
+                                                             analysis_lookup=analysis_lookup,
+                                                             deadline=deadline.child(COMMENTARY_LLM_RESERVE_SECONDS))
             ana_result = getattr(collector, 'raw_analysis', None)
             if not ana_result:
                 return {
@@ -105,18 +114,25 @@ class GeminiCommentator:
             ]]
 
             async def _call_gemini_async(sys, usr):
-                # システムプロンプト内の変数も置換
+                # システムプロンプト内の変数も置換（締め切りまでに応答が無ければ TimeoutError）
                 final_sys = sys.replace("{last_player}", last_c_jp).replace("{next_player}", next_c_jp)
-                return await asyncio.to_thread(
+                return await asyncio.wait_for(asyncio.to_thread(
                     self.client.models.generate_content,
                     model=GEMINI_MODEL_NAME,
                     config=types.GenerateContentConfig(system_instruction=final_sys, safety_settings=safety),
                     contents=[types.Content(role="user", parts=[types.Part(text=usr)])]
-                )
+                ), timeout=deadline.remaining())
 
             # 初回生成
             logger.debug("Calling Gemini for initial commentary...", layer="AI")
-            response = await _call_gemini_async(sys_inst, user_prompt)
+            try:
+                response = await _call_gemini_async(sys_inst, user_prompt)
+            except asyncio.TimeoutError:
+                logger.error("Gemini did not respond within the commentary deadline", layer="AI")
+                return {
+                    "text": f"【解析事実】\n{fact_summary}\n\n(制限時間内にAIの解説を生成できませんでした。)",
+                    "collector": collector
+                }
             final_text = ""
             if response.candidates and response.candidates[0].content.parts:
                 final_text = "".join([p.text for p in response.candidates[0].content.parts if p.text])
@@ -137,8 +153,13 @@ class GeminiCommentator:
                 retry_prompt = f"{user_prompt}\n\n=== AI自己診断による再生成の指示 ===\n自身の内部チェックで以下の懸念が発見されました：\n{diag_reason}\n\nこれを修正して解説を再生成してください。"
                 
                 logger.info("Calling Gemini for RE-GENERATION (Self-Correction Retry)...", layer="AI")
-                retry_res = await _call_gemini_async(sys_inst, retry_prompt)
-                if retry_res.candidates and retry_res.candidates[0].content.parts:
+                try:
+                    retry_res = await _call_gemini_async(sys_inst, retry_prompt)
+                except asyncio.TimeoutError:
+                    # 再生成が締め切りに間に合わない場合は初回の解説を使う
+                    logger.warning("Self-correction retry skipped: commentary deadline reached.", layer="AI")
+                    retry_res = None
+                if retry_res and retry_res.candidates and retry_res.candidates[0].content.parts:
                     final_text = "".join([p.text for p in retry_res.candidates[0].content.parts if p.text])
                     logger.info("AI Commentary Corrected (Self-Check).", layer="AI")
 
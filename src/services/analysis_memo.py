@@ -0,0 +1,149 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.analysis_dto import AnalysisResult
+from core.board_simulator import SimulationContext
+from core.game_board import Color
+from core.inference_fact import StabilityMetadata
+from core.point import Point
+from core.stability_analyzer import StabilityAnalyzer
+from services.api_client import async_api_client
+from utils.deadline import Deadline
+from utils.metrics import metrics
+
+MEMO_REQUESTS = metrics.counter("analysis_memo_requests_total", "AnalysisMemo artifact lookups by artifact and result (memo/seed/computed)")
+
+CURRENT = "current"
+PREVIOUS = "previous"
+
+
+@dataclass
+class ChainMap:
+    """盤上の連の一覧と、座標から連の番号を引く索引"""
+    chains: List[Tuple[Color, List[Point]]]
+    index: Dict[Point, int]
+
+    def chain_at(self, pt: Point) -> Optional[Tuple[Color, List[Point]]]:
+        i = self.index.get(pt)
+        return self.chains[i] if i is not None else None
+
+
+def _history_key(history) -> tuple:
+    return tuple((str(m[0]).upper(), str(m[1]).upper()) for m in history)
+
+
+class AnalysisMemo:
+    """
+    1回の analyze_full の間だけ共有される解析結果のメモ。
+    各プロバイダが必要とする局面解析・安定度グループ・連の情報を初回要求時に1度だけ計算し、
+    同時に要求された場合も計算を共有する。どの成果物がメモから返されたかを記録する。
+    """
+
+    def __init__(self, history: List[List[str]], board_size: int, context: SimulationContext, analysis: AnalysisResult,
+                 stability_analyzer: StabilityAnalyzer, prev_analysis: Optional[AnalysisResult] = None,
+                 analysis_lookup: Optional[Callable[[List[List[str]]], Optional[AnalysisResult]]] = None,
+                 deadline: Optional[Deadline] = None):
+        self.history = history
+        self.board_size = board_size
+        self.context = context
+        self.stability_analyzer = stability_analyzer
+        self._lookup = analysis_lookup
+        self.deadline = deadline  # 追加の局面解析はこの締め切りに収める
+        self._tasks: Dict[tuple, asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"memo": 0, "seed": 0, "computed": 0})
+
+        self._seed(("analysis", _history_key(history)), analysis)
+        if prev_analysis is not None and history:
+            self._seed(("analysis", _history_key(history[:-1])), prev_analysis)
+
+    # --- 共通処理 ---
+
+    def _seed(self, key: tuple, value):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._tasks[key] = future
+
+    def _record(self, artifact: str, result: str):
+        self.stats[artifact][result] += 1
+        MEMO_REQUESTS.inc(artifact=artifact, result=result)
+
+    async def _memoized(self, key: tuple, compute):
+        """key の成果物を1度だけ計算する（計算中に要求された場合はその完了を待つ）"""
+        task = self._tasks.get(key)
+        if task is not None:
+            self._record(key[0], "memo")
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(compute())
+        self._tasks[key] = task
+        return await asyncio.shield(task)
+
+    # --- 局面解析 ---
+
+    async def analysis(self, history: List[List[str]]) -> Optional[AnalysisResult]:
+        """指定局面の解析結果（外部キャッシュにあればそれを使い、無ければ API に問い合わせる）"""
+        async def compute():
+            cached = self._lookup(history) if self._lookup else None
+            if cached is not None:
+                self._record("analysis", "seed")
+                return cached
+            self._record("analysis", "computed")
+            return await async_api_client.analyze_move(history, self.board_size, deadline=self.deadline)
+        return await self._memoized(("analysis", _history_key(history)), compute)
+
+    async def prev_analysis(self) -> Optional[AnalysisResult]:
+        """1手前の局面の解析結果"""
+        if not self.history:
+            return None
+        return await self.analysis(self.history[:-1])
+
+    async def urgency(self) -> Optional[dict]:
+        """
+        現在局面の緊急度（api_client.build_urgency の形式）。
+        現在局面の解析結果を使い、パスした局面だけをその結果と同じ探索数で解析する。
+        """
+        async def compute():
+            current = await self.analysis(self.history)
+            if current is None:
+                return None
+            self._record("urgency", "computed")
+            # 締め切りまでに返らない場合は analyze_full がプロバイダごと打ち切る
+            return await async_api_client.analyze_urgency(self.history, self.board_size, current=current)
+        return await self._memoized(("urgency",), compute)
+
+    # --- 盤面由来の成果物 ---
+
+    async def chain_map(self, position: str = CURRENT) -> ChainMap:
+        """現在（または着手前）の盤面の連"""
+        async def compute():
+            self._record("chain_map", "computed")
+            chains = await asyncio.to_thread(self.stability_analyzer.find_chains, self._board(position))
+            index = {pt: i for i, (_, stones) in enumerate(chains) for pt in stones}
+            return ChainMap(chains, index)
+        return await self._memoized(("chain_map", position), compute)
+
+    async def stability_groups(self, position: str = CURRENT) -> List[StabilityMetadata]:
+        """
+        現在（または着手前）の盤面の安定度グループ。
+        着手前の盤面は1手前の解析結果の Ownership で評価し、それが無い場合は現在の解析結果で代用する。
+        """
+        async def compute():
+            if position == PREVIOUS:
+                analysis = await self.prev_analysis() or await self.analysis(self.history)
+            else:
+                analysis = await self.analysis(self.history)
+            if analysis is None or analysis.ownership is None:
+                return []
+            chains = (await self.chain_map(position)).chains
+            self._record("stability_groups", "computed")
+            return await asyncio.to_thread(self.stability_analyzer.analyze, self._board(position), analysis.ownership,
+                                           getattr(analysis, 'uncertainty', None), chains)
+        return await self._memoized(("stability_groups", position), compute)
+
+    def _board(self, position: str):
+        return self.context.prev_board if position == PREVIOUS else self.context.board
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """成果物ごとの取得結果の内訳（memo: 共有, seed: 外部キャッシュ, computed: 計算）"""
+        return {k: dict(v) for k, v in self.stats.items()}
@@ -1,12 +1,16 @@
-from typing import List, Optional
+from typing import Callable, List, Optional
 from core.board_simulator import BoardSimulator, SimulationContext
 from core.shape_detector import ShapeDetector
 from core.stability_analyzer import StabilityAnalyzer
 from core.inference_fact import InferenceFact, FactCategory, FactCollector, TemporalScope
 from core.analysis_dto import AnalysisResult
 from core.board_region import BoardRegion, RegionType
-from services.api_client import api_client
+from services.api_client import async_api_client
+from services.analysis_memo import AnalysisMemo
+from utils.deadline import Deadline
 from utils.logger import logger
+from utils.metrics import metrics
+from config import COMMENTARY_SLA_SECONDS, COMMENTARY_LLM_RESERVE_SECONDS
 from services.fact_providers import (
     ShapeFactProvider, 
     StabilityFactProvider, 
@@ -20,6 +24,19 @@ from services.fact_providers import (
     MoveQualityFactProvider
 )
 
+STEP_TIME = metrics.histogram("orchestrator_step_seconds", "AnalysisOrchestrator.analyze_full time per step")
+PROVIDER_TIME = metrics.histogram("fact_provider_seconds", "provide_facts duration per fact provider")
+
+# 締め切りを過ぎていても、盤面だけで完結する事実生成のために与える最低限の時間（秒）
+PROVIDER_MIN_SECONDS = 1.0
+
+
+async def _timed_provider(provider, collector, context, analysis, memo):
+    """プロバイダの処理時間を計測しながら事実生成を実行する"""
+    with PROVIDER_TIME.time(provider=type(provider).__name__):
+        await provider.provide_facts(collector, context, analysis, memo)
+
+
 class AnalysisOrchestrator:
     """事実生成プロバイダを統括し、整理された『事実セット』を構築する責任を持つ"""
 
@@ -43,10 +60,18 @@ class AnalysisOrchestrator:
             KoFactProvider(board_size)
         ]
 
-    async def analyze_full(self, history, board_size=None, prev_analysis: Optional[AnalysisResult] = None) -> FactCollector:
-        """全ての解析事実を収集し、トリアージ済みの FactCollector を返す (非同期並列版)"""
+    async def analyze_full(self, history, board_size=None, prev_analysis: Optional[AnalysisResult] = None,
+                           analysis_lookup: Optional[Callable[[list], Optional[AnalysisResult]]] = None,
+                           deadline: Optional[Deadline] = None) -> FactCollector:
+        """
+        全ての解析事実を収集し、トリアージ済みの FactCollector を返す (非同期並列版)。
+        analysis_lookup は解析済みの局面を引くための関数（AnalysisService のキャッシュなど）で、あればエンジンへの問い合わせを省く。
+        deadline はエンジン解析・各プロバイダの追加解析まで引き継がれ、間に合わない処理は省略される
+        （省略時は解説生成の SLA から LLM 用の時間を除いた締め切り）。
+        """
         import asyncio
         bs = board_size or self.board_size
+        deadline = deadline or Deadline(COMMENTARY_SLA_SECONDS - COMMENTARY_LLM_RESERVE_SECONDS)
         collector = FactCollector()
         
         logger.info(f"Full Analysis Orchestration Start (History len: {len(history)})", layer="ORCHESTRATOR")
@@ -55,7 +80,10 @@ class AnalysisOrchestrator:
         logger.debug("Step 1: KataGo Base Analysis started...", layer="ORCHESTRATOR")
         import time
         t0 = time.time()
-        ana_data = await asyncio.to_thread(api_client.analyze_move, history, bs, include_pv=True)
+        ana_data = analysis_lookup(history) if analysis_lookup else None
+        if ana_data is None:
+            ana_data = await async_api_client.analyze_move(history, bs, include_pv=True, deadline=deadline)
+        STEP_TIME.observe(time.time() - t0, step="engine")
         logger.debug(f"Step 1 finished in {time.time()-t0:.2f}s", layer="ORCHESTRATOR")
         
         if not ana_data:
@@ -67,6 +95,7 @@ class AnalysisOrchestrator:
         t0 = time.time()
         curr_ctx = await asyncio.to_thread(self.simulator.reconstruct_to_context, history, bs)
         curr_ctx.prev_analysis = prev_analysis
+        STEP_TIME.observe(time.time() - t0, step="reconstruct")
         logger.debug(f"Step 2 finished in {time.time()-t0:.2f}s", layer="ORCHESTRATOR")
 
         # 3. 各プロバイダによる事実生成の並列実行
@@ -78,24 +107,30 @@ class AnalysisOrchestrator:
         self.stability_analyzer.board_size = bs
         self.board_region.board_size = bs
 
+        # 各プロバイダが要求する解析結果・安定度グループなどはこのリクエスト内で1度だけ計算して共有する
+        memo = AnalysisMemo(history, bs, curr_ctx, ana_data, self.stability_analyzer,
+                            prev_analysis=prev_analysis, analysis_lookup=analysis_lookup, deadline=deadline)
+
         t0 = time.time()
         tasks = []
         for provider in self.providers:
             provider.board_size = bs
-            tasks.append(provider.provide_facts(collector, curr_ctx, ana_data))
+            tasks.append(_timed_provider(provider, collector, curr_ctx, ana_data, memo))
         
-        # タイムアウトを設定して実行 (個別のプロバイダの遅延が全体を止めないようにする)
+        # 締め切りまでの残り時間で打ち切る (個別のプロバイダの遅延が全体を止めないようにする)
         try:
-            await asyncio.wait_for(asyncio.gather(*tasks), timeout=45.0)
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout=max(deadline.remaining(), PROVIDER_MIN_SECONDS))
         except asyncio.TimeoutError:
             logger.error("Fact generation timed out!", layer="ORCHESTRATOR")
             collector.add(FactCategory.STRATEGY, "一部の解析（緊急度など）が制限時間内に完了しませんでした。", severity=3)
         
-        logger.debug(f"Step 3 finished in {time.time()-t0:.2f}s", layer="ORCHESTRATOR")
+        STEP_TIME.observe(time.time() - t0, step="providers")
+        logger.debug(f"Step 3 finished in {time.time()-t0:.2f}s (memo: {memo.summary()})", layer="ORCHESTRATOR")
 
         # 6. 後続処理用のデータ保持
         collector.raw_analysis = ana_data 
         collector.context = curr_ctx
+        collector.memo_stats = memo.summary()
         
         # 7. 事実のフィルタリング（焦点の絞り込み）
         self._filter_facts(collector)
@@ -1,19 +1,29 @@
 import os
 import hashlib
 import dataclasses
-import json
-import time
-import concurrent.futures
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import List, Dict, Optional, Any, Tuple
 from sgfmill import sgf
 
 from core.analysis_dto import AnalysisResult
+from core.analysis_archive import AnalysisArchive, ArchivedMoves, ARCHIVE_FILENAME, write_archive
 from core.game_board import GameBoard, Color
 from core.point import Point
-from services.api_client import api_client
+from services.api_client import api_client, BULK, PREFETCH
+from services.bulk_pipeline import BulkPipeline, Stage, ImageRenderPool
+from services.analysis_store import AnalysisStore, STORE_FILENAME, sgf_content_hash
+from services.prefetcher import AnalysisPrefetcher
 from utils.event_bus import event_bus, AppEvents
 from utils.logger import logger
-from config import OUTPUT_BASE_DIR
+from utils.metrics import metrics
+from utils.lru_cache import SizedLRUCache
+from config import (OUTPUT_BASE_DIR, BULK_FETCH_WORKERS, BULK_RENDER_WORKERS, BULK_QUEUE_SIZE,
+                    ANALYSIS_CACHE_MAX_BYTES, PREFETCH_REPLIES, PREFETCH_JOIN_TIMEOUT)
+
+CACHE_REQUESTS = metrics.counter("analysis_cache_requests_total", "AnalysisService cache lookups by result (hit/miss)")
+BULK_MOVES = metrics.counter("analysis_bulk_moves_total", "Moves processed by SGF bulk analysis by outcome")
+BULK_RENDER_TIME = metrics.histogram("analysis_bulk_render_seconds", "Board image render + save time per move in bulk analysis")
 
 class AnalysisService:
     """
@@ -22,8 +32,8 @@ class AnalysisService:
     """
     def __init__(self, task_manager):
         self.task_manager = task_manager
-        # キャッシュ: {history_hash: AnalysisResult}
-        self._cache: Dict[str, AnalysisResult] = {}
+        # キャッシュ: {history_hash: AnalysisResult}（Ownership 等の大きさを数えて上限を守る LRU）
+        self._cache = SizedLRUCache("analysis_service", ANALYSIS_CACHE_MAX_BYTES)
         # インデックスベースのキャッシュ（SGF一括解析用）
         self._index_cache: List[Optional[AnalysisResult]] = []
         # 全体の勝率履歴（グラフ用）
@@ -31,38 +41,89 @@ class AnalysisService:
         
         self.analyzing_sgf = False
         self._stop_requested = False
+        self._pipeline: Optional[BulkPipeline] = None
+        # 実行中の一括解析の識別子（API の cancel_tag にも使う。新しい解析を始めると差し替わる）
+        self._run_tag: Optional[str] = None
+        # 一括解析の結果の保存先（対局ごと、1手ずつ追記）
+        self._store: Optional[AnalysisStore] = None
+        self._sgf_hash: Optional[str] = None
+        # 一括解析の完了後に書き出す固定長アーカイブ（mmap）
+        self._archive: Optional[AnalysisArchive] = None
+        # 現在の局面の前後・応手の先読み（最初に使うときに起動する）
+        self._prefetcher: Optional[AnalysisPrefetcher] = None
+        metrics.gauge("analysis_cache_entries", "Entries held in the AnalysisService cache").set_function(lambda: len(self._cache))
 
     def _get_history_hash(self, history: List[List[str]]) -> str:
         """着手履歴からユニークなハッシュ値を生成する"""
         return hashlib.md5(str(history).encode()).hexdigest()
 
-    def request_analysis(self, history: List[List[str]], board_size: int = 19):
+    def get_cached_analysis(self, history: List[List[str]]) -> Optional[AnalysisResult]:
+        """解析済みの局面であればその結果を返す（無ければ None）"""
+        return self._cache.get(self._get_history_hash(history))
+
+    def request_analysis(self, history: List[List[str]], board_size: int = 19,
+                         line: Optional[List[List[str]]] = None, prefetch_replies: bool = False):
         """
         指定された履歴の解析をリクエストする。
         キャッシュがあれば即座にイベントを発行し、なければ非同期で取得する。
+        line（本譜の手順）を渡すと、解析が済んだ後にその前後の局面を、
+        prefetch_replies=True の場合は候補手への応手も先読みする。
         """
         h_hash = self._get_history_hash(history)
         move_idx = len(history)
         
         # 1. キャッシュチェック
-        if h_hash in self._cache:
+        cached = self._cache.get(h_hash)
+        if cached is not None:
+            CACHE_REQUESTS.inc(result="hit")
             logger.debug(f"Analysis Cache Hit for move {move_idx}", layer="ANALYSIS_SERVICE")
-            self._notify_result(self._cache[h_hash], move_idx)
+            self._notify_result(cached, move_idx)
+            self._schedule_prefetch(history, board_size, line, prefetch_replies, cached)
             return
+        CACHE_REQUESTS.inc(result="miss")
 
-        # 2. 非同期で解析実行
+        # 2. 非同期で解析実行（先読みが送信済みであれば少しだけその結果を待ち、それ以外は打ち切って送り直す）
         def _task():
+            if self._prefetcher is not None:
+                pending = self._prefetcher.join(h_hash)
+                try:
+                    result = pending.result(timeout=PREFETCH_JOIN_TIMEOUT) if pending is not None else None
+                except FutureTimeoutError:
+                    result = None
+                if result:
+                    return result
+                self._prefetcher.drop(h_hash)
             return api_client.analyze_move(history, board_size)
 
         def _on_success(result: Optional[AnalysisResult]):
             if result:
                 self._cache[h_hash] = result
                 self._notify_result(result, move_idx)
+                self._schedule_prefetch(history, board_size, line, prefetch_replies, result)
             else:
                 logger.warning(f"Analysis failed for move {move_idx}", layer="ANALYSIS_SERVICE")
 
         self.task_manager.run_task(_task, on_success=_on_success)
 
+    def _schedule_prefetch(self, history: List[List[str]], board_size: int, line: Optional[List[List[str]]],
+                           prefetch_replies: bool, result: AnalysisResult):
+        if line is None and not prefetch_replies:
+            return
+        if self._prefetcher is None:
+            self._prefetcher = AnalysisPrefetcher(
+                key=self._get_history_hash,
+                is_cached=lambda k: k in self._cache,
+                on_result=lambda k, h, r: self._cache.put(k, r),
+                # 一括解析中・エンジンの混雑中は先読みを送らない
+                is_busy=lambda: self.analyzing_sgf or api_client.async_client.congested(PREFETCH))
+        replies = [c.move for c in result.candidates[:PREFETCH_REPLIES]] if prefetch_replies else None
+        self._prefetcher.schedule(line if line is not None else history, len(history), board_size, replies)
+
+    def cancel_prefetch(self):
+        """予定中・実行中の先読みを全て取りやめる"""
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+
     def _notify_result(self, result: AnalysisResult, move_idx: int):
         """解析結果をイベントバスに流す"""
         # UIが期待するデータ構造を作成
@@ -86,34 +147,74 @@ class AnalysisService:
             return self._index_cache[idx]
         return None
 
+    def read_stored_results(self, cursor: Optional[Tuple[str, str, int]] = None) -> Tuple[Dict[int, AnalysisResult], Optional[Tuple[str, str, int]]]:
+        """
+        一括解析のストアに cursor 以降に追記された結果 {手数: 結果} と次回の cursor を返す。
+        表示側はこれを定期的に呼んで差分だけを取り込む。
+        cursor は (ストアのパス, SGF のハッシュ, 追記番号)。別の対局・別のストアの cursor は先頭から読み直す。
+        """
+        store, sgf_hash = self._store, self._sgf_hash
+        if store is None or sgf_hash is None:
+            return {}, cursor
+        seq = cursor[2] if cursor is not None and cursor[:2] == (store.path, sgf_hash) else 0
+        results, seq = store.since(sgf_hash, seq)
+        return results, (store.path, sgf_hash, seq)
+
     def start_sgf_analysis(self, sgf_path: str, renderer: Any):
         """SGFファイルの一括解析を開始する"""
-        if self.analyzing_sgf:
+        was_running = self.analyzing_sgf
+        if was_running:
             self.stop_sgf_analysis()
         
+        self.cancel_prefetch()
+        # 新しい対局のストアを開くまで、前の対局の結果を読ませない。
+        # 前の解析が実行中ならそのストアは前の解析の終了時に閉じる
+        previous = self._store
+        self._store, self._sgf_hash = None, None
+        if previous is not None and not was_running:
+            previous.close()
         self.analyzing_sgf = True
         self._stop_requested = False
+        run_tag = self._run_tag = self._new_run_tag()
         
         def _task():
-            self._run_bulk_analysis(sgf_path, renderer)
+            self._run_bulk_analysis(sgf_path, renderer, run_tag)
             return True
 
         self.task_manager.run_task(_task)
 
     def stop_sgf_analysis(self):
-        """一括解析を停止する"""
+        """
+        一括解析を停止する。
+        待ち中の手は破棄し、実行中の解析要求とエンジン上の探索も打ち切る（完了は待たない）。
+        """
         self._stop_requested = True
         self.analyzing_sgf = False
+        if self._pipeline is not None:
+            self._pipeline.stop()
+        if self._run_tag is not None:
+            api_client.cancel(self._run_tag)
+
+    @staticmethod
+    def _new_run_tag() -> str:
+        return f"bulk-{uuid.uuid4().hex[:12]}"
+
+    def _is_current_run(self, run_tag: str) -> bool:
+        return self._run_tag == run_tag
 
-    def _run_bulk_analysis(self, path: str, renderer: Any):
+    def _run_bulk_analysis(self, path: str, renderer: Any, run_tag: Optional[str] = None):
         """バックグラウンドスレッドで実行される一括解析の実体"""
+        if run_tag is None:
+            run_tag = self._run_tag = self._new_run_tag()
+        store = None
         try:
             name = os.path.splitext(os.path.basename(path))[0]
             out_dir = os.path.join(OUTPUT_BASE_DIR, name)
             os.makedirs(out_dir, exist_ok=True)
 
             with open(path, "rb") as f:
-                game = sgf.Sgf_game.from_bytes(f.read())
+                sgf_bytes = f.read()
+            game = sgf.Sgf_game.from_bytes(sgf_bytes)
             board_size = game.get_size()
             
             nodes = []
@@ -150,62 +251,42 @@ class AnalysisService:
                     "board_copy": temp_board.copy()
                 })
 
-            completed_count = 0
-            
-            # 2. 並列解析
-            # 注: api_client.analyze_move は内部でリトライ等を行う
-            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                futures = {
-                    executor.submit(api_client.analyze_move, m["history"], board_size, include_pv=True): m 
-                    for m in all_moves_info
-                }
-                
-                for future in concurrent.futures.as_completed(futures):
-                    if self._stop_requested: break
-                    
-                    move_info = futures[future]
-                    m_num = move_info["m_num"]
-                    
-                    try:
-                        result = future.result()
-                        if result:
-                            # キャッシュへの保存
-                            self._index_cache[m_num] = result
-                            h_hash = self._get_history_hash(move_info["history"])
-                            self._cache[h_hash] = result
-                            self._winrate_history[m_num] = result.winrate
-                            
-                            # 画像の保存（レンダラーを使用）
-                            img_text = f"Move {m_num} | WR(B): {result.winrate_label} | Score(B): {result.score_lead:.1f}"
-                            
-                            # ヒートマップ用データの準備
-                            render_kwargs = {"analysis_text": img_text, "history": move_info["history"]}
-                            if result.ownership:
-                                render_kwargs["ownership"] = result.ownership
-                                
-                            img = renderer.render(move_info["board_copy"], **render_kwargs)
-                            img.save(os.path.join(out_dir, f"move_{m_num:03d}.png"))
-                            
-                            completed_count += 1
-                            event_bus.publish(AppEvents.PROGRESS_UPDATED, completed_count)
-                            event_bus.publish(AppEvents.STATUS_MSG_UPDATED, f"Analyzing: {completed_count}/{total_moves}")
-                            
-                            # リアルタイム更新のためにイベント発行
-                            # NOTE: _notify_result は winrate_history 全体を使うが、マルチスレッド中は不完全かもしれない。
-                            # しかし個別の結果通知としては十分。
-                            event_bus.publish("ANALYSIS_RESULT_READY", {
-                                "result": result,
-                                "winrate_text": result.winrate_label,
-                                "score_text": f"{result.score_lead:.1f}",
-                                "winrate_history": list(self._winrate_history), # コピーを渡す
-                                "current_move": m_num,
-                                "candidates": [dataclasses.asdict(c) for c in result.candidates]
-                            })
-                    except Exception as e:
-                        logger.error(f"Bulk Analysis Error at move {m_num}: {e}")
-
-            # 解析データの永続化
-            self._save_analysis_json(out_dir, board_size)
+            # 保存済みの結果を読み込み、未解析の手から再開する
+            self._open_store(out_dir, sgf_content_hash(sgf_bytes), board_size, total_moves)
+            store = self._store
+            stored = store.load_all(self._sgf_hash, total_moves)
+            for m, result in zip(all_moves_info, stored):
+                if result is not None:
+                    m["result"] = result
+                    m["stored"] = True
+            resume_from = store.first_missing(self._sgf_hash, total_moves)
+            if resume_from is None:
+                logger.info(f"All {total_moves} moves of {name} are already stored", layer="ANALYSIS_SERVICE")
+            elif resume_from != 0:
+                logger.info(f"Resuming bulk analysis of {name} from move {resume_from} "
+                            f"({total_moves - stored.count(None)}/{total_moves} stored)", layer="ANALYSIS_SERVICE")
+
+            # 2. 段ごとに分けた並列解析（取得 → 保存 → 描画 → 通知）
+            render_pool = ImageRenderPool(renderer, BULK_RENDER_WORKERS)
+            pipeline = self._build_bulk_pipeline(board_size, total_moves, out_dir, render_pool, run_tag)
+            try:
+                if not self._stop_requested and self._is_current_run(run_tag):
+                    self._pipeline = pipeline
+                    pipeline.run(all_moves_info)
+            finally:
+                if self._pipeline is pipeline:
+                    self._pipeline = None
+                render_pool.close()
+            shared = api_client.transposition_stats()["hit_rate"].get(BULK, 0.0)
+            logger.info(f"Bulk analysis pipeline finished: {pipeline.stats()} "
+                        f"(served by transposition: {shared:.1%})", layer="ANALYSIS_SERVICE")
+
+            # 別の SGF の解析に切り替わっていれば、後始末は新しい解析に任せる
+            if not self._is_current_run(run_tag):
+                return
+
+            # 解析データをアーカイブに書き出し、以降はそちらを参照する
+            self._write_archive(out_dir, board_size)
             
             self.analyzing_sgf = False
             event_bus.publish(AppEvents.STATUS_MSG_UPDATED, "Analysis Ready")
@@ -213,20 +294,113 @@ class AnalysisService:
 
         except Exception as e:
             logger.error(f"Critical error in bulk analysis: {e}")
-            self.analyzing_sgf = False
+            if self._is_current_run(run_tag):
+                self.analyzing_sgf = False
+        finally:
+            # 別の対局に切り替わった後は、この解析が開いたストアをここで閉じる
+            if store is not None and store is not self._store:
+                store.close()
+
+    def _build_bulk_pipeline(self, board_size: int, total_moves: int, out_dir: str,
+                             render_pool: ImageRenderPool, run_tag: Optional[str] = None) -> BulkPipeline:
+        """
+        一括解析のパイプラインを組み立てる。
+        fetch: 解析の取得 / persist: キャッシュへの格納 / render: 盤面画像の描画（別プロセス）/ notify: UI への通知
+        fetch の同時実行数（BULK_FETCH_WORKERS）がエンジンに出す要求の上限になる。
+        """
+        state = {"completed": 0}
+        # 停止後に次の解析が始まっても、この解析の結果が混ざらないよう参照先を固定する
+        store, sgf_hash = self._store, self._sgf_hash
+        index_cache, winrate_history = self._index_cache, self._winrate_history
 
-    def _save_analysis_json(self, out_dir: str, board_size: int):
-        """解析結果をJSONファイルとして保存する"""
+        def fetch(m):
+            if m.get("stored"):
+                return m
+            result = api_client.analyze_move(m["history"], board_size, include_pv=True, request_class=BULK,
+                                             cancel_tag=run_tag)
+            if not result:
+                BULK_MOVES.inc(outcome="cancelled" if pipeline.stopped else "failed")
+                return None
+            m["result"] = result
+            return m
+
+        def persist(m):
+            result = m["result"]
+            if not m.get("stored"):
+                store.put(sgf_hash, m["m_num"], result)
+            index_cache[m["m_num"]] = result
+            self._cache[self._get_history_hash(m["history"])] = result
+            winrate_history[m["m_num"]] = result.winrate
+            return m
+
+        def render(m):
+            result, m_num = m["result"], m["m_num"]
+            path = os.path.join(out_dir, f"move_{m_num:03d}.png")
+            if m.get("stored") and os.path.exists(path):
+                return m
+            img_text = f"Move {m_num} | WR(B): {result.winrate_label} | Score(B): {result.score_lead:.1f}"
+            render_kwargs = {"analysis_text": img_text, "history": m["history"]}
+            if result.ownership is not None:
+                render_kwargs["ownership"] = result.ownership
+            with BULK_RENDER_TIME.time():
+                render_pool.render(m["board_copy"], path, **render_kwargs)
+            return m
+
+        def notify(m):
+            result = m["result"]
+            BULK_MOVES.inc(outcome="stored" if m.get("stored") else "analyzed")
+            state["completed"] += 1
+            completed = state["completed"]
+            event_bus.publish(AppEvents.PROGRESS_UPDATED, completed)
+            event_bus.publish(AppEvents.STATUS_MSG_UPDATED,
+                              f"Analyzing: {completed}/{total_moves} ({pipeline.throughput_text()})")
+            # 勝率履歴の全体ではなくこの手の差分だけを流す（間引かれた分はイベントバスで合成される）
+            event_bus.publish(AppEvents.ANALYSIS_PROGRESS, {
+                "updates": {m["m_num"]: result},
+                "completed": completed,
+                "total": total_moves,
+            })
+            return None
+
+        pipeline = BulkPipeline([
+            Stage("fetch", fetch, workers=BULK_FETCH_WORKERS, queue_size=BULK_QUEUE_SIZE),
+            Stage("persist", persist, workers=1, queue_size=BULK_QUEUE_SIZE),
+            Stage("render", render, workers=max(1, BULK_RENDER_WORKERS), queue_size=BULK_QUEUE_SIZE),
+            Stage("notify", notify, workers=1, queue_size=BULK_QUEUE_SIZE),
+        ])
+        return pipeline
+
+    def _open_store(self, out_dir: str, sgf_hash: str, board_size: int, total_moves: int):
+        """対局の出力ディレクトリのストアを開く（前回開いていたストアは閉じる）"""
+        if self._store is not None and self._store.path != os.path.join(out_dir, STORE_FILENAME):
+            self._store.close()
+            self._store = None
+        if self._store is None:
+            self._store = AnalysisStore(os.path.join(out_dir, STORE_FILENAME))
+        self._store.open_game(sgf_hash, board_size, total_moves)
+        self._sgf_hash = sgf_hash
+
+    def get_bulk_progress(self) -> Optional[Dict[str, dict]]:
+        """実行中の一括解析の段ごとの進捗・処理速度（実行中でなければ None）"""
+        pipeline = self._pipeline
+        return pipeline.stats() if pipeline else None
+
+    def _write_archive(self, out_dir: str, board_size: int):
+        """解析結果を固定長アーカイブとして書き出し、手数ごとの結果の参照先をアーカイブに切り替える"""
         try:
-            log_data = {
-                "board_size": board_size,
-                "moves": [dataclasses.asdict(r) if r else None for r in self._index_cache]
-            }
-            json_path = os.path.join(out_dir, "analysis.json")
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(log_data, f, indent=2, ensure_ascii=False)
+            path = os.path.join(out_dir, ARCHIVE_FILENAME)
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+            write_archive(path, board_size, self._index_cache, sgf_hash=self._sgf_hash or "")
+            self._archive = AnalysisArchive(path)
+            self._index_cache = ArchivedMoves(self._archive)
         except Exception as e:
-            logger.error(f"Failed to save analysis.json: {e}")
+            logger.error(f"Failed to write analysis archive: {e}")
+
+    def get_archive(self) -> Optional[AnalysisArchive]:
+        """最後に完了した一括解析のアーカイブ（無ければ None）"""
+        return self._archive
 
     def generate_full_context_analysis(self, move_idx, history, board_size, gemini, simulator, visualizer):
         """
@@ -241,12 +415,12 @@ class AnalysisService:
                 if len(history) > 1:
                     prev_history = history[:-1]
                     prev_hash = self._get_history_hash(prev_history)
-                    if prev_hash in self._cache:
-                         prev_result = self._cache[prev_hash]
+                    prev_result = self._cache.get(prev_hash)
                 
                 # 1. 解説生成 (内部で orchestrator.analyze_full を実行し、並列解析が行われる)
                 # generate_commentary returns {"text": str, "collector": FactCollector}
-                res = await gemini.generate_commentary(move_idx, history, board_size, prev_analysis=prev_result)
+                res = await gemini.generate_commentary(move_idx, history, board_size, prev_analysis=prev_result,
+                                                       analysis_lookup=self.get_cached_analysis)
                 commentary_text = res["text"]
                 collector = res["collector"]
                 
@@ -276,11 +450,8 @@ class AnalysisService:
                     
                     # 失敗図（放置被害）
                     if meta.is_critical:
-                        # UrgencyFactProvider が内部で既に分析している opponent_pv を取得したいが、
-                        # 現状 metadata には含まれていないため、必要なら provider を拡張して保持させる。
-                        # ここでは簡単のため、再度取得（非同期なので速い）
-                        urgency_data = await asyncio.to_thread(api_client.analyze_urgency, history, board_size)
-                        opp_pv = urgency_data.get("opponent_pv", [])
+                        # 被害手順は UrgencyFactProvider が解析済みのものを使う（再解析しない）
+                        opp_pv = meta.opponent_pv
                         if opp_pv:
                             thr_seq = ["pass"] + opp_pv
                             thr_ctx = simulator.simulate_sequence(curr_ctx, thr_seq, starting_color=meta.next_player)
@@ -0,0 +1,147 @@
+"""
+対局ごとの解析結果の保存先（SQLite、追記のみ）。
+SGF の内容のハッシュと手数をキーに1手ずつ書き込むため、解析の途中で停止・異常終了しても結果は失われず、
+同じ棋譜を開き直した場合は未解析の手から再開できる。読み出しも1手単位・追記分のみで行える。
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.analysis_dto import AnalysisResult
+from utils.logger import logger
+from utils.metrics import metrics
+
+STORE_WRITES = metrics.counter("analysis_store_writes_total", "Move results appended to the per-game analysis store by outcome")
+STORE_READS = metrics.counter("analysis_store_reads_total", "Per-game analysis store reads by kind (move/since/all)")
+
+STORE_FILENAME = "analysis.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    sgf_hash TEXT PRIMARY KEY,
+    board_size INTEGER NOT NULL,
+    total_moves INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS moves (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sgf_hash TEXT NOT NULL,
+    move_idx INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (sgf_hash, move_idx)
+);
+"""
+
+
+def sgf_content_hash(data: bytes) -> str:
+    """SGF ファイルの内容から対局を識別するハッシュ（ファイル名が同じでも内容が違えば別の対局）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class AnalysisStore:
+    """
+    1つの出力ディレクトリ（対局）に対応する解析結果のストア。
+    書き込みは1手ごとに即座にコミットする。同じ手の結果が既にあれば上書きしない。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- 対局 ---
+
+    def open_game(self, sgf_hash: str, board_size: int, total_moves: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO games (sgf_hash, board_size, total_moves, created_at) VALUES (?, ?, ?, ?)",
+                (sgf_hash, board_size, total_moves, time.time()))
+
+    def game_info(self, sgf_hash: str) -> Optional[Tuple[int, int]]:
+        """(board_size, total_moves)。登録されていなければ None"""
+        with self._lock:
+            row = self._conn.execute("SELECT board_size, total_moves FROM games WHERE sgf_hash = ?",
+                                     (sgf_hash,)).fetchone()
+        return tuple(row) if row else None
+
+    def latest_game(self) -> Optional[str]:
+        """最後に登録された対局のハッシュ"""
+        with self._lock:
+            row = self._conn.execute("SELECT sgf_hash FROM games ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    # --- 書き込み ---
+
+    def put(self, sgf_hash: str, move_idx: int, result: AnalysisResult) -> bool:
+        """1手分の結果を追記する（既にある場合は False）"""
+        data = json.dumps(result.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO moves (sgf_hash, move_idx, data, created_at) VALUES (?, ?, ?, ?)",
+                (sgf_hash, move_idx, data, time.time()))
+        written = cur.rowcount > 0
+        STORE_WRITES.inc(outcome="written" if written else "duplicate")
+        return written
+
+    # --- 読み出し ---
+
+    def get(self, sgf_hash: str, move_idx: int) -> Optional[AnalysisResult]:
+        """指定した手の結果（未解析なら None）"""
+        STORE_READS.inc(kind="move")
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM moves WHERE sgf_hash = ? AND move_idx = ?",
+                                     (sgf_hash, move_idx)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def completed_moves(self, sgf_hash: str) -> Set[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT move_idx FROM moves WHERE sgf_hash = ?", (sgf_hash,)).fetchall()
+        return {r[0] for r in rows}
+
+    def first_missing(self, sgf_hash: str, total_moves: int) -> Optional[int]:
+        """最初の未解析の手（全て解析済みなら None）"""
+        done = self.completed_moves(sgf_hash)
+        return next((i for i in range(total_moves) if i not in done), None)
+
+    def since(self, sgf_hash: str, cursor: int = 0) -> Tuple[Dict[int, AnalysisResult], int]:
+        """
+        cursor 以降に追記された結果と、次回に渡す cursor を返す（表示側が差分だけを読み込むため）。
+        """
+        STORE_READS.inc(kind="since")
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, move_idx, data FROM moves WHERE sgf_hash = ? AND seq > ? ORDER BY seq",
+                                      (sgf_hash, cursor)).fetchall()
+        results = {}
+        for seq, move_idx, data in rows:
+            result = self._decode(data)
+            if result is not None:
+                results[move_idx] = result
+            cursor = seq
+        return results, cursor
+
+    def load_all(self, sgf_hash: str, total_moves: int) -> List[Optional[AnalysisResult]]:
+        """手数順の結果の一覧（未解析の手は None）"""
+        STORE_READS.inc(kind="all")
+        results: List[Optional[AnalysisResult]] = [None] * total_moves
+        for move_idx, result in self.since(sgf_hash)[0].items():
+            if 0 <= move_idx < total_moves:
+                results[move_idx] = result
+        return results
+
+    def _decode(self, data: str) -> Optional[AnalysisResult]:
+        try:
+            return AnalysisResult.from_dict(json.loads(data))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Corrupt analysis store entry in {self.path}: {e}", layer="ANALYSIS_STORE")
+            return None
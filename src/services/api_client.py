@@ -1,13 +1,34 @@
-import requests
+import asyncio
+import functools
 import threading
-import concurrent.futures
 import time
+from collections import Counter, OrderedDict
 from enum import Enum
 from typing import Optional, Dict, List
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import httpx
 from utils.logger import logger
 from core.analysis_dto import AnalysisResult
+from core.board_map import (msgpack, MAP_ENCODING_F16B64, MSGPACK_MEDIA_TYPE, ANALYSIS_SOURCE_HEADER,
+                            ANALYSIS_SOURCE_ENGINE)
+from core.transposition import TranspositionTable
+from utils.single_flight import AsyncSingleFlight
+from utils.deadline import Deadline
+from utils.adaptive_limiter import AdaptiveLimiter
+from utils.metrics import metrics, SIZE_BUCKETS
+from config import (DEADLINE_MIN_VISITS, API_CLIENT_CONCURRENCY, API_CLIENT_DEGRADED_VISITS_RATIO,
+                    TRANSPOSITION_CACHE_MAX_BYTES, TRANSPOSITION_MAX_MOVES)
+
+CLIENT_REQUEST_TIME = metrics.histogram("api_client_request_seconds", "HTTP round-trip time per endpoint")
+CLIENT_RESPONSE_SIZE = metrics.histogram("api_client_response_bytes", "Response body size per endpoint", buckets=SIZE_BUCKETS)
+CLIENT_ERRORS = metrics.counter("api_client_errors_total", "Failed or rejected requests per endpoint and reason")
+CLIENT_TRANSPOSITIONS = metrics.counter("api_client_transposition_total", "analyze_move lookups in the cross-game transposition table by request class and result (hit/miss)")
+CLIENT_DEGRADED = metrics.counter("api_client_degraded_total", "Requests sent with reduced visits because the engine was congested")
+
+# 解析要求の種類（種類ごとに同時実行数の枠を持つ）
+INTERACTIVE = "interactive"  # 画面操作・解説生成（絞られても拒否・縮小しない）
+BULK = "bulk"                # 一括解析・レポート（混雑時は探索数を減らす）
+PREFETCH = "prefetch"        # 先読み（混雑時は送らずに破棄する）
+REQUEST_CLASSES = (INTERACTIVE, BULK, PREFETCH)
 
 class CircuitState(Enum):
     CLOSED = "CLOSED"      # 正常：リクエストを許可
@@ -58,78 +79,319 @@ class CircuitBreaker:
             else:
                 logger.warning(f"Circuit Breaker: Failure recorded ({self.failure_count}/{self.failure_threshold})", layer="API_CLIENT")
 
-class GoAPIClient:
-    """APIサーバー（katago_api）との通信を専門に扱うクラス（シングルトン推奨）"""
-    
-    _instance = None
+# メトリクス出力用の数値表現
+CIRCUIT_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(GoAPIClient, cls).__new__(cls)
-        return cls._instance
 
-    def __init__(self, base_url="http://127.0.0.1:8000"):
-        if hasattr(self, '_initialized'): return
+def pass_history(history) -> list:
+    """現在の手番がパスした局面の履歴"""
+    color = "W" if history and history[-1][0] == "B" else "B"
+    return list(history) + [[color, "pass"]]
+
+def build_urgency(history, current_res: Optional[AnalysisResult], pass_res: Optional[AnalysisResult]) -> Optional[dict]:
+    """現在局面とパスした局面の解析結果から緊急度（温度）と推奨・被害手順を組み立てる"""
+    if not current_res or not pass_res:
+        return None
+
+    # 自分の最善手のPVを取得
+    best_pv = current_res.candidates[0].pv[:3] if current_res.candidates else []
+
+    score_normal = current_res.score_lead
+    score_pass = pass_res.score_lead
+    urgency = abs(score_normal - score_pass)
+
+    # 相手の連打手順を取得
+    opponent_pv = pass_res.candidates[0].pv[:3] if pass_res.candidates else []
+
+    logger.debug(f"Urgency Results: best_pv={best_pv}, opponent_pv={opponent_pv}", layer="API_CLIENT")
+
+    return {
+        "urgency": urgency,
+        "score_normal": score_normal,
+        "score_pass": score_pass,
+        "is_critical": urgency > 10.0,
+        "best_pv": best_pv,      # 成功図用の手順
+        "opponent_pv": opponent_pv, # 失敗図用の手順
+        "next_player": pass_history(history)[-1][0]
+    }
+
+def _on_client_loop(method):
+    """コルーチンをクライアント専用のイベントループ上で実行する（別ループから await された場合は転送して待つ）"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        coro = method(self, *args, **kwargs)
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+    return wrapper
+
+class AsyncGoAPIClient:
+    """
+    APIサーバー（katago_api）との通信を非同期で扱うクラス。
+    専用スレッドのイベントループ上で接続プール付きの httpx.AsyncClient を使い、
+    1スレッドで多数のリクエストを同時に処理する。どのイベントループからでも await できる。
+    """
+
+    def __init__(self, base_url="http://127.0.0.1:8000", max_connections=64):
         self.base_url = base_url
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
-        self._is_syncing = False
+        self.max_connections = max_connections
         self.breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30)
-        
-        # 堅牢なリトライ設定
-        # サーキットブレーカーで管理するため、HTTPレイヤーのリトライは無効化または最小限にする
-        retry_strategy = Retry(
-            total=0, 
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session = requests.Session()
-        self.session.mount("http://", adapter)
-        self._initialized = True
+        # 同一局面の同時解析（GUIの表示・オーケストレータ・各Providerから重複して届く）を1回にまとめる
+        self.analysis_flight = AsyncSingleFlight("analyze_move")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._is_syncing = False
+        # セッション同期: 送信待ちの最新状態（手数移動は最新のものだけ送ればよい）
+        self._session_lock = threading.Lock()
+        self._session_target = None
+        self._session_flush_scheduled = False
+        self._session_lines: Dict[str, list] = {}  # サーバーへ送信済みの手順
+        # 解析系エンドポイントの同時実行数（応答時間に応じて種類ごとに調整する。リミッタはクライアントのループ上でのみ操作する）
+        self.limiters = {
+            cls: AdaptiveLimiter(cls, *API_CLIENT_CONCURRENCY[cls], shed_when_congested=(cls == PREFETCH))
+            for cls in REQUEST_CLASSES
+        }
+        # cancel_tag ごとの実行中の解析タスクと、打ち切り済みの tag（いずれもクライアントのループ上でのみ操作する）
+        self._tagged_tasks: Dict[str, set] = {}
+        self._cancelled_tags: "OrderedDict[str, None]" = OrderedDict()
+        # 枠を得てサーバーへ送信済みの解析の cancel_tag ごとの件数（ループ上で更新し、他スレッドからは sent() で参照する）
+        self._sent_tags: Counter = Counter()
+        # 対局・盤面の向きをまたいで同じ局面の解析結果を共有する置換表（序盤の定石などの再解析を省く）
+        self.transpositions = TranspositionTable(TRANSPOSITION_CACHE_MAX_BYTES, TRANSPOSITION_MAX_MOVES)
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """サーキットブレーカーや重複吸収の状態をメトリクスとして公開する"""
+        metrics.gauge("api_client_circuit_state", "Circuit breaker state (0=CLOSED, 1=HALF_OPEN, 2=OPEN)").set_function(
+            lambda: CIRCUIT_STATE_VALUES[self.breaker.state])
+        metrics.gauge("api_client_circuit_failures", "Consecutive failures recorded by the circuit breaker").set_function(
+            lambda: self.breaker.failure_count)
+        coalescing = metrics.gauge("api_client_coalescing", "Single-flight statistics for analyze_move (executed/absorbed/in_flight)")
+        for kind in ("executed", "absorbed", "in_flight"):
+            coalescing.set_function(lambda k=kind: self.analysis_flight.stats()[k], kind=kind)
+        concurrency = metrics.gauge("api_client_concurrency", "Adaptive concurrency limiter state per request class (limit/in_flight/waiting/shed)")
+        latency = metrics.gauge("api_client_latency_seconds", "Smoothed and baseline analysis latency per request class")
+        for cls, limiter in self.limiters.items():
+            for kind in ("limit", "in_flight", "waiting", "shed"):
+                concurrency.set_function(lambda l=limiter, k=kind: l.stats()[k], request_class=cls, kind=kind)
+            latency.set_function(lambda l=limiter: l.latency_avg or 0.0, request_class=cls, kind="avg")
+            latency.set_function(lambda l=limiter: l.latency_baseline or 0.0, request_class=cls, kind="baseline")
+        transposition = metrics.gauge("api_client_transposition_hit_rate", "Fraction of analyze_move lookups served from the transposition table")
+        for cls in REQUEST_CLASSES:
+            transposition.set_function(lambda c=cls: self.transpositions.hit_rate(c), request_class=cls)
+
+    # --- イベントループ管理 ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=loop.run_forever, daemon=True, name="api-client-loop")
+                self._loop_thread.start()
+                self._loop = loop
+            return self._loop
 
-    def _safe_request(self, method, endpoint, **kwargs):
+    def submit(self, coro):
+        """コルーチンをクライアントのループに投入し、concurrent.futures.Future を返す"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """コルーチンをクライアントのループで実行し、完了まで待つ（同期呼び出し用）"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("Synchronous API calls cannot be made from the client event loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            # サーキットブレーカーで管理するため、HTTPレイヤーのリトライは行わない
+            self._http = httpx.AsyncClient(limits=httpx.Limits(max_connections=self.max_connections,
+                                                               max_keepalive_connections=self.max_connections // 2))
+        return self._http
+
+    async def _safe_request(self, method, endpoint, **kwargs):
         """サーキットブレーカーを考慮した安全なリクエスト実行"""
         if not self.breaker.can_execute():
+            CLIENT_ERRORS.inc(endpoint=endpoint, reason="CIRCUIT_OPEN")
             return None, "CIRCUIT_OPEN"
 
+        t0 = time.perf_counter()
         try:
             url = f"{self.base_url}/{endpoint}"
             timeout = kwargs.pop('timeout', 10)
-            
-            resp = self.session.request(method, url, timeout=timeout, **kwargs)
-            
+
+            resp = await self._client().request(method, url, timeout=timeout, **kwargs)
+            CLIENT_REQUEST_TIME.observe(time.perf_counter() - t0, endpoint=endpoint)
+
             if resp.status_code == 200:
                 self.breaker.record_success()
+                CLIENT_RESPONSE_SIZE.observe(len(resp.content), endpoint=endpoint)
                 return resp, None
+            elif resp.status_code == 504:
+                # 呼び出し元の締め切りに間に合わなかっただけなのでサーバー障害として数えない
+                logger.warning(f"API deadline exceeded at {endpoint}", layer="API_CLIENT")
+                CLIENT_ERRORS.inc(endpoint=endpoint, reason="DEADLINE")
+                return None, "DEADLINE"
+            elif resp.status_code == 499:
+                # cancel() で打ち切った要求（サーバー障害ではない）
+                CLIENT_ERRORS.inc(endpoint=endpoint, reason="CANCELLED")
+                return None, "CANCELLED"
             else:
                 logger.error(f"API HTTP Error: {resp.status_code} at {endpoint}", layer="API_CLIENT")
                 self.breaker.record_failure()
+                CLIENT_ERRORS.inc(endpoint=endpoint, reason=f"HTTP_{resp.status_code}")
                 return None, f"HTTP_{resp.status_code}"
         except Exception as e:
-            logger.error(f"API Connection Failed at {endpoint}: {e}", layer="API_CLIENT")
+            logger.error(f"API Connection Failed at {endpoint}: {e!r}", layer="API_CLIENT")
             self.breaker.record_failure()
+            CLIENT_ERRORS.inc(endpoint=endpoint, reason="CONNECTION_FAILED")
             return None, "CONNECTION_FAILED"
 
-    def health_check(self):
+    def _decode_response(self, resp) -> dict:
+        """Content-Type に応じて JSON または msgpack のレスポンスを辞書に変換する"""
+        if msgpack is not None and resp.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+            return msgpack.unpackb(resp.content, raw=False)
+        return resp.json()
+
+    # --- API ---
+
+    @_on_client_loop
+    async def health_check(self):
         """サーバーの生存確認"""
-        resp, err = self._safe_request("GET", "health", timeout=2)
+        resp, err = await self._safe_request("GET", "health", timeout=2)
         return resp is not None
 
     def sync_game_state(self, state_data):
-        """現在の対局状態を非同期でAPIサーバーへ送信する"""
+        """現在の対局状態を非同期でAPIサーバーへ送信する（完了を待たない）"""
         if self._is_syncing: return
         if not self.breaker.can_execute(): return
-        
-        def _send():
+
+        async def _send():
             self._is_syncing = True
             try:
-                self._safe_request("POST", "game/state", json=state_data, timeout=3)
-            except: pass
+                await self._safe_request("POST", "game/state", json=state_data, timeout=3)
             finally: self._is_syncing = False
 
-        self.executor.submit(_send)
+        self.submit(_send())
+
+    @_on_client_loop
+    async def analyze_move(self, history, board_size=19, visits=150, include_pv=True,
+                           deadline: Optional[Deadline] = None, request_class=INTERACTIVE,
+                           cancel_tag: Optional[str] = None) -> Optional[AnalysisResult]:
+        """
+        特定の手の解析リクエストを行い、AnalysisResultオブジェクトを返す。
+        同一条件のリクエストが実行中であればその結果を共有する（返り値は変更しないこと）。
+        deadline を渡すと残り時間に応じて探索数・待ち時間を縮め、締め切りを過ぎていれば問い合わせずに None を返す。
+        request_class（INTERACTIVE / BULK / PREFETCH）ごとに同時実行数の枠が分かれ、混雑時の扱いが変わる。
+        cancel_tag を付けた要求は cancel(cancel_tag) で枠待ち・通信中・エンジン探索中のいずれでも打ち切られ、None を返す。
+        """
+        # 破棄・縮小・打ち切りの判断が他の呼び出し元に波及しないよう、種類・tag・締め切りの区分ごとにまとめる
+        key = (tuple((str(m[0]).upper(), str(m[1]).upper()) for m in history), board_size, visits, include_pv, request_class,
+               cancel_tag, Deadline.bucket(deadline))
+        return await self.analysis_flight.do(key, self._request_analysis, history, board_size, visits, include_pv,
+                                             deadline, request_class, cancel_tag)
+
+    @_on_client_loop
+    async def cancel(self, tag: str) -> dict:
+        """
+        cancel_tag を付けた解析をまとめて打ち切る。
+        クライアント側の実行中・枠待ちのタスクを取り消し、サーバーにエンジン上の探索の terminate を依頼する。
+        """
+        self._cancelled_tags[tag] = None
+        while len(self._cancelled_tags) > 64:
+            self._cancelled_tags.popitem(last=False)
+        tasks = self._tagged_tasks.pop(tag, set())
+        for task in tasks:
+            task.cancel()
+        resp, err = await self._safe_request("POST", "cancel", json={"tag": tag}, timeout=2)
+        terminated = self._decode_response(resp).get("terminated", 0) if resp else 0
+        logger.info(f"Cancelled tag={tag}: {len(tasks)} client requests, {terminated} engine queries", layer="API_CLIENT")
+        return {"client": len(tasks), "engine": terminated}
+
+    def sent(self, tag: str) -> bool:
+        """cancel_tag を付けた解析が枠待ちを抜けてサーバーへ送信済み（応答待ち）か"""
+        return self._sent_tags.get(tag, 0) > 0
+
+    def coalescing_stats(self) -> dict:
+        """重複リクエストの吸収状況（実行数・吸収数・実行中の数）"""
+        return self.analysis_flight.stats()
+
+    def congested(self, request_class: Optional[str] = None) -> bool:
+        """
+        エンジンが混雑しているか（最優先で待たされない画面操作の応答時間が基準から大きく伸びているか）。
+        request_class を指定した場合は、その種類自身の応答時間が伸びている場合も混雑とみなす。
+        """
+        if self.limiters[INTERACTIVE].congested:
+            return True
+        return request_class is not None and self.limiters[request_class].congested
+
+    def concurrency_stats(self) -> dict:
+        """種類ごとの同時実行数の上限・実行中・待機中の数と応答時間"""
+        return {cls: l.stats() for cls, l in self.limiters.items()}
+
+    def transposition_stats(self) -> dict:
+        """置換表の件数と、種類ごとの問い合わせ数・共有できた数・その割合"""
+        return self.transpositions.stats()
+
+    async def _engine_request(self, endpoint, payload, timeout, deadline=None, request_class=INTERACTIVE):
+        """
+        解析系エンドポイントを要求の種類ごとの同時実行数の枠内で呼び出し、応答時間を枠の調整に反映する。
+        混雑時は先読みを送らずに破棄し、一括解析は探索数を減らす。締め切りがあれば枠を得た時点の残り時間で送る。
+        """
+        limiter = self.limiters[request_class]
+        if request_class != INTERACTIVE and self.congested(request_class):
+            if request_class == PREFETCH:
+                limiter.shed += 1
+                CLIENT_ERRORS.inc(endpoint=endpoint, reason="SHED")
+                return None, "SHED"
+            payload["visits"] = max(DEADLINE_MIN_VISITS, int(payload["visits"] * API_CLIENT_DEGRADED_VISITS_RATIO))
+            CLIENT_DEGRADED.inc(request_class=request_class)
+        if deadline is not None and deadline.expired:
+            CLIENT_ERRORS.inc(endpoint=endpoint, reason="DEADLINE")
+            return None, "DEADLINE"
+        if not await limiter.acquire():
+            CLIENT_ERRORS.inc(endpoint=endpoint, reason="SHED")
+            return None, "SHED"
 
-    def analyze_move(self, history, board_size=19, visits=150, include_pv=True) -> Optional[AnalysisResult]:
-        """特定の手の解析リクエストを行い、AnalysisResultオブジェクトを返す"""
+        latency, ok = None, True
+        tag = payload.get("cancel_tag")
+        if tag is not None:
+            self._sent_tags[tag] += 1
+        try:
+            if deadline is not None:
+                # 枠を待つ間にも締め切りは近づくため、ここで残り時間を反映する
+                if deadline.expired:
+                    CLIENT_ERRORS.inc(endpoint=endpoint, reason="DEADLINE")
+                    return None, "DEADLINE"
+                payload["visits"] = deadline.scale_visits(payload["visits"], DEADLINE_MIN_VISITS)
+                payload["deadline_ms"] = deadline.to_ms()
+                timeout = deadline.timeout(cap=timeout)
+            t0 = time.perf_counter()
+            resp, err = await self._safe_request("POST", endpoint, json=payload, headers=self._analysis_headers(), timeout=timeout)
+            if err != "CIRCUIT_OPEN":
+                latency, ok = time.perf_counter() - t0, err in (None, "DEADLINE", "CANCELLED")
+                # 締め切り超過・打ち切り・キャッシュや相乗りで返った応答はエンジンの負荷を表さないため、
+                # 応答時間を基準や平均に入れない
+                if err is not None or resp.headers.get(ANALYSIS_SOURCE_HEADER, ANALYSIS_SOURCE_ENGINE) != ANALYSIS_SOURCE_ENGINE:
+                    latency = None
+            return resp, err
+        finally:
+            if tag is not None:
+                # 同じ tag の要求が他にも送信中であれば送信済みのまま残す
+                self._sent_tags[tag] -= 1
+                if self._sent_tags[tag] <= 0:
+                    del self._sent_tags[tag]
+            limiter.release(latency, ok)
+
+    def _analysis_headers(self):
+        # msgpack が使える環境ではバイナリ形式を優先的に要求する
+        return {"Accept": f"{MSGPACK_MEDIA_TYPE}, application/json"} if msgpack is not None else None
+
+    async def _request_analysis(self, history, board_size, visits, include_pv, deadline=None,
+                                request_class=INTERACTIVE, cancel_tag=None) -> Optional[AnalysisResult]:
         payload = {
             "history": history,
             "board_size": board_size,
@@ -137,64 +399,127 @@ class GoAPIClient:
             "include_pv_shapes": include_pv,
             "include_ownership": True,
             "include_influence": True,
-            "include_uncertainty": True # Request variance/std_dev from engine
+            "include_uncertainty": True, # Request variance/std_dev from engine
+            "map_encoding": MAP_ENCODING_F16B64 # Ownership/Influence を float16 のバイナリで受け取る
         }
-        logger.debug(f"Requesting analysis: history_len={len(history)}, visits={visits}", layer="API_CLIENT")
-        resp, err = self._safe_request("POST", "analyze", json=payload, timeout=60)
-        
+        tt_key = self.transpositions.key_for(history, board_size, visits, include_pv)
+        shared = self.transpositions.get(tt_key, board_size, request_class)
+        if tt_key is not None:
+            CLIENT_TRANSPOSITIONS.inc(request_class=request_class, result="miss" if shared is None else "hit")
+        if shared is not None:
+            return shared
+
+        logger.debug(f"Requesting analysis: history_len={len(history)}, visits={visits}, class={request_class}", layer="API_CLIENT")
+        if cancel_tag is None:
+            resp, err = await self._engine_request("analyze", payload, 60, deadline, request_class)
+        else:
+            if cancel_tag in self._cancelled_tags:
+                CLIENT_ERRORS.inc(endpoint="analyze", reason="CANCELLED")
+                return None
+            payload["cancel_tag"] = cancel_tag
+            # cancel() が取り消すのは通信を行う子タスクだけにし、呼び出し元のタスクの取り消しとは区別する
+            task = asyncio.ensure_future(self._engine_request("analyze", payload, 60, deadline, request_class))
+            self._tagged_tasks.setdefault(cancel_tag, set()).add(task)
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()  # 呼び出し元が取り消された場合は通信も取りやめて伝える
+                raise
+            finally:
+                tasks = self._tagged_tasks.get(cancel_tag)
+                if tasks is not None:
+                    tasks.discard(task)
+                    if not tasks: self._tagged_tasks.pop(cancel_tag, None)
+            if task.cancelled():  # cancel() による取り消しは None として返す
+                CLIENT_ERRORS.inc(endpoint="analyze", reason="CANCELLED")
+                return None
+            resp, err = task.result()
+
         if resp:
-            data = resp.json()
-            result = AnalysisResult.from_dict(data)
+            data = self._decode_response(resp)
+            result = AnalysisResult.from_dict(data, visits=payload["visits"])
             logger.debug(f"Analysis response for history_len={len(history)}: candidates={len(result.candidates)}", layer="API_CLIENT")
+            if payload["visits"] == visits and deadline is None:  # 探索数・探索時間を縮めた結果は共有しない
+                self.transpositions.put(tt_key, board_size, result)
             return result
         elif err == "CIRCUIT_OPEN":
             logger.warning("Analysis skipped: Circuit Breaker is OPEN.", layer="API_CLIENT")
+        elif err in ("DEADLINE", "SHED", "CANCELLED"):
+            logger.warning(f"Analysis skipped ({err}): history_len={len(history)}, class={request_class}", layer="API_CLIENT")
         return None
 
-    def analyze_urgency(self, history, board_size=19, visits=150):
-        """着手の緊急度（温度）を算出し、推奨手順と放置時の被害手順の両方を取得する"""
-        logger.debug(f"Urgency Check Start: history_len={len(history)}", layer="API_CLIENT")
-        
-        # 1. 現在の局面の解析（最善手PVを取得）
-        current_res = self.analyze_move(history, board_size, visits, include_pv=True)
-        if not current_res: 
-            return None
-
-        # 自分の最善手のPVを取得
-        best_pv = current_res.candidates[0].pv[:3] if current_res.candidates else []
-
-        # 2. パスをした局面の解析（相手の連打PVを取得）
-        color = "W" if history and history[-1][0] == "B" else "B"
-        pass_history = history + [[color, "pass"]]
-        pass_res = self.analyze_move(pass_history, board_size, visits, include_pv=True)
-        if not pass_res: 
-            return None
-
-        score_normal = current_res.score_lead
-        score_pass = pass_res.score_lead
-        urgency = abs(score_normal - score_pass)
-        
-        # 相手の連打手順を取得
-        opponent_pv = pass_res.candidates[0].pv[:3] if pass_res.candidates else []
-
-        logger.debug(f"Urgency Results: best_pv={best_pv}, opponent_pv={opponent_pv}", layer="API_CLIENT")
-
-        return {
-            "urgency": urgency,
-            "score_normal": score_normal,
-            "score_pass": score_pass,
-            "is_critical": urgency > 10.0,
-            "best_pv": best_pv,      # 成功図用の手順
-            "opponent_pv": opponent_pv, # 失敗図用の手順
-            "next_player": color
+    @_on_client_loop
+    async def analyze_many(self, histories: List[list], board_size=19, visits=150, include_pv=True,
+                           deadline: Optional[Deadline] = None, request_class=INTERACTIVE) -> List[Optional[AnalysisResult]]:
+        """
+        複数局面を /analyze/batch で一括解析し、リクエストと同じ順序で結果を返す。
+        同一局面の重複排除と同時投入はサーバー側で行われる（失敗した局面は None）。
+        """
+        if not histories:
+            return []
+        payload = {
+            "histories": histories,
+            "board_size": board_size,
+            "visits": visits,
+            "include_pv_shapes": include_pv,
+            "include_ownership": True,
+            "include_influence": True,
+            "map_encoding": MAP_ENCODING_F16B64
         }
+        logger.debug(f"Requesting batch analysis: positions={len(histories)}, visits={visits}, class={request_class}", layer="API_CLIENT")
+        resp, err = await self._engine_request("analyze/batch", payload, 60 + 5 * len(histories), deadline, request_class)
 
-    def detect_shapes(self, history, board_size=19):
+        if not resp:
+            if err == "CIRCUIT_OPEN":
+                logger.warning("Batch analysis skipped: Circuit Breaker is OPEN.", layer="API_CLIENT")
+            return [None] * len(histories)
+
+        data = self._decode_response(resp)
+        results = []
+        for item in data.get("results", []):
+            if "error" in item:
+                logger.warning(f"Batch analysis item failed: {item.get('error')}", layer="API_CLIENT")
+                results.append(None)
+            else:
+                results.append(AnalysisResult.from_dict(item, visits=payload["visits"]))
+        logger.debug(f"Batch analysis response: unique_positions={data.get('unique_positions')}", layer="API_CLIENT")
+        return results
+
+    @_on_client_loop
+    async def analyze_urgency(self, history, board_size=19, visits=150, current: Optional[AnalysisResult] = None,
+                              deadline: Optional[Deadline] = None):
+        """
+        着手の緊急度（温度）を算出し、推奨手順と放置時の被害手順の両方を取得する。
+        current に現在局面の解析結果を渡した場合はパスした局面だけを、その結果と同じ探索数で解析する
+        （探索数を揃えるため締め切りでは縮めない）。渡さない場合は2局面を1回の /analyze/batch で同じ探索数で解析する。
+        """
+        logger.debug(f"Urgency Check Start: history_len={len(history)}, reuse_current={current is not None}", layer="API_CLIENT")
+
+        # パスをした局面（相手の連打PVを取得）
+        pass_hist = pass_history(history)
+        if current is None:
+            current_res, pass_res = await self.analyze_many([history, pass_hist], board_size, visits,
+                                                            include_pv=True, deadline=deadline)
+        else:
+            current_res = current
+            pass_res = await self.analyze_move(pass_hist, board_size, current.visits or visits, include_pv=True)
+        return build_urgency(history, current_res, pass_res)
+
+    @_on_client_loop
+    async def analyze_urgency_many(self, histories: List[list], board_size=19, visits=150,
+                                   deadline: Optional[Deadline] = None) -> List[Optional[dict]]:
+        """複数局面の緊急度を同時に算出する"""
+        return list(await asyncio.gather(*(
+            self.analyze_urgency(h, board_size, visits, deadline=deadline) for h in histories
+        )))
+
+    @_on_client_loop
+    async def detect_shapes(self, history, board_size=19):
         """形状検知リクエスト"""
         logger.debug(f"Requesting shape detection: board_size={board_size}", layer="API_CLIENT")
         payload = {"history": history, "board_size": board_size}
-        resp, err = self._safe_request("POST", "detect", json=payload, timeout=10)
-        
+        resp, err = await self._safe_request("POST", "detect", json=payload, timeout=10)
+
         if resp:
             # 構造化された事実リストをそのまま返す
             return resp.json().get("facts", [])
@@ -202,40 +527,199 @@ class GoAPIClient:
             return [{"description": "APIサーバーが一時停止中のため、形状検知をスキップしました。", "severity": 2, "category": "SYSTEM", "metadata": {}}]
         return [{"description": "検知エラーが発生しました。", "severity": 4, "category": "SYSTEM", "metadata": {}}]
 
-    def detect_shape_ids(self, history: list, board_size: int = 19) -> List[str]:
+    @_on_client_loop
+    async def detect_shape_ids(self, history: list, board_size: int = 19) -> List[str]:
         """現在の盤面から検知された形状のIDリストを取得する"""
         payload = {"history": history, "board_size": board_size}
-        resp, _ = self._safe_request("POST", "detect/ids", json=payload)
+        resp, _ = await self._safe_request("POST", "detect/ids", json=payload)
         return resp.json().get("ids", []) if resp else []
 
-    def analyze_simulation(self, current_history: list, sim_sequence: list, board_size: int = 19) -> Optional[AnalysisResult]:
+    async def analyze_simulation(self, current_history: list, sim_sequence: list, board_size: int = 19) -> Optional[AnalysisResult]:
         """
         現在の履歴にシミュレーション手順を加え、その最終局面を解析する。
         sim_sequence: [['B', 'D4'], ['W', 'C6']] のような形式
         """
         full_history = list(current_history) + sim_sequence
         logger.info(f"Simulating scenario: {len(sim_sequence)} moves added.", layer="API_CLIENT")
-        return self.analyze_move(full_history, board_size)
+        return await self.analyze_move(full_history, board_size)
 
-    def analyze_batch_simulations(self, current_history: list, sequences: List[list], board_size: int = 19) -> List[Optional[AnalysisResult]]:
+    async def analyze_batch_simulations(self, current_history: list, sequences: List[list], board_size: int = 19) -> List[Optional[AnalysisResult]]:
         """
-        複数のシミュレーション手順を順次解析し、結果のリストを返す。
+        複数のシミュレーション手順を一括で解析し、手順と同じ順序で結果のリストを返す。
         """
-        results = []
-        for seq in sequences:
-            res = self.analyze_simulation(current_history, seq, board_size)
-            results.append(res)
-        return results
+        logger.info(f"Simulating {len(sequences)} scenarios in one batch.", layer="API_CLIENT")
+        return await self.analyze_many([list(current_history) + list(seq) for seq in sequences], board_size)
 
-    def get_game_state(self):
+    @_on_client_loop
+    async def create_session(self, history: list, board_size: int = 19, move_index: Optional[int] = None,
+                             metadata: Optional[dict] = None, session_id: Optional[str] = None) -> Optional[dict]:
+        """サーバー側セッションを作成（同じIDがあれば手順を置き換え）し、セッション状態を返す"""
+        payload = {"session_id": session_id, "board_size": board_size, "history": history,
+                   "move_index": move_index, "metadata": metadata or {}}
+        resp, _ = await self._safe_request("POST", "sessions", json=payload, timeout=10)
+        return resp.json() if resp else None
+
+    @_on_client_loop
+    async def session_push(self, session_id: str, moves: list) -> Optional[dict]:
+        resp, _ = await self._safe_request("POST", f"sessions/{session_id}/push", json={"moves": moves}, timeout=5)
+        return resp.json() if resp else None
+
+    @_on_client_loop
+    async def session_pop(self, session_id: str, count: int = 1) -> Optional[dict]:
+        resp, _ = await self._safe_request("POST", f"sessions/{session_id}/pop", json={"count": count}, timeout=5)
+        return resp.json() if resp else None
+
+    @_on_client_loop
+    async def session_jump(self, session_id: str, move_index: int) -> Optional[dict]:
+        resp, _ = await self._safe_request("POST", f"sessions/{session_id}/jump", json={"move_index": move_index}, timeout=5)
+        return resp.json() if resp else None
+
+    def sync_session(self, session_id: str, line: list, move_index: int, board_size: int = 19, metadata: Optional[dict] = None):
+        """
+        GUIの現在局面をサーバー側セッションへ非同期で同期する（完了を待たない）。
+        手順が送信済みのものと同じなら手数の移動だけを送り、連続した移動は最新の1件にまとめる。
+        """
+        with self._session_lock:
+            self._session_target = (session_id, line, move_index, board_size, metadata)
+            if self._session_flush_scheduled:
+                return
+            self._session_flush_scheduled = True
+        self.submit(self._flush_session_sync())
+
+    async def _flush_session_sync(self):
+        while True:
+            with self._session_lock:
+                target, self._session_target = self._session_target, None
+                if target is None:
+                    self._session_flush_scheduled = False
+                    return
+            session_id, line, move_index, board_size, metadata = target
+            try:
+                if self._session_lines.get(session_id) == line and await self.session_jump(session_id, move_index):
+                    continue
+                # 手順が変わった、またはサーバー側にセッションが無い（再起動など）場合は作り直す
+                if await self.create_session(line, board_size, move_index, metadata, session_id=session_id):
+                    self._session_lines[session_id] = line
+                else:
+                    self._session_lines.pop(session_id, None)
+            except Exception as e:
+                logger.error(f"Session sync failed: {e}", layer="API_CLIENT")
+
+    @_on_client_loop
+    async def get_game_state(self):
         """現在の対局状態（同期されているもの）を取得"""
-        resp, err = self._safe_request("GET", "game/state", timeout=3)
+        resp, err = await self._safe_request("GET", "game/state", timeout=3)
         if resp:
             return resp.json()
         return None
 
-# Global Singleton Instance
-api_client = GoAPIClient()
+class GoAPIClient:
+    """
+    AsyncGoAPIClient の同期版ラッパー（シングルトン推奨）。
+    各メソッドは非同期クライアントのループで実行し、完了まで待つ。
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(GoAPIClient, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, base_url="http://127.0.0.1:8000"):
+        if hasattr(self, '_initialized'): return
+        self.async_client = AsyncGoAPIClient(base_url)
+        self._initialized = True
+
+    @property
+    def base_url(self):
+        return self.async_client.base_url
+
+    @base_url.setter
+    def base_url(self, value):
+        self.async_client.base_url = value
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.async_client.breaker
+
+    def _run(self, coro):
+        return self.async_client.run(coro)
+
+    def health_check(self):
+        return self._run(self.async_client.health_check())
+
+    def sync_game_state(self, state_data):
+        self.async_client.sync_game_state(state_data)
+
+    def analyze_move(self, history, board_size=19, visits=150, include_pv=True,
+                     deadline: Optional[Deadline] = None, request_class=INTERACTIVE,
+                     cancel_tag: Optional[str] = None) -> Optional[AnalysisResult]:
+        return self._run(self.async_client.analyze_move(history, board_size, visits, include_pv, deadline, request_class,
+                                                        cancel_tag))
+
+    def cancel(self, tag: str, wait: bool = False):
+        """cancel_tag を付けた解析を打ち切る（wait=False の場合は完了を待たずに Future を返す）"""
+        if wait:
+            return self._run(self.async_client.cancel(tag))
+        return self.async_client.submit(self.async_client.cancel(tag))
+
+    def sent(self, tag: str) -> bool:
+        return self.async_client.sent(tag)
+
+    def coalescing_stats(self) -> dict:
+        return self.async_client.coalescing_stats()
+
+    def analyze_many(self, histories: List[list], board_size=19, visits=150, include_pv=True,
+                     deadline: Optional[Deadline] = None, request_class=INTERACTIVE) -> List[Optional[AnalysisResult]]:
+        return self._run(self.async_client.analyze_many(histories, board_size, visits, include_pv, deadline, request_class))
+
+    def concurrency_stats(self) -> dict:
+        return self.async_client.concurrency_stats()
+
+    def transposition_stats(self) -> dict:
+        return self.async_client.transposition_stats()
+
+    def analyze_urgency(self, history, board_size=19, visits=150, current: Optional[AnalysisResult] = None,
+                        deadline: Optional[Deadline] = None):
+        return self._run(self.async_client.analyze_urgency(history, board_size, visits, current, deadline))
+
+    def analyze_urgency_many(self, histories: List[list], board_size=19, visits=150,
+                             deadline: Optional[Deadline] = None) -> List[Optional[dict]]:
+        return self._run(self.async_client.analyze_urgency_many(histories, board_size, visits, deadline))
+
+    def detect_shapes(self, history, board_size=19):
+        return self._run(self.async_client.detect_shapes(history, board_size))
+
+    def detect_shape_ids(self, history: list, board_size: int = 19) -> List[str]:
+        return self._run(self.async_client.detect_shape_ids(history, board_size))
+
+    def analyze_simulation(self, current_history: list, sim_sequence: list, board_size: int = 19) -> Optional[AnalysisResult]:
+        return self._run(self.async_client.analyze_simulation(current_history, sim_sequence, board_size))
+
+    def analyze_batch_simulations(self, current_history: list, sequences: List[list], board_size: int = 19) -> List[Optional[AnalysisResult]]:
+        return self._run(self.async_client.analyze_batch_simulations(current_history, sequences, board_size))
+
+    def create_session(self, history: list, board_size: int = 19, move_index: Optional[int] = None,
+                       metadata: Optional[dict] = None, session_id: Optional[str] = None) -> Optional[dict]:
+        return self._run(self.async_client.create_session(history, board_size, move_index, metadata, session_id))
+
+    def session_push(self, session_id: str, moves: list) -> Optional[dict]:
+        return self._run(self.async_client.session_push(session_id, moves))
+
+    def session_pop(self, session_id: str, count: int = 1) -> Optional[dict]:
+        return self._run(self.async_client.session_pop(session_id, count))
+
+    def session_jump(self, session_id: str, move_index: int) -> Optional[dict]:
+        return self._run(self.async_client.session_jump(session_id, move_index))
+
+    def sync_session(self, session_id: str, line: list, move_index: int, board_size: int = 19, metadata: Optional[dict] = None):
+        self.async_client.sync_session(session_id, line, move_index, board_size, metadata)
+
+    def get_game_state(self):
+        return self._run(self.async_client.get_game_state())
 
 # Global Singleton Instance
 api_client = GoAPIClient()
+# 非同期コードから使うクライアント（api_client と同じ接続プール・遮断機を共有する）
+async_api_client = api_client.async_client
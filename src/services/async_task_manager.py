@@ -1,7 +1,14 @@
 import threading
+import time
 import concurrent.futures
 from typing import Callable, Any, Optional
 from utils.logger import logger
+from utils.metrics import metrics
+
+TASKS = metrics.counter("gui_tasks_total", "Background tasks by outcome (submitted/succeeded/failed)")
+TASKS_IN_FLIGHT = metrics.gauge("gui_tasks_in_flight", "Background tasks queued or running")
+TASK_QUEUE_WAIT = metrics.histogram("gui_task_queue_wait_seconds", "Time a background task waited for a worker thread")
+TASK_DURATION = metrics.histogram("gui_task_seconds", "Background task run time (excluding callbacks)")
 
 class AsyncTaskManager:
     """
@@ -43,16 +50,23 @@ class AsyncTaskManager:
         if pre_task:
             pre_task()
 
+        t_submit = time.perf_counter()
+
         def _wrapper():
+            t_start = time.perf_counter()
+            TASK_QUEUE_WAIT.observe(t_start - t_submit)
             try:
                 # 2. 本処理（バックグラウンドスレッド）
                 result = task_func()
+                TASK_DURATION.observe(time.perf_counter() - t_start)
+                TASKS.inc(outcome="succeeded")
                 
                 # 3. 成功時コールバック（メインスレッドに戻す）
                 if on_success:
                     self.root.after(0, lambda: on_success(result))
                     
             except Exception as e:
+                TASKS.inc(outcome="failed")
                 logger.error(f"Async task failed: {e}", layer="ASYNC")
                 # 4. エラー時コールバック（メインスレッドに戻す）
                 if on_error:
@@ -61,8 +75,12 @@ class AsyncTaskManager:
                     # デフォルトのエラー表示（もし必要なら）
                     import traceback
                     traceback.print_exc()
+            finally:
+                TASKS_IN_FLIGHT.dec()
 
         # スレッドプールへ投入
+        TASKS.inc(outcome="submitted")
+        TASKS_IN_FLIGHT.inc()
         self.executor.submit(_wrapper)
 
     def shutdown(self):
@@ -0,0 +1,329 @@
+"""
+複数の SGF をまとめて解析するバッチ処理（GUI を使わない）。
+解析対象の対局はローカルの SQLite のジョブキューに登録し、複数の対局を並行して解析する。
+結果は対局ごとの AnalysisStore に1手ずつ書き込むため、中断しても次回は未解析の対局・手から再開できる。
+"""
+import glob
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sgfmill import sgf
+
+from core.analysis_archive import ARCHIVE_FILENAME, write_archive
+from services.analysis_store import AnalysisStore, STORE_FILENAME, sgf_content_hash
+from services.api_client import api_client, BULK
+from utils.logger import logger
+from utils.metrics import metrics
+from config import OUTPUT_BASE_DIR, BULK_FETCH_WORKERS
+
+BATCH_GAMES = metrics.counter("batch_games_total", "Games processed by batch analysis by outcome (done/failed/retry/released)")
+BATCH_MOVES = metrics.counter("batch_moves_total", "Moves processed by batch analysis by outcome (analyzed/stored/failed)")
+BATCH_GAMES_PER_HOUR = metrics.gauge("batch_games_per_hour", "Games completed per hour by the running batch analysis")
+
+QUEUE_FILENAME = "batch_jobs.db"
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sgf_path TEXT NOT NULL,
+    sgf_hash TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    total_moves INTEGER,
+    analyzed_moves INTEGER,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+_COLS = "ABCDEFGHJKLMNOPQRST"
+
+
+@dataclass
+class BatchJob:
+    id: int
+    sgf_path: str
+    sgf_hash: str
+    attempts: int
+
+
+def discover_sgf_files(patterns: Iterable[str]) -> List[str]:
+    """ファイル・ディレクトリ（配下を再帰的に検索）・glob パターンから SGF ファイルの一覧を作る"""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.sgf"), recursive=True)
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        found.extend(os.path.abspath(p) for p in matches if os.path.isfile(p))
+    return sorted(set(found))
+
+
+def load_sgf_histories(sgf_bytes: bytes) -> Tuple[int, List[List[List[str]]]]:
+    """(盤サイズ, 手数ごとの着手履歴)。0手目は初期局面（空の履歴）"""
+    game = sgf.Sgf_game.from_bytes(sgf_bytes)
+    board_size = game.get_size()
+    history: List[List[str]] = []
+    histories = []
+    for node in game.get_main_sequence():
+        color, move = node.get_move()
+        if color and move:
+            history.append([color.upper(), _COLS[move[1]] + str(move[0] + 1)])
+        elif color:
+            history.append([color.upper(), "pass"])
+        histories.append(list(history))
+    return board_size, histories
+
+
+def game_output_dir(out_base: str, sgf_path: str, sgf_hash: str) -> str:
+    """
+    対局ごとの出力先。別のディレクトリにある同名の SGF（a/game.sgf と b/game.sgf）が
+    同じ出力先を共有しないよう、内容ハッシュの先頭を付ける。
+    """
+    name = os.path.splitext(os.path.basename(sgf_path))[0]
+    return os.path.join(out_base, f"{name}-{sgf_hash[:12]}")
+
+
+class BatchJobQueue:
+    """
+    バッチ解析のジョブキュー（SQLite）。1ジョブ = 1対局で、SGF の内容ハッシュで重複登録を防ぐ。
+    claim() で取り出したジョブは running になり、プロセスが中断した場合は recover() で pending に戻す。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, sgf_path: str) -> bool:
+        """対局を登録する（同じ内容の対局が登録済みなら False）"""
+        with open(sgf_path, "rb") as f:
+            sgf_hash = sgf_content_hash(f.read())
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (sgf_path, sgf_hash, status, enqueued_at) VALUES (?, ?, ?, ?)",
+                (os.path.abspath(sgf_path), sgf_hash, PENDING, time.time()))
+        return cur.rowcount > 0
+
+    def claim(self) -> Optional[BatchJob]:
+        """最も古い pending のジョブを running にして返す（無ければ None）"""
+        with self._lock:
+            row = self._conn.execute("SELECT id, sgf_path, sgf_hash, attempts FROM jobs WHERE status = ? "
+                                     "ORDER BY id LIMIT 1", (PENDING,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, error = NULL "
+                               "WHERE id = ?", (RUNNING, time.time(), row[0]))
+        return BatchJob(row[0], row[1], row[2], row[3] + 1)
+
+    def finish(self, job_id: int, total_moves: int, analyzed_moves: int):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, total_moves = ?, analyzed_moves = ?, finished_at = ? "
+                               "WHERE id = ?", (DONE, total_moves, analyzed_moves, time.time(), job_id))
+
+    def fail(self, job_id: int, error: str, retry: bool):
+        """失敗したジョブを pending に戻す（retry=False の場合は failed にする）"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                               (PENDING if retry else FAILED, error, time.time(), job_id))
+
+    def release(self, job_id: int):
+        """停止により途中で止めたジョブを、試行回数を数えずに pending へ戻す"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0) WHERE id = ?",
+                               (PENDING, job_id))
+
+    def recover(self) -> int:
+        """前回の実行が中断して running のまま残ったジョブを pending に戻す（戻した件数を返す）"""
+        with self._lock:
+            cur = self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (PENDING, RUNNING))
+        return cur.rowcount
+
+    def retry_failed(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("UPDATE jobs SET status = ?, attempts = 0 WHERE status = ?", (PENDING, FAILED))
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def failures(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute("SELECT sgf_path, error FROM jobs WHERE status = ? ORDER BY id",
+                                      (FAILED,)).fetchall()
+
+
+class BatchAnalyzer:
+    """
+    ジョブキューの対局を game_workers 局ずつ並行して解析する。
+    1局の中では move_workers 本で手を並行に解析し、エンジンへの要求は一括解析（BULK）の枠で制限される。
+    失敗した対局は retry_delay 秒から倍々に（max_retry_delay 秒まで）間を空けて再試行する。
+    API サーバーに接続できない間の失敗は試行回数に数えず、ジョブを pending に戻して待つ。
+    """
+
+    def __init__(self, queue: BatchJobQueue, out_base: str = OUTPUT_BASE_DIR, game_workers: int = 2,
+                 move_workers: int = BULK_FETCH_WORKERS, visits: int = 150, max_attempts: int = 3,
+                 retry_delay: float = 5.0, max_retry_delay: float = 300.0):
+        self.queue = queue
+        self.out_base = out_base
+        self.game_workers = max(1, game_workers)
+        self.move_workers = max(1, move_workers)
+        self.visits = visits
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._failure_streak = 0  # 連続して失敗した対局の数（再試行までの待ち時間に使う）
+        self.cancel_tag = f"batch-{uuid.uuid4().hex[:12]}"
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.started_at: Optional[float] = None
+        self.games_done = 0
+        self.games_failed = 0
+        self.moves_analyzed = 0
+        BATCH_GAMES_PER_HOUR.set_function(self.games_per_hour)
+
+    # --- 実行 ---
+
+    def run(self, on_game_done=None) -> dict:
+        """キューが空になるか stop() されるまで解析する。on_game_done(job, stats) は1局終わるごとに呼ばれる"""
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"Resuming {recovered} interrupted batch jobs", layer="BATCH")
+        self.started_at = time.monotonic()
+        self._threads = [threading.Thread(target=self._worker, args=(on_game_done,), daemon=True,
+                                          name=f"batch-game-{i}") for i in range(self.game_workers)]
+        for t in self._threads: t.start()
+        self.join()
+        return self.stats()
+
+    def join(self, timeout: Optional[float] = None):
+        for t in self._threads:
+            t.join(timeout)
+
+    def stop(self):
+        """新しい対局の取り出しをやめ、実行中の解析要求を打ち切る（途中の対局は次回に再開する）"""
+        self._stop.set()
+        api_client.cancel(self.cancel_tag)
+
+    def _worker(self, on_game_done):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                return
+            try:
+                total, analyzed = self.analyze_game(job)
+            except Exception as e:
+                if self._stop.is_set():
+                    self.queue.release(job.id)
+                    return
+                if not api_client.health_check():
+                    # サーバー停止・遮断中の失敗は対局のせいではないため、試行回数を使わずに戻して待つ
+                    self.queue.release(job.id)
+                    BATCH_GAMES.inc(outcome="released")
+                    logger.warning(f"API server unavailable; requeued {job.sgf_path}", layer="BATCH")
+                else:
+                    retry = job.attempts < self.max_attempts
+                    self.queue.fail(job.id, str(e), retry=retry)
+                    BATCH_GAMES.inc(outcome="retry" if retry else "failed")
+                    if not retry:
+                        with self._lock: self.games_failed += 1
+                    logger.error(f"Batch analysis failed for {job.sgf_path} (attempt {job.attempts}): {e}", layer="BATCH")
+                self._stop.wait(self._next_retry_delay())
+                continue
+            with self._lock:
+                self._failure_streak = 0
+            self.queue.finish(job.id, total, analyzed)
+            BATCH_GAMES.inc(outcome="done")
+            with self._lock:
+                self.games_done += 1
+                self.moves_analyzed += analyzed
+            if on_game_done:
+                on_game_done(job, self.stats())
+
+    def _next_retry_delay(self) -> float:
+        with self._lock:
+            self._failure_streak += 1
+            streak = self._failure_streak
+        return min(self.max_retry_delay, self.retry_delay * 2 ** (streak - 1))
+
+    def analyze_game(self, job: BatchJob) -> Tuple[int, int]:
+        """1局を解析してストアに書き込み、アーカイブを書き出す。(手数, 新たに解析した手数) を返す"""
+        with open(job.sgf_path, "rb") as f:
+            sgf_bytes = f.read()
+        board_size, histories = load_sgf_histories(sgf_bytes)
+        total = len(histories)
+        out_dir = game_output_dir(self.out_base, job.sgf_path, job.sgf_hash)
+        os.makedirs(out_dir, exist_ok=True)
+
+        store = AnalysisStore(os.path.join(out_dir, STORE_FILENAME))
+        try:
+            store.open_game(job.sgf_hash, board_size, total)
+            done = store.completed_moves(job.sgf_hash)
+            missing = [i for i in range(total) if i not in done]
+            BATCH_MOVES.inc(total - len(missing), outcome="stored")
+
+            def fetch(i):
+                if self._stop.is_set():
+                    return False
+                result = api_client.analyze_move(histories[i], board_size, visits=self.visits, include_pv=True,
+                                                 request_class=BULK, cancel_tag=self.cancel_tag)
+                if not result:
+                    BATCH_MOVES.inc(outcome="failed")
+                    return False
+                store.put(job.sgf_hash, i, result)
+                BATCH_MOVES.inc(outcome="analyzed")
+                return True
+
+            with ThreadPoolExecutor(max_workers=self.move_workers, thread_name_prefix="batch-move") as pool:
+                ok = list(pool.map(fetch, missing))
+            if self._stop.is_set():
+                raise RuntimeError("Batch analysis stopped")
+            failed = ok.count(False)
+            if failed:
+                raise RuntimeError(f"{failed}/{len(missing)} moves could not be analyzed")
+
+            write_archive(os.path.join(out_dir, ARCHIVE_FILENAME), board_size, store.load_all(job.sgf_hash, total),
+                          sgf_hash=job.sgf_hash)
+            return total, len(missing)
+        finally:
+            store.close()
+
+    # --- 進捗 ---
+
+    def games_per_hour(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.games_done * 3600.0 / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"games_done": self.games_done, "games_failed": self.games_failed,
+                     "moves_analyzed": self.moves_analyzed}
+        stats["games_per_hour"] = round(self.games_per_hour(), 1)
+        stats["transposition_share"] = api_client.transposition_stats()["hit_rate"].get(BULK, 0.0)
+        stats["queue"] = self.queue.counts()
+        return stats
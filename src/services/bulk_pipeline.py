@@ -0,0 +1,209 @@
+"""
+SGF 一括解析のパイプライン。
+解析の取得・結果の保存・画像の描画・UIへの通知をそれぞれ独立した段（上限付きキューと専用ワーカー）で処理し、
+遅い段があっても他の段の処理を塞がないようにする（キューが埋まった場合のみ上流が待つ）。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.logger import logger
+from utils.metrics import metrics
+
+PIPELINE_STAGE = metrics.gauge("bulk_pipeline_stage", "Bulk pipeline stage state (processed/failed/queued/busy)")
+PIPELINE_RATE = metrics.gauge("bulk_pipeline_items_per_second", "Bulk pipeline throughput per stage")
+PIPELINE_STAGE_TIME = metrics.histogram("bulk_pipeline_stage_seconds", "Processing time per item and stage")
+
+_DONE = object()  # 上流の段が全て終了したことを示す番兵
+
+
+class Stage:
+    """
+    パイプラインの1段。上限付きの入力キューを workers 本のスレッドで処理し、fn の戻り値（None 以外）を次の段へ渡す。
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: int = 32):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._alive = 0
+        self._threads: List[threading.Thread] = []
+        self._stop: Optional[threading.Event] = None
+
+    def start(self, stop: threading.Event):
+        self._stop = stop
+        self.started_at = time.perf_counter()
+        self._alive = self.workers
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, daemon=True, name=f"bulk-{self.name}-{i}")
+            t.start()
+            self._threads.append(t)
+
+    def put(self, item) -> bool:
+        """キューに空きができるまで待って投入する（停止した場合は False）"""
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                with self._lock:
+                    self.busy += 1
+                t0 = time.perf_counter()
+                try:
+                    out = self.fn(item)
+                except Exception as e:
+                    out = None
+                    with self._lock:
+                        self.failed += 1
+                    logger.error(f"Bulk pipeline stage '{self.name}' failed: {e}", layer="BULK_PIPELINE")
+                else:
+                    with self._lock:
+                        self.processed += 1
+                finally:
+                    PIPELINE_STAGE_TIME.observe(time.perf_counter() - t0, stage=self.name)
+                    with self._lock:
+                        self.busy -= 1
+                if out is not None and self.next is not None:
+                    self.next.put(out)
+        finally:
+            self._worker_exited()
+
+    def _worker_exited(self):
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if not last:
+            # 同じ段の他のワーカーにも終了を伝える（停止時は各ワーカーが自分で抜けるので、満杯のキューで待たない）
+            self.put(_DONE)
+            return
+        self.finished_at = time.perf_counter()
+        if self.next is not None:
+            self.next.put(_DONE)
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+
+    def rate(self) -> float:
+        """処理済み件数 / 経過秒"""
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"processed": self.processed, "failed": self.failed, "queued": self.queue.qsize(),
+                    "busy": self.busy, "workers": self.workers, "rate": round(self.rate(), 2)}
+
+
+class BulkPipeline:
+    """Stage を直列につないだパイプライン。run() は全ての段が処理を終えるか stop() されるまで戻らない"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        for a, b in zip(stages, stages[1:]):
+            a.next = b
+        self._stop = threading.Event()
+        for st in stages:
+            for kind in ("processed", "failed", "queued", "busy"):
+                PIPELINE_STAGE.set_function(lambda s=st, k=kind: s.stats()[k], stage=st.name, kind=kind)
+            PIPELINE_RATE.set_function(st.rate, stage=st.name)
+
+    def run(self, items: Iterable[Any]) -> Dict[str, dict]:
+        for st in self.stages:
+            st.start(self._stop)
+        first = self.stages[0]
+        for item in items:
+            if not first.put(item):
+                break
+        first.put(_DONE)
+        for st in self.stages:
+            st.join()
+        return self.stats()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stats(self) -> Dict[str, dict]:
+        return {st.name: st.stats() for st in self.stages}
+
+    def throughput_text(self) -> str:
+        """ステータス表示用の各段の処理速度（例: "fetch 3.1/s, render 2.9/s"）"""
+        return ", ".join(f"{st.name} {st.rate():.1f}/s" for st in self.stages)
+
+
+# --- 画像描画（ワーカープロセス） ---
+
+_renderers: Dict[tuple, Any] = {}
+
+
+def render_move_image(board_size: int, image_size: int, board, path: str, render_kwargs: dict) -> str:
+    """盤面画像を描画して保存する（ワーカープロセスで実行され、レンダラーはプロセスごとに使い回す）"""
+    from utils.board_renderer import GoBoardRenderer
+    key = (board_size, image_size)
+    renderer = _renderers.get(key)
+    if renderer is None:
+        renderer = _renderers[key] = GoBoardRenderer(board_size, image_size)
+    renderer.render(board, **render_kwargs).save(path)
+    return path
+
+
+class ImageRenderPool:
+    """
+    盤面画像の描画・PNG 保存をプロセスプールで実行する（workers が 0 の場合やプールが使えない場合は呼び出し元のスレッドで描画する）。
+    """
+
+    def __init__(self, renderer, workers: int):
+        self.renderer = renderer
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if workers > 0:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Render process pool unavailable, rendering in threads: {e}", layer="BULK_PIPELINE")
+
+    def render(self, board, path: str, **render_kwargs) -> str:
+        if self._pool is not None:
+            try:
+                return self._pool.submit(render_move_image, self.renderer.board_size, self.renderer.image_size,
+                                         board, path, render_kwargs).result()
+            except BrokenProcessPool:
+                logger.warning("Render process pool broken, rendering in threads.", layer="BULK_PIPELINE")
+                self._pool = None
+        img = self.renderer.render(board, **render_kwargs)
+        img.save(path)
+        return path
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,157 @@
+"""
+現在の局面の前後の手・候補手への応手を、低優先度（PREFETCH）で先に解析しておく先読み。
+利用者が次の局面に移ったときには解析済み（または解析中）になっているようにする。
+"""
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from core.analysis_dto import AnalysisResult
+from services.api_client import api_client, PREFETCH
+from utils.logger import logger
+from utils.metrics import metrics
+from config import PREFETCH_RADIUS, PREFETCH_WORKERS
+
+PREFETCH_ITEMS = metrics.counter("prefetch_positions_total", "Speculatively prefetched positions by outcome (done/failed/cancelled/skipped)")
+PREFETCH_USED = metrics.counter("prefetch_used_total", "Interactive requests answered by an in-flight prefetch")
+
+
+def prefetch_targets(line: List[List[str]], current: int, radius: int = PREFETCH_RADIUS,
+                     replies: Optional[List[str]] = None) -> List[List[List[str]]]:
+    """
+    先読みする局面の履歴を優先順に並べる（応手 → 次の手 → 前の手 → 2手先 → 2手前 …）。
+    line は本譜の手順、current は現在の手数、replies は現在の局面の候補手。
+    """
+    targets = []
+    history = line[:current]
+    if replies:
+        color = "W" if history and str(history[-1][0]).upper().startswith("B") else "B"
+        targets.extend(history + [[color, move]] for move in replies)
+    for d in range(1, radius + 1):
+        for idx in (current + d, current - d):
+            if 0 <= idx <= len(line):
+                targets.append(line[:idx])
+    return targets
+
+
+class AnalysisPrefetcher:
+    """
+    先読みの予定表と専用ワーカー。schedule() のたびに予定を入れ替え、
+    新しい予定に含まれない実行中の先読みは打ち切る（含まれるものはそのまま続ける）。
+    エンジンが混雑している間や一括解析の実行中は送らない。
+    """
+
+    def __init__(self, key: Callable[[List[List[str]]], str], is_cached: Callable[[str], bool],
+                 on_result: Callable[[str, List[List[str]], AnalysisResult], None],
+                 is_busy: Callable[[], bool] = lambda: False, workers: int = PREFETCH_WORKERS):
+        self.key = key
+        self.is_cached = is_cached
+        self.on_result = on_result
+        self.is_busy = is_busy
+        self._cond = threading.Condition()
+        self._pending: List[tuple] = []  # (key, history, board_size)
+        self._in_flight: Dict[str, tuple] = {}  # key -> (Future, cancel_tag)
+        self._cancelled = set()
+        self._seq = itertools.count()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True, name=f"prefetch-{i}")
+                         for i in range(max(1, workers))]
+        for t in self._threads:
+            t.start()
+
+    def schedule(self, line: List[List[str]], current: int, board_size: int, replies: Optional[List[str]] = None):
+        """現在の局面 line[:current] を起点に予定を作り直す（解析済みの局面は除く）"""
+        pending = []
+        for history in prefetch_targets(line, current, replies=replies):
+            k = self.key(history)
+            if not self.is_cached(k) and all(p[0] != k for p in pending):
+                pending.append((k, history, board_size))
+        wanted = {p[0] for p in pending}
+        with self._cond:
+            dropped = sum(1 for p in self._pending if p[0] not in wanted)
+            self._pending = [p for p in pending if p[0] not in self._in_flight]
+            stale = self._cancel_locked([k for k in self._in_flight if k not in wanted])
+            self._cond.notify_all()
+        PREFETCH_ITEMS.inc(dropped, outcome="skipped")
+        for tag in stale:
+            api_client.cancel(tag)
+        if dropped or stale:
+            logger.debug(f"Prefetch rescheduled: {len(pending)} targets, dropped {dropped} queued, "
+                         f"cancelled {len(stale)} in flight", layer="PREFETCH")
+
+    def cancel(self):
+        """予定を全て破棄し、実行中の先読みも打ち切る"""
+        with self._cond:
+            PREFETCH_ITEMS.inc(len(self._pending), outcome="skipped")
+            self._pending = []
+            stale = self._cancel_locked(list(self._in_flight))
+        for tag in stale:
+            api_client.cancel(tag)
+
+    def _cancel_locked(self, keys: List[str]) -> List[str]:
+        self._cancelled.update(keys)
+        return [self._in_flight[k][1] for k in keys]
+
+    def close(self):
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def join(self, key: str) -> Optional[Future]:
+        """
+        エンジンへ送信済みの先読みの Future（結果は AnalysisResult、打ち切り・失敗時は None）。
+        枠待ちなどでまだ送っていない場合は None を返す（待つより画面操作として送り直す方が早い）。
+        """
+        with self._cond:
+            entry = self._in_flight.get(key)
+        if entry is None or not api_client.sent(entry[1]):
+            return None
+        PREFETCH_USED.inc()
+        return entry[0]
+
+    def drop(self, key: str):
+        """key の局面の先読みを予定から外し、実行中であれば打ち切る"""
+        with self._cond:
+            dropped = sum(1 for p in self._pending if p[0] == key)
+            self._pending = [p for p in self._pending if p[0] != key]
+            stale = self._cancel_locked([key] if key in self._in_flight else [])
+        PREFETCH_ITEMS.inc(dropped, outcome="skipped")
+        for tag in stale:
+            api_client.cancel(tag)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"pending": len(self._pending), "in_flight": len(self._in_flight)}
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._pending:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                k, history, board_size = self._pending.pop(0)
+                future: Future = Future()
+                # 打ち切った tag はクライアント・サーバーに記録されるため、同じ局面でも先読みのたびに別の tag にする
+                tag = f"prefetch-{next(self._seq)}-{k}"
+                self._in_flight[k] = (future, tag)
+            result, outcome = None, "skipped"
+            try:
+                if not self.is_busy():
+                    result = api_client.analyze_move(history, board_size, request_class=PREFETCH, cancel_tag=tag)
+                    outcome = "done" if result else "failed"
+                    if result:
+                        self.on_result(k, history, result)
+            except Exception as e:
+                outcome = "failed"
+                logger.error(f"Prefetch failed: {e}", layer="PREFETCH")
+            finally:
+                with self._cond:
+                    self._in_flight.pop(k, None)
+                    if k in self._cancelled:
+                        self._cancelled.discard(k)
+                        if result is None: outcome = "cancelled"
+                PREFETCH_ITEMS.inc(outcome=outcome)
+                future.set_result(result)
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from core.inference_fact import FactCollector
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 
 class BaseFactProvider(ABC):
     """事実生成プロバイダの抽象基底クラス"""
@@ -10,6 +11,6 @@ class BaseFactProvider(ABC):
         self.board_size = board_size
 
     @abstractmethod
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
-        """解析事実を生成してコレクターに追加する"""
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
+        """解析事実を生成してコレクターに追加する（memo は同じ解析リクエスト内で共有される解析結果のメモ）"""
         pass
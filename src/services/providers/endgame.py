@@ -1,17 +1,19 @@
+import numpy as np
 from core.inference_fact import FactCollector, FactCategory, TemporalScope, GamePhaseMetadata
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from .base import BaseFactProvider
 
 class EndgameFactProvider(BaseFactProvider):
     """局面が終盤（ヨセ）に入ったかを判定するプロバイダ"""
     
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
-        if not analysis.ownership:
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
+        if analysis.ownership is None or len(analysis.ownership) == 0:
             return
             
         SETTLED_THRESHOLD = 0.9
-        settled_points = sum(1 for val in analysis.ownership if abs(val) > SETTLED_THRESHOLD)
+        settled_points = int(np.count_nonzero(np.abs(analysis.ownership) > SETTLED_THRESHOLD))
         settlement_ratio = settled_points / len(analysis.ownership)
         
         if settlement_ratio > 0.85:
@@ -1,6 +1,7 @@
 from core.inference_fact import FactCollector, FactCategory, TemporalScope, MoyoMetadata
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from core.board_region import BoardRegion, RegionType
 from core.point import Point
 from .base import BaseFactProvider
@@ -12,8 +13,8 @@ class InfluenceFactProvider(BaseFactProvider):
         super().__init__(board_size)
         self.board_region = board_region
 
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
-        if not analysis.influence:
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
+        if analysis.influence is None:
             return
             
         region_stats = {rt: {"own": 0.0, "inf": 0.0, "count": 0} for rt in RegionType}
@@ -21,7 +22,7 @@ class InfluenceFactProvider(BaseFactProvider):
         for i, inf_val in enumerate(analysis.influence):
             r, c = i // self.board_size, i % self.board_size
             rt = self.board_region.get_region(Point(r, c))
-            own = analysis.ownership[i] if analysis.ownership else 0
+            own = analysis.ownership[i] if analysis.ownership is not None else 0
             
             region_stats[rt]["own"] += own
             region_stats[rt]["inf"] += inf_val
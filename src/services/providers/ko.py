@@ -1,12 +1,13 @@
 from core.inference_fact import FactCollector, FactCategory, TemporalScope, KoMetadata
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from .base import BaseFactProvider
 
 class KoFactProvider(BaseFactProvider):
     """コウの発生や解消を検知するプロバイダ"""
     
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         # 1. コウの発生（今打たれた手によって石が1つ取られた）
         if context.captured_points and len(context.captured_points) == 1:
             cap_pt = context.captured_points[0]
@@ -1,9 +1,8 @@
-import asyncio
 import sys
 from core.inference_fact import FactCollector, FactCategory, TemporalScope, MistakeMetadata
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
-from services.api_client import api_client
+from services.analysis_memo import AnalysisMemo
 from core.point import Point
 from .base import BaseFactProvider
 
@@ -11,13 +10,12 @@ class MoveQualityFactProvider(BaseFactProvider):
     """
     着手の評価値下落を検知し、失着の事実を生成するプロバイダ。
     """
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         if not context.history or len(context.history) < 2:
             return
 
         # 1. 1手前の局面（相手が打った直後）の解析値を取得し、その「最善手」のスコアを確認する
-        prev_history = context.history[:-1]
-        prev_analysis = await asyncio.to_thread(api_client.analyze_move, prev_history, self.board_size)
+        prev_analysis = await memo.prev_analysis()
         
         if not prev_analysis or not prev_analysis.candidates:
             return
@@ -50,7 +48,7 @@ class MoveQualityFactProvider(BaseFactProvider):
             is_capturing_junk = False
             
             last_move = context.last_move
-            if last_move and prev_analysis.ownership:
+            if last_move and prev_analysis.ownership is not None:
                 # 着手地点の隣接する石を確認
                 for neighbor in last_move.neighbors(self.board_size):
                     prev_stone = context.prev_board.get(neighbor)
@@ -3,6 +3,7 @@ from core.inference_fact import FactCollector, TemporalScope
 from core.board_simulator import SimulationContext
 from core.shape_detector import ShapeDetector
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from .base import BaseFactProvider
 
 class ShapeFactProvider(BaseFactProvider):
@@ -16,7 +17,7 @@ class ShapeFactProvider(BaseFactProvider):
         # Let's assume it's passed in __init__ for clean DI
         self.simulator = simulator
 
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         # 1. 最新手（実戦）の形状検知
         shape_facts = await asyncio.to_thread(self.detector.detect_facts, context, analysis_result=analysis)
         for f in shape_facts:
@@ -1,8 +1,8 @@
-import asyncio
 from core.inference_fact import FactCollector, TemporalScope
 from core.board_simulator import SimulationContext
 from core.stability_analyzer import StabilityAnalyzer
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from .base import BaseFactProvider
 
 class StabilityFactProvider(BaseFactProvider):
@@ -12,11 +12,10 @@ class StabilityFactProvider(BaseFactProvider):
         super().__init__(board_size)
         self.analyzer = stability_analyzer
 
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
-        if analysis.ownership:
-            # uncertainty map might be None if engine doesn't support it
-            uncertainty_map = getattr(analysis, 'uncertainty', None)
-            stability_facts = await asyncio.to_thread(self.analyzer.analyze_to_facts, context.board, analysis.ownership, uncertainty_map)
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
+        if analysis.ownership is not None:
+            # 安定度グループは StrategicFactProvider と共有するメモから取得する
+            stability_facts = self.analyzer.facts_from_groups(await memo.stability_groups())
             for f in stability_facts:
                 f.scope = TemporalScope.EXISTING
                 collector.add_fact(f)
@@ -1,12 +1,13 @@
 from core.inference_fact import FactCollector, FactCategory, TemporalScope
 from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo
 from .base import BaseFactProvider
 
 class BasicStatsFactProvider(BaseFactProvider):
     """勝率や目数差などの基本統計情報を提供"""
     
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         sl = analysis.score_lead
         collector.add(
             FactCategory.STRATEGY, 
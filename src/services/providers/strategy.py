@@ -2,6 +2,7 @@ from core.inference_fact import FactCollector, FactCategory, TemporalScope, Atsu
 from core.board_simulator import SimulationContext
 from core.stability_analyzer import StabilityAnalyzer
 from core.analysis_dto import AnalysisResult
+from services.analysis_memo import AnalysisMemo, PREVIOUS
 from core.point import Point
 from .base import BaseFactProvider
 
@@ -13,7 +14,7 @@ class StrategicFactProvider(BaseFactProvider):
         super().__init__(board_size)
         self.stability_analyzer = stability_analyzer
 
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         # 悪手判定（厚みへの近寄り、カス石への手入れ）は「着手前の盤面」に基づくべき
         target_board = context.prev_board
         
@@ -22,25 +23,15 @@ class StrategicFactProvider(BaseFactProvider):
             return
 
         # 前回の解析結果があればそれを使う。なければ現在の解析結果で代用（近似）
-        target_ownership = None
-        target_influence = None
-        target_uncertainty = None
-        
-        if context.prev_analysis:
-            target_ownership = context.prev_analysis.ownership
-            target_influence = context.prev_analysis.influence
-            target_uncertainty = getattr(context.prev_analysis, 'uncertainty', None)
-        else:
-            # フォールバック: 現在のOwnershipをそのまま使う
-            target_ownership = analysis.ownership
-            target_influence = analysis.influence
-            target_uncertainty = getattr(analysis, 'uncertainty', None)
+        target_analysis = await memo.prev_analysis() or analysis
+        target_ownership = target_analysis.ownership
+        target_influence = target_analysis.influence
 
-        if not target_ownership:
+        if target_ownership is None:
             return
 
-        # 1. 前回の盤面における安定度分析を実行
-        stability_results = self.stability_analyzer.analyze(target_board, target_ownership, target_uncertainty)
+        # 1. 前回の盤面における安定度分析（メモで共有される）
+        stability_results = await memo.stability_groups(PREVIOUS)
         
         last_move = context.last_move
         if not last_move:
@@ -57,7 +48,7 @@ class StrategicFactProvider(BaseFactProvider):
                 row = int(s_gtp[1:]) - 1
                 stones_indices.append(row * self.board_size + col)
             
-            if not stones_indices or not target_ownership:
+            if not stones_indices:
                 continue
                 
             avg_own = sum(target_ownership[i] for i in stones_indices) / len(stones_indices)
@@ -170,7 +161,7 @@ class StrategicFactProvider(BaseFactProvider):
             # 現在の盤面ではなく、全体の状況として「厚みが存在する」ことを伝える
             # ただし、これは StrategyProviderに書くべきか、StabilityProviderか？
             # 「厚み」という概念は戦略的なのでここでOK
-            if group.status == 'strong' and target_influence:
+            if group.status == 'strong' and target_influence is not None:
                 stones_points = [Point.from_gtp(s) for s in group.stones]
                 raw_inf = self.stability_analyzer.calculate_group_influence(stones_points, target_influence)
                 
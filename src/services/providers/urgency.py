@@ -1,9 +1,8 @@
-import asyncio
 from core.inference_fact import FactCollector, FactCategory, TemporalScope, UrgencyMetadata
 from core.board_simulator import SimulationContext, BoardSimulator
 from core.shape_detector import ShapeDetector
 from core.analysis_dto import AnalysisResult
-from services.api_client import api_client
+from services.analysis_memo import AnalysisMemo
 from core.game_board import Color
 from .base import BaseFactProvider
 
@@ -15,12 +14,11 @@ class UrgencyFactProvider(BaseFactProvider):
         self.simulator = simulator
         self.detector = detector
 
-    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult):
+    async def provide_facts(self, collector: FactCollector, context: SimulationContext, analysis: AnalysisResult, memo: AnalysisMemo):
         history = context.history
-        bs = self.board_size
-        
-        # Urgency解析は API (ネットワーク) を呼ぶため、特に並列化のメリットが大きい
-        urgency_data = await asyncio.to_thread(api_client.analyze_urgency, history, bs)
+
+        # 現在局面の解析は済んでいるため、パスした局面だけを同じ探索数で解析する
+        urgency_data = await memo.urgency()
         if urgency_data:
             u_severity = 5 if urgency_data['is_critical'] else 2
             u_desc = f"この局面の緊急度は {urgency_data['urgency']:.1f}目 です。{'一手の緩みも許されない急場です。' if urgency_data['is_critical'] else '比較的平穏な局面です。'}"
@@ -28,7 +26,8 @@ class UrgencyFactProvider(BaseFactProvider):
             meta = UrgencyMetadata(
                 urgency=urgency_data['urgency'],
                 is_critical=urgency_data['is_critical'],
-                next_player=urgency_data['next_player']
+                next_player=urgency_data['next_player'],
+                opponent_pv=list(urgency_data.get('opponent_pv') or [])
             )
             collector.add(FactCategory.URGENCY, u_desc, u_severity, meta, scope=TemporalScope.EXISTING)
             
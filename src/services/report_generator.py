@@ -3,12 +3,14 @@ import json
 import asyncio
 import io
 import matplotlib.pyplot as plt
+import numpy as np
 from google.genai import types
-from config import GEMINI_MODEL_NAME, TARGET_LEVEL
+from config import GEMINI_MODEL_NAME, TARGET_LEVEL, REPORT_ANALYSIS_CACHE_MAX_BYTES
 from utils.pdf_generator import PDFGenerator
-from services.api_client import api_client
+from services.api_client import async_api_client, BULK
 from services.persona import PersonaFactory
 from utils.logger import logger
+from utils.lru_cache import SizedLRUCache
 from core.inference_fact import TemporalScope
 
 class ReportGenerator:
@@ -16,7 +18,7 @@ class ReportGenerator:
         self.game = game_state
         self.renderer = renderer
         self.commentator = commentator # GeminiCommentator instance
-        self.analysis_cache = {}  # Cache for full analysis results
+        self.analysis_cache = SizedLRUCache("report_analysis", REPORT_ANALYSIS_CACHE_MAX_BYTES)  # Cache for full analysis results
         
         # Use Agg backend for matplotlib to avoid GUI requirement
         import matplotlib
@@ -75,7 +77,7 @@ class ReportGenerator:
             
             try:
                 # 前局面解析 (推奨手取得)
-                res_prev = await asyncio.to_thread(api_client.analyze_move, history_prev, self.game.board_size)
+                res_prev = await async_api_client.analyze_move(history_prev, self.game.board_size, request_class=BULK)
                 # 現局面フル解析 (事実取得) - Rank 1 または 詳細が必要なら
                 collector_curr = await self._get_cached_analysis(history_curr)
                 
@@ -214,8 +216,9 @@ class ReportGenerator:
 
     async def _get_cached_analysis(self, history):
         h_key = str(history) # history is list of lists, stringify for key
-        if h_key in self.analysis_cache:
-            return self.analysis_cache[h_key]
+        cached = self.analysis_cache.get(h_key)
+        if cached is not None:
+            return cached
         
         # 既存解析がない場合のみ実行
         res = await self.commentator.orchestrator.analyze_full(history, self.game.board_size)
@@ -246,17 +249,24 @@ class ReportGenerator:
             # moves list usually: [Result of Move 1, Result of Move 2, ...]
             # Move 1 (Black): result dict has 'winrate_black'.
             
-            for i, data in enumerate(moves):
-                if not data: continue
-                # 黒の勝率を取得
-                if isinstance(data, dict):
-                    wb = data.get('winrate', data.get('winrate_black'))
-                else:
-                    wb = getattr(data, 'winrate', getattr(data, 'winrate_black', None))
-
-                if wb is not None:
-                    indices.append(i + 1)
-                    wrs.append(wb * 100) # %
+            columns = getattr(moves, "columns", None)
+            if columns is not None:
+                # アーカイブ上の解析結果は勝率の列だけを読む
+                wr, _, present = columns()
+                indices = [int(i) + 1 for i in np.nonzero(present)[0]]
+                wrs = [float(v) * 100 for v in wr[present]]
+            else:
+                for i, data in enumerate(moves):
+                    if not data: continue
+                    # 黒の勝率を取得
+                    if isinstance(data, dict):
+                        wb = data.get('winrate', data.get('winrate_black'))
+                    else:
+                        wb = getattr(data, 'winrate', getattr(data, 'winrate_black', None))
+
+                    if wb is not None:
+                        indices.append(i + 1)
+                        wrs.append(wb * 100) # %
             
             if not indices: return False
 
@@ -344,7 +354,7 @@ class ReportGenerator:
                 history_prev = self.game.get_history_up_to(m_idx - 1)
                 
                 # AI解析実行
-                res_prev = await asyncio.to_thread(api_client.analyze_move, history_prev, self.game.board_size)
+                res_prev = await async_api_client.analyze_move(history_prev, self.game.board_size, request_class=BULK)
                 
                 if res_prev and res_prev.candidates:
                     best_move_gtp = res_prev.candidates[0].move
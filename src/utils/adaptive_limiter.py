@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional
+
+
+class AdaptiveLimiter:
+    """
+    観測した応答時間に応じて同時実行数の上限を調整するリミッタ（AIMD、asyncio版。同一イベントループ内でのみ使用する）。
+
+    応答時間の移動平均が基準（直近 baseline_window 件の応答時間の下位 baseline_percentile）の tolerance 倍を
+    超えた場合（または失敗した場合）は混雑とみなして上限を backoff 倍に縮め、それ以外は1往復ごとにおよそ1ずつ上限を広げる。
+    キャッシュから返った応答など、エンジンの負荷を表さない応答時間は release に渡さないこと。
+    shed_when_congested が True の場合、混雑中に空きが無ければ待たずに拒否する（先読みなど捨ててよい要求用）。
+    """
+
+    def __init__(self, name: str, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 tolerance: float = 2.0, backoff: float = 0.7, max_waiting: Optional[int] = None,
+                 shed_when_congested: bool = False, min_latency_floor: float = 0.05, baseline_window: int = 200,
+                 baseline_percentile: float = 0.1):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_waiting = max_waiting
+        self.shed_when_congested = shed_when_congested
+        self.min_latency_floor = min_latency_floor  # これ未満の応答時間の揺れは混雑とみなさない
+        self.baseline_percentile = baseline_percentile
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.latency_avg: Optional[float] = None  # 応答時間の指数移動平均
+        self.latency_baseline: Optional[float] = None  # 基準とする無負荷時の応答時間
+        self._recent: Deque[float] = deque(maxlen=baseline_window)
+        self._last_decrease = 0.0
+        self.shed = 0
+        self.decreases = 0
+
+    # --- 取得・解放 ---
+
+    @property
+    def congested(self) -> bool:
+        if self.latency_avg is None or self.latency_baseline is None:
+            return False
+        return self.latency_avg > max(self.latency_baseline * self.tolerance, self.min_latency_floor)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> bool:
+        """実行枠を確保する（拒否した場合は False。True の場合は必ず release を呼ぶこと）"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return True
+        if (self.shed_when_congested and self.congested) or \
+                (self.max_waiting is not None and len(self._waiters) >= self.max_waiting):
+            self.shed += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # 枠を受け取った直後に取り消された
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self, latency: Optional[float], ok: bool = True):
+        """実行枠を返し、応答時間（失敗時は ok=False）を上限の調整に反映する"""
+        if latency is not None or not ok:
+            self._observe(latency, ok)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done(): continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    # --- 上限の調整 ---
+
+    def _observe(self, latency: Optional[float], ok: bool):
+        if latency is not None:
+            self.latency_avg = latency if self.latency_avg is None else 0.8 * self.latency_avg + 0.2 * latency
+            # 全期間の最小値ではなく直近の下位パーセンタイルを基準にし、1回だけ極端に速かった応答に引きずられず、
+            # エンジンの交代や負荷傾向の変化にも窓の長さで追従する
+            self._recent.append(latency)
+            ordered = sorted(self._recent)
+            self.latency_baseline = ordered[int(len(ordered) * self.baseline_percentile)]
+
+        if not ok or self.congested:
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def _decrease(self):
+        # 同じ混雑で立て続けに縮めないよう、平均応答時間に1回までとする
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency_avg or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self.decreases += 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "latency_avg": self.latency_avg,
+            "latency_baseline": self.latency_baseline,
+            "congested": self.congested,
+            "shed": self.shed,
+            "decreases": self.decreases,
+        }
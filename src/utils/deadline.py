@@ -0,0 +1,63 @@
+import math
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    1回の処理（解説生成など）全体の締め切り。
+    オーケストレータから API クライアント・API サーバー・エンジンドライバへ順に渡し、各段階が残り時間に合わせて
+    待ち時間・探索量を縮める。プロセスを跨ぐ場合は残り時間（ミリ秒）で受け渡す。
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = max(0.0, float(seconds))
+        self.expires_at = time.monotonic() + self.budget
+
+    @classmethod
+    def from_ms(cls, ms: Optional[float]) -> Optional["Deadline"]:
+        return cls(ms / 1000.0) if ms is not None else None
+
+    def to_ms(self) -> int:
+        return int(self.remaining() * 1000)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """残り時間から reserve 秒を差し引いた待ち時間（cap を上限とする）"""
+        t = max(0.0, self.remaining() - reserve)
+        return min(t, cap) if cap is not None else t
+
+    def child(self, reserve: float) -> "Deadline":
+        """この締め切りより reserve 秒早く終わる締め切り（後続の処理の時間を残す）"""
+        return Deadline(self.timeout(reserve=reserve))
+
+    def scale_visits(self, visits: int, min_visits: int = 16) -> int:
+        """
+        残り時間の割合に応じて探索数を縮める。
+        予算の半分以上が残っていればそのまま、それ以下では残り時間に比例して減らす（min_visits を下限とする）。
+        """
+        if self.budget <= 0:
+            return min(visits, min_visits)
+        fraction = self.remaining() / self.budget
+        if fraction >= 0.5:
+            return visits
+        return min(visits, max(min_visits, int(visits * fraction * 2)))
+
+    @staticmethod
+    def bucket(deadline: Optional["Deadline"]) -> Optional[int]:
+        """
+        同一処理の共有（single-flight）のキーに含める残り時間の区分（締め切り無しは None）。
+        残り時間が2倍以上違う呼び出し元は別の区分になり、一方の締め切りによる縮小が他方に波及しない。
+        """
+        if deadline is None:
+            return None
+        return int(math.log2(max(1, deadline.to_ms())))
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.2f}s, budget={self.budget:.2f}s)"
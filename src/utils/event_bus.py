@@ -1,10 +1,17 @@
-from typing import Callable, Dict, List, Any
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional
 from utils.logger import logger
+from config import UI_NOTIFY_INTERVAL_MS
+
+_NOTHING = object()
+
 
 class EventBus:
     """
     システム内でのイベント発行・購読を管理するシンプルなメッセージバス。
     コンポーネント間の疎結合を実現する。
+    間引き対象（coalesce）のイベントは、一定間隔ごとに最新の状態だけを配信する。
     """
     _instance = None
 
@@ -12,6 +19,9 @@ class EventBus:
         if cls._instance is None:
             cls._instance = super(EventBus, cls).__new__(cls)
             cls._instance._subscribers: Dict[str, List[Callable]] = {}
+            cls._instance._coalesced: Dict[str, dict] = {}
+            cls._instance._lock = threading.Lock()
+            cls._instance._dispatcher = None
         return cls._instance
 
     def subscribe(self, event_type: str, callback: Callable[[Any], None]):
@@ -33,8 +43,64 @@ class EventBus:
         self._subscribers = {}
         logger.warning("All event subscribers cleared.", layer="EVENT")
 
+    def coalesce(self, event_type: str, interval_ms: int, merge: Optional[Callable[[Any, Any], Any]] = None):
+        """
+        event_type を間引き対象にする。発行されたデータは interval_ms ごとに1回だけ配信する。
+        merge(前回までのデータ, 新しいデータ) を指定すると未配信のデータを合成し、省略時は最新のものだけを残す。
+        """
+        with self._lock:
+            self._coalesced[event_type] = {"interval": interval_ms, "merge": merge, "pending": _NOTHING,
+                                           "scheduled": False, "last": 0.0}
+
+    def set_dispatcher(self, schedule: Optional[Callable[[int, Callable[[], None]], Any]]):
+        """
+        間引いたイベントを配信するスケジューラ schedule(遅延ミリ秒, 関数) を設定する。
+        Tk では root.after を渡し、配信を GUI スレッドで行う。None の場合はタイマースレッドで配信する。
+        """
+        self._dispatcher = schedule
+
     def publish(self, event_type: str, data: Any = None):
         """イベントを発行し、登録されているすべての購読者に通知する"""
+        spec = self._coalesced.get(event_type)
+        if spec is not None:
+            self._publish_coalesced(event_type, spec, data)
+            return
+        self._deliver(event_type, data)
+
+    def _publish_coalesced(self, event_type: str, spec: dict, data: Any):
+        with self._lock:
+            pending, merge = spec["pending"], spec["merge"]
+            spec["pending"] = data if pending is _NOTHING or merge is None else merge(pending, data)
+            if spec["scheduled"]:
+                return
+            spec["scheduled"] = True
+            delay = max(0, int(spec["interval"] - (time.monotonic() - spec["last"]) * 1000))
+        try:
+            if self._dispatcher is not None:
+                self._dispatcher(delay, lambda: self.flush(event_type))
+            else:
+                timer = threading.Timer(delay / 1000, self.flush, args=(event_type,))
+                timer.daemon = True
+                timer.start()
+        except Exception as e:
+            # ウィンドウの破棄後など、スケジュールできない場合は次の発行で再度試みる
+            with self._lock:
+                spec["scheduled"] = False
+            logger.debug(f"Could not schedule coalesced event {event_type}: {e}", layer="EVENT")
+
+    def flush(self, event_type: str):
+        """間引き対象のイベントの未配信データを今すぐ配信する（配信予定の時刻にも呼ばれる）"""
+        spec = self._coalesced.get(event_type)
+        if spec is None:
+            return
+        with self._lock:
+            data, spec["pending"] = spec["pending"], _NOTHING
+            spec["scheduled"] = False
+            spec["last"] = time.monotonic()
+        if data is not _NOTHING:
+            self._deliver(event_type, data)
+
+    def _deliver(self, event_type: str, data: Any):
         if event_type in self._subscribers:
             logger.debug(f"Publishing event: {event_type}", layer="EVENT")
             # 実行中に購読解除される可能性を考慮してコピーを使用
@@ -44,6 +110,24 @@ class EventBus:
                 except Exception as e:
                     logger.error(f"Error in event handler for {event_type}: {e}", layer="EVENT")
 
+
+class _MergedProgress(dict):
+    """merge_analysis_progress が作った合成用の辞書（発行元の辞書とは別物）"""
+
+
+def merge_analysis_progress(pending: dict, data: dict) -> dict:
+    """
+    ANALYSIS_PROGRESS の未配信分に新しい差分を重ねる（同じ手は新しい結果で上書き）。
+    最初の合成時に複製し、発行元が渡した辞書は書き換えない。
+    """
+    if not isinstance(pending, _MergedProgress):
+        pending = _MergedProgress(pending, updates=dict(pending["updates"]))
+    pending["updates"].update(data["updates"])
+    pending["completed"] = data["completed"]
+    pending["total"] = data["total"]
+    return pending
+
+
 # Global Singleton Instance
 event_bus = EventBus()
 
@@ -53,7 +137,7 @@ class AppEvents:
     STATE_UPDATED = "STATE_UPDATED"     # 盤面・解析データが更新された (data: dict)
     LEVEL_CHANGED = "LEVEL_CHANGED"     # 解説レベルが変更された (data: level_id)
     ANALYSIS_COMPLETED = "ANALYSIS_COMPLETED" # 解析が完了した
-    
+
     # --- 新規追加 ---
     BOARD_REDRAW_REQUESTED = "BOARD_REDRAW_REQUESTED" # 盤面の再描画 (data: dict)
     MISTAKES_UPDATED = "MISTAKES_UPDATED"             # 悪手情報の更新 (data: dict)
@@ -61,3 +145,9 @@ class AppEvents:
     STATUS_MSG_UPDATED = "STATUS_MSG_UPDATED"         # ステータスバーのメッセージ (data: str)
     PROGRESS_UPDATED = "PROGRESS_UPDATED"             # 進捗バーの更新 (data: int)
     FACT_DISCOVERED = "FACT_DISCOVERED"               # 解析エンジンが新しい事実を発見した (data: InferenceFact)
+    # 一括解析の差分 (data: {"updates": {手数: AnalysisResult}, "completed": int, "total": int})
+    ANALYSIS_PROGRESS = "ANALYSIS_PROGRESS"
+
+
+# 一括解析の差分は間引いて GUI に届ける（他のイベントは発行したスレッドでそのまま配信する）
+event_bus.coalesce(AppEvents.ANALYSIS_PROGRESS, UI_NOTIFY_INTERVAL_MS, merge=merge_analysis_progress)
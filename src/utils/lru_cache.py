@@ -0,0 +1,171 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from utils.metrics import metrics
+
+LRU_CACHE_STATE = metrics.gauge("lru_cache", "SizedLRUCache state per cache (entries/bytes/max_bytes/hits/misses/evictions)")
+LRU_CACHE_EVICTIONS = metrics.counter("lru_cache_evictions_total", "Entries evicted from SizedLRUCache by cache")
+
+_OBJECT_OVERHEAD = 256  # 1件あたりの辞書・オブジェクトの固定費の目安
+_CANDIDATE_BYTES = 200
+_PV_MOVE_BYTES = 60
+_FACT_BYTES = 512
+
+
+def estimate_size(value: Any) -> int:
+    """
+    キャッシュに載せる値のおおよそのバイト数。
+    numpy 配列・画像は実データの大きさ、解析結果は Ownership/Influence と候補手の分を数える。
+    """
+    if value is None:
+        return 0
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(value, "getbands") and hasattr(value, "size"):  # PIL.Image
+        w, h = value.size
+        return w * h * len(value.getbands()) + _OBJECT_OVERHEAD
+    if hasattr(value, "raw_analysis") and hasattr(value, "facts"):  # FactCollector
+        return _OBJECT_OVERHEAD + estimate_size(value.raw_analysis) + len(value.facts) * _FACT_BYTES
+    if hasattr(value, "ownership") and hasattr(value, "candidates"):  # AnalysisResult
+        size = _OBJECT_OVERHEAD + _sequence_size(value.ownership) + _sequence_size(getattr(value, "influence", None))
+        for c in value.candidates or []:
+            size += _CANDIDATE_BYTES + len(getattr(c, "pv", []) or []) * _PV_MOVE_BYTES
+        return size
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _sequence_size(values: Any) -> int:
+    if values is None:
+        return 0
+    nbytes = getattr(values, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(values) + len(values) * 24  # Python float のリスト
+
+
+class SizedLRUCache:
+    """
+    値の大きさを数えて合計バイト数（と件数）の上限を守る LRU キャッシュ（スレッドセーフ）。
+    上限を超えると最も古く使われた値から追い出し、on_evict(key, value) を呼ぶ。
+    ヒット率などの統計はメトリクス lru_cache{cache,kind} として公開する。
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_entries: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        for kind in ("entries", "bytes", "max_bytes", "hits", "misses", "evictions"):
+            LRU_CACHE_STATE.set_function(lambda k=kind: self.stats()[k], cache=name, kind=kind)
+
+    # --- 参照 ---
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """統計・LRU の順序には影響しない"""
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- 更新 ---
+
+    def put(self, key: Hashable, value: Any):
+        size = max(0, int(self.sizeof(value)))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            evicted = self._evict_locked(keep=key)
+        self._notify_evicted(evicted)
+
+    __setitem__ = put
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        """全件を追い出す（on_evict も呼ぶ）"""
+        with self._lock:
+            evicted = [(k, v) for k, (v, _) in self._entries.items()]
+            self._entries.clear()
+            self.bytes = 0
+        if self.on_evict is not None:
+            for key, value in evicted:
+                self.on_evict(key, value)
+
+    def _evict_locked(self, keep: Hashable) -> list:
+        evicted = []
+        while self._entries and (self.bytes > self.max_bytes or
+                                 (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            key, (value, size) = next(iter(self._entries.items()))
+            if key == keep:
+                break  # 上限より大きい値でも、入れた直後の1件は保持する
+            del self._entries[key]
+            self.bytes -= size
+            self.evictions += 1
+            evicted.append((key, value))
+        return evicted
+
+    def _notify_evicted(self, evicted: list):
+        if not evicted:
+            return
+        LRU_CACHE_EVICTIONS.inc(len(evicted), cache=self.name)
+        if self.on_evict is None:
+            return
+        for key, value in evicted:
+            self.on_evict(key, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -6,10 +6,10 @@ class HeatmapLayer(RenderLayer):
     def draw(self, draw: ImageDraw.ImageDraw, ctx: RenderContext):
         # 1. データの取得
         ownership = ctx.ownership
-        if not ownership and hasattr(ctx, 'analysis_result') and ctx.analysis_result:
+        if ownership is None and hasattr(ctx, 'analysis_result') and ctx.analysis_result:
             ownership = ctx.analysis_result.ownership
             
-        if not ownership:
+        if ownership is None or len(ownership) == 0:
             return
             
         
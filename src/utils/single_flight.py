@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    同一キーの処理が実行中であれば新たに実行せず、その結果を共有する（スレッド用）。
+    結果は複数の呼び出し元で共有されるため、呼び出し側で変更しないこと。
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.executed = 0  # 実際に実行した回数
+        self.absorbed = 0  # 実行中の処理に相乗りした（重複を吸収した）回数
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.executed += 1
+            else:
+                self.absorbed += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "absorbed": self.absorbed, "in_flight": len(self._inflight)}
+
+
+class AsyncSingleFlight:
+    """SingleFlight の asyncio 版（同一イベントループ内でのみ使用する）"""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.absorbed = 0
+
+    async def do(self, key: Hashable, coro_fn: Callable[..., Any], *args, **kwargs) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._inflight[key] = task
+            self.executed += 1
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            self.absorbed += 1
+        # 呼び出し元の1つがキャンセルされても、共有している処理は継続させる
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """key の処理が実行中か（do を呼べば相乗りになるか）"""
+        return key in self._inflight
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "absorbed": self.absorbed, "in_flight": len(self._inflight)}
@@ -9,6 +9,7 @@ from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult
 from core.inference_fact import FactCollector, AtsumiMetadata, MoyoMetadata
 from core.stability_analyzer import StabilityAnalyzer
+from services.analysis_memo import AnalysisMemo
 from services.fact_providers import StrategicFactProvider, InfluenceFactProvider
 from core.board_region import RegionType
 
@@ -58,7 +59,7 @@ async def test_atsumi():
     analyzer = StabilityAnalyzer(board_size)
     
     provider = StrategicFactProvider(board_size, analyzer)
-    await provider.provide_facts(collector, context, analysis)
+    await provider.provide_facts(collector, context, analysis, AnalysisMemo([], board_size, context, analysis, analyzer))
     
     atsumi_found = False
     for fact in collector.facts:
@@ -111,7 +112,8 @@ async def test_moyo():
             return RegionType.CENTER
             
     provider = InfluenceFactProvider(board_size, MockRegion())
-    await provider.provide_facts(collector, context, analysis)
+    memo = AnalysisMemo([], board_size, context, analysis, StabilityAnalyzer(board_size))
+    await provider.provide_facts(collector, context, analysis, memo)
     
     moyo_found = False
     for fact in collector.facts:
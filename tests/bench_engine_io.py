@@ -0,0 +1,75 @@
+"""
+エンジン I/O の往復オーバーヘッド計測（偽エンジン使用、pytest の収集対象外）
+
+    python tests/bench_engine_io.py --queries 500 --threads 8
+
+偽エンジンの遅延を 0 にして計測するため、得られる値はほぼドライバ側の
+送受信・デコード・振り分けに掛かる時間となる。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from config import FAKE_KATAGO_SCRIPT
+from drivers.katago_driver import KataGoDriver
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def timed_query(driver, n, visits):
+    moves = [["B", "D4"], ["W", "Q16"]] + [["B", f"K{(n % 17) + 3}"]]
+    t0 = time.perf_counter()
+    res = driver.query(moves, visits=visits, include_ownership=True, include_influence=False)
+    if "error" in res:
+        raise RuntimeError(res["error"])
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def report(label, samples, elapsed):
+    print(f"{label:<12} n={len(samples):<5} p50={percentile(samples, 50):7.3f}ms "
+          f"p99={percentile(samples, 99):7.3f}ms  max={max(samples):7.3f}ms  "
+          f"throughput={len(samples) / elapsed:8.1f} q/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KataGo driver round-trip benchmark (fake engine)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--visits", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    os.environ["FAKE_KATAGO_CONCURRENCY"] = str(max(1, args.threads))
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # katago_debug.log の出力先
+        driver = KataGoDriver(FAKE_KATAGO_SCRIPT, "fake.cfg", "fake.bin.gz", supervise=False)
+        try:
+            for n in range(20):
+                timed_query(driver, n, args.visits)  # ウォームアップ
+
+            t0 = time.perf_counter()
+            samples = [timed_query(driver, n, args.visits) for n in range(args.queries)]
+            report("sequential", samples, time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                samples = list(pool.map(lambda n: timed_query(driver, n, args.visits), range(args.queries)))
+            report(f"parallel x{args.threads}", samples, time.perf_counter() - t0)
+        finally:
+            driver.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
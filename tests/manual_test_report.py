@@ -7,7 +7,7 @@ from unittest.mock import MagicMock, AsyncMock
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
 
 from services.report_generator import ReportGenerator
-from services.api_client import api_client
+from services.api_client import async_api_client
 from core.inference_fact import TemporalScope
 
 async def test_report_generation():
@@ -92,7 +92,7 @@ async def test_report_generation():
 
     # Mock API Client
     # Match Move 3 ('cc') to test Tier 1 logic
-    api_client.analyze_move = MagicMock(return_value=MagicMock(candidates=[MagicMock(pv=["cc"], move="cc")]))
+    async_api_client.analyze_move = AsyncMock(return_value=MagicMock(candidates=[MagicMock(pv=["cc"], move="cc")]))
 
     # Instantiate ReportGenerator
     generator = ReportGenerator(mock_game, mock_renderer, mock_commentator)
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.adaptive_limiter import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_limit_grows_while_latency_is_stable(self):
+        limiter = AdaptiveLimiter("t", initial_limit=2, max_limit=4)
+
+        async def run():
+            for _ in range(40):
+                await limiter.acquire()
+                limiter.release(0.1)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.limit, 4)
+        self.assertFalse(limiter.congested)
+
+    def test_rising_latency_shrinks_limit(self):
+        limiter = AdaptiveLimiter("t", initial_limit=8, min_limit=2)
+
+        async def run():
+            for latency in [0.1] * 5 + [1.0] * 5:
+                await limiter.acquire()
+                limiter._last_decrease = 0.0  # 間隔の制限を外して毎回評価する
+                limiter.release(latency)
+
+        asyncio.run(run())
+        self.assertTrue(limiter.congested)
+        self.assertLess(limiter.limit, 8)
+        self.assertGreaterEqual(limiter.limit, 2)
+        self.assertGreater(limiter.decreases, 0)
+
+    def test_single_fast_reply_does_not_reset_the_baseline(self):
+        limiter = AdaptiveLimiter("t", initial_limit=4)
+
+        async def run():
+            for latency in [1.0] * 50 + [0.005] + [1.0] * 5:
+                await limiter.acquire()
+                limiter.release(latency)
+
+        asyncio.run(run())
+        self.assertAlmostEqual(limiter.latency_baseline, 1.0)
+        self.assertFalse(limiter.congested)
+
+    def test_failures_shrink_limit(self):
+        limiter = AdaptiveLimiter("t", initial_limit=4)
+
+        async def run():
+            await limiter.acquire()
+            limiter.release(None, ok=False)
+
+        asyncio.run(run())
+        self.assertAlmostEqual(limiter.limit, 4 * limiter.backoff)
+
+    def test_waiters_are_admitted_in_order(self):
+        limiter = AdaptiveLimiter("t", initial_limit=1, max_limit=1)
+        order = []
+
+        async def worker(i):
+            await limiter.acquire()
+            order.append(i)
+            await asyncio.sleep(0.01)
+            limiter.release(0.01)
+
+        async def run():
+            await asyncio.gather(*(worker(i) for i in range(4)))
+
+        asyncio.run(run())
+        self.assertEqual(order, [0, 1, 2, 3])
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_shed_when_congested_and_cancelled_waiters(self):
+        limiter = AdaptiveLimiter("t", initial_limit=1, shed_when_congested=True)
+        limiter.latency_baseline, limiter.latency_avg = 0.1, 1.0
+
+        async def run():
+            self.assertTrue(await limiter.acquire())
+            self.assertFalse(await limiter.acquire())  # 混雑中で空きが無い
+
+            limiter.latency_avg = 0.1
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            limiter.release(0.1)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.shed, 1)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.stats()["waiting"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
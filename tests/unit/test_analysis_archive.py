@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_archive import AnalysisArchive, ArchivedMoves, write_archive, record_dtype, HEADER_SIZE
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from core.game_state import GoGameState
+
+
+def result(wr, score, board_size=9):
+    own = np.linspace(-1, 1, board_size * board_size, dtype=np.float32)
+    return AnalysisResult(winrate=wr, score_lead=score, ownership=own, candidates=[
+        MoveCandidate("E5", wr, score, score_loss=0.0, pv=["E5", "C3", "pass", "J9"]),
+        MoveCandidate("pass", wr - 0.1, score - 2, score_loss=2.0),
+    ])
+
+
+class TestAnalysisArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "analysis.goaa")
+        self.results = [result(0.5, 0.0), result(0.45, -1.0), None, result(0.7, 3.5), result(0.4, -2.0)]
+        write_archive(self.path, 9, self.results, sgf_hash="ab" * 32)
+        self.archive = AnalysisArchive(self.path)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_fixed_size_records(self):
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + 5 * record_dtype(9, 5, 12).itemsize)
+        self.assertEqual(len(self.archive), 5)
+        self.assertEqual(self.archive.board_size, 9)
+        self.assertEqual(self.archive.sgf_hash, "ab" * 32)
+
+    def test_single_move_round_trip(self):
+        r = self.archive[3]
+        self.assertAlmostEqual(r.winrate, 0.7, places=5)
+        self.assertAlmostEqual(r.score_lead, 3.5, places=5)
+        np.testing.assert_allclose(r.ownership, self.results[3].ownership, atol=1e-3)  # float16
+        self.assertIsNone(r.influence)
+        self.assertEqual([c.move for c in r.candidates], ["E5", "pass"])
+        self.assertEqual(r.candidates[0].pv, ["E5", "C3", "pass", "J9"])
+        self.assertAlmostEqual(r.candidates[1].score_loss, 2.0)
+        self.assertIsNone(self.archive[2])
+        self.assertFalse(self.archive.has(2))
+
+    def test_columns_without_decoding(self):
+        np.testing.assert_allclose(self.archive.column("winrate")[[0, 1, 3, 4]], [0.5, 0.45, 0.7, 0.4], atol=1e-6)
+        self.assertEqual(list(self.archive.column("present")), [1, 1, 0, 1, 1])
+        self.assertEqual(self.archive.ownership(0).dtype, np.float16)
+
+    def test_values_stay_readable_after_close(self):
+        winrate, own = self.archive.column("winrate"), self.archive.ownership(0)
+        reading = self.archive._records[3]  # 別スレッドで読み取り中の手
+        self.archive.close()
+        # 書き換え（アーカイブの置き換え）後も、渡した配列・読み取り中の手は有効なまま
+        write_archive(self.path, 9, [None] * 5)
+        self.assertAlmostEqual(float(winrate[3]), 0.7, places=5)
+        self.assertEqual(own.shape, (81,))
+        self.assertAlmostEqual(float(reading["winrate"]), 0.7, places=5)
+        self.assertEqual(len(self.archive), 0)
+
+    def test_rejects_other_files(self):
+        bad = os.path.join(self.tmp.name, "bad.goaa")
+        with open(bad, "wb") as f:
+            f.write(b"\0" * 128)
+        with self.assertRaises(ValueError):
+            AnalysisArchive(bad)
+
+
+class TestArchivedMoves(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "analysis.goaa")
+        self.results = [result(0.5, 0.0), result(0.3, -4.0), result(0.35, -3.0), None, result(0.6, 2.0),
+                        result(0.2, -6.0)]
+        write_archive(path, 9, self.results)
+        self.archive = AnalysisArchive(path)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_overlay_and_append(self):
+        moves = ArchivedMoves(self.archive)
+        moves[3] = result(0.55, 1.0)
+        moves.append(result(0.25, -5.0))
+        self.assertEqual(len(moves), 7)
+        self.assertAlmostEqual(moves[3].winrate, 0.55)
+        self.assertAlmostEqual(moves[-1].winrate, 0.25)
+        wr, sc, present = moves.columns()
+        self.assertTrue(present.all())
+        self.assertAlmostEqual(float(sc[3]), 1.0)
+
+    def test_mistakes_match_list_backed_moves(self):
+        listed, archived = GoGameState(), GoGameState()
+        listed.moves = list(self.results)
+        archived.moves = ArchivedMoves(self.archive)
+        mb_l, mw_l = listed.calculate_mistakes()
+        mb_a, mw_a = archived.calculate_mistakes()
+        self.assertEqual([m[2] for m in mb_l], [m[2] for m in mb_a])
+        self.assertEqual([m[2] for m in mw_l], [m[2] for m in mw_a])
+        for a, b in zip(mb_l + mw_l, mb_a + mw_a):
+            self.assertAlmostEqual(a[0], b[0], places=4)
+            self.assertAlmostEqual(a[1], b[1], places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from core.board_simulator import BoardSimulator
+from core.point import Point
+from core.stability_analyzer import StabilityAnalyzer
+import services.analysis_memo as memo_module
+from services.analysis_memo import AnalysisMemo, PREVIOUS
+from utils.deadline import Deadline
+
+HISTORY = [["B", "D4"], ["W", "Q16"], ["B", "D5"], ["W", "Q4"], ["B", "C6"]]
+
+
+def fake_analysis(history):
+    """手数に応じて Ownership が変わる解析結果（エンジン不要）"""
+    own = [0.3 + 0.1 * (len(history) % 5)] * 361
+    return AnalysisResult(winrate=0.5, score_lead=0.0, ownership=own)
+
+
+class TestAnalysisMemo(unittest.TestCase):
+    def setUp(self):
+        with redirect_stdout(io.StringIO()):
+            self.ctx = BoardSimulator().reconstruct_to_context(list(HISTORY), 19)
+        self.analyzer = StabilityAnalyzer(19)
+        self.lookups = []
+
+    def lookup(self, history):
+        self.lookups.append(len(history))
+        return fake_analysis(history)
+
+    def memo(self, **kwargs):
+        return AnalysisMemo(HISTORY, 19, self.ctx, fake_analysis(HISTORY), self.analyzer,
+                            analysis_lookup=self.lookup, **kwargs)
+
+    def test_artifacts_are_computed_once_and_shared(self):
+        async def run():
+            memo = self.memo()
+            results = await asyncio.gather(memo.stability_groups(), memo.stability_groups(), memo.prev_analysis(),
+                                           memo.prev_analysis(), memo.stability_groups(PREVIOUS))
+            return memo, results
+
+        memo, (g1, g2, p1, p2, prev_groups) = asyncio.run(run())
+        self.assertIs(g1, g2)
+        self.assertIs(p1, p2)
+        self.assertEqual(self.lookups, [len(HISTORY) - 1])  # 1手前の局面は1度だけ引く
+        stats = memo.summary()
+        self.assertEqual(stats["stability_groups"]["computed"], 2)
+        self.assertEqual(stats["chain_map"]["computed"], 2)
+        self.assertEqual(stats["analysis"]["seed"], 1)
+        self.assertGreaterEqual(stats["analysis"]["memo"], 3)
+
+        # 直接 StabilityAnalyzer で求めた結果と一致する
+        direct = self.analyzer.analyze(self.ctx.board, fake_analysis(HISTORY).ownership)
+        self.assertEqual([(g.stones, g.stability) for g in g1], [(g.stones, g.stability) for g in direct])
+        direct_prev = self.analyzer.analyze(self.ctx.prev_board, fake_analysis(HISTORY[:-1]).ownership)
+        self.assertEqual([(g.stones, g.stability) for g in prev_groups], [(g.stones, g.stability) for g in direct_prev])
+
+    def test_seeded_prev_analysis_skips_lookup(self):
+        prev = fake_analysis(HISTORY[:-1])
+
+        async def run():
+            return await self.memo(prev_analysis=prev).prev_analysis()
+
+        self.assertIs(asyncio.run(run()), prev)
+        self.assertEqual(self.lookups, [])
+
+    def test_urgency_sends_only_the_pass_query(self):
+        # 締め切りで探索数を縮めた現在局面の解析結果
+        current = AnalysisResult(winrate=0.5, score_lead=2.0, candidates=[MoveCandidate("C7", 0.5, 2.0, pv=["C7"])],
+                                 visits=40)
+        calls = []
+
+        async def fake_analyze(history, board_size=19, visits=150, include_pv=True, deadline=None, **kwargs):
+            calls.append((history, visits, deadline))
+            await asyncio.sleep(0.01)
+            return AnalysisResult(winrate=0.4, score_lead=-6.0, candidates=[MoveCandidate("C5", 0.4, -6.0, pv=["C5", "B5"])])
+
+        async def run():
+            memo = AnalysisMemo(HISTORY, 19, self.ctx, current, self.analyzer, deadline=Deadline(5))
+            return memo, await asyncio.gather(memo.urgency(), memo.urgency())
+
+        with mock.patch.object(memo_module.async_api_client, "analyze_move", side_effect=fake_analyze):
+            memo, (u1, u2) = asyncio.run(run())
+        # エンジンへの問い合わせはパスした局面の1回だけで、現在局面と同じ探索数を使う
+        self.assertEqual(calls, [(HISTORY + [["W", "pass"]], 40, None)])
+        self.assertIs(u1, u2)
+        self.assertEqual(u1["urgency"], 8.0)
+        self.assertEqual(u1["opponent_pv"], ["C5", "B5"])
+        self.assertEqual(memo.summary()["urgency"], {"memo": 1, "seed": 0, "computed": 1})
+
+    def test_chain_map_index(self):
+        async def run():
+            return await self.memo().chain_map()
+
+        chains = asyncio.run(run())
+        color, stones = chains.chain_at(Point.from_gtp("D4"))
+        self.assertIn(Point.from_gtp("D5"), stones)
+        self.assertIsNone(chains.chain_at(Point.from_gtp("K10")))
+
+
+if __name__ == "__main__":
+    unittest.main()
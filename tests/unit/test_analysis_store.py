@@ -0,0 +1,144 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from services.analysis_store import AnalysisStore, STORE_FILENAME, sgf_content_hash
+import services.analysis_service as analysis_service_module
+from utils.board_renderer import GoBoardRenderer
+
+SGF = b"(;SZ[9];B[ee];W[cc];B[gg];W[cg];B[gc])"
+
+
+def result(wr):
+    return AnalysisResult(winrate=wr, score_lead=1.5, ownership=[0.25] * 81,
+                          candidates=[MoveCandidate("E5", wr, 1.5, score_loss=0.5, pv=["E5", "C3"])])
+
+
+class TestAnalysisStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, STORE_FILENAME)
+        self.store = AnalysisStore(self.path)
+        self.h = sgf_content_hash(SGF)
+        self.store.open_game(self.h, 9, 6)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_round_trip_single_move(self):
+        self.assertTrue(self.store.put(self.h, 2, result(0.6)))
+        r = self.store.get(self.h, 2)
+        self.assertAlmostEqual(r.winrate, 0.6)
+        self.assertAlmostEqual(r.score_lead, 1.5)
+        self.assertEqual(r.candidates[0].pv, ["E5", "C3"])
+        self.assertAlmostEqual(r.candidates[0].score_loss, 0.5)
+        self.assertEqual(len(r.ownership), 81)
+        self.assertIsNone(self.store.get(self.h, 3))
+        self.assertEqual(self.store.game_info(self.h), (9, 6))
+
+    def test_append_only_and_keyed_by_sgf_content(self):
+        self.store.put(self.h, 0, result(0.5))
+        self.assertFalse(self.store.put(self.h, 0, result(0.9)))  # 既存の結果は上書きしない
+        self.assertAlmostEqual(self.store.get(self.h, 0).winrate, 0.5)
+        other = sgf_content_hash(SGF + b" ")
+        self.assertIsNone(self.store.get(other, 0))
+
+    def test_resume_point_survives_reopen(self):
+        for i in (0, 1, 3):
+            self.store.put(self.h, i, result(0.5))
+        self.store.close()
+        self.store = AnalysisStore(self.path)
+        self.assertEqual(self.store.first_missing(self.h, 6), 2)
+        self.assertEqual([r is not None for r in self.store.load_all(self.h, 6)],
+                         [True, True, False, True, False, False])
+
+    def test_since_returns_only_new_rows(self):
+        self.store.put(self.h, 0, result(0.5))
+        first, cursor = self.store.since(self.h)
+        self.assertEqual(list(first), [0])
+        self.store.put(self.h, 4, result(0.4))
+        second, cursor = self.store.since(self.h, cursor)
+        self.assertEqual(list(second), [4])
+        self.assertEqual(self.store.since(self.h, cursor)[0], {})
+
+
+class TestBulkAnalysisResume(unittest.TestCase):
+    def test_rerun_analyzes_only_missing_moves(self):
+        with tempfile.TemporaryDirectory() as d:
+            sgf_path = os.path.join(d, "game.sgf")
+            with open(sgf_path, "wb") as f:
+                f.write(SGF)
+            out_dir = os.path.join(d, "game")
+            os.makedirs(out_dir)
+            store = AnalysisStore(os.path.join(out_dir, STORE_FILENAME))
+            h = sgf_content_hash(SGF)
+            store.open_game(h, 9, 6)
+            for i in (0, 1, 2):
+                store.put(h, i, result(0.5))
+            store.close()
+
+            calls = []
+
+            def fake_analyze(history, board_size, **kwargs):
+                calls.append(len(history))
+                return result(0.4)
+
+            service = analysis_service_module.AnalysisService(task_manager=None)
+            with mock.patch.object(analysis_service_module, "OUTPUT_BASE_DIR", d), \
+                    mock.patch.object(analysis_service_module.api_client, "analyze_move", side_effect=fake_analyze), \
+                    mock.patch.object(analysis_service_module, "BULK_RENDER_WORKERS", 0):
+                service._run_bulk_analysis(sgf_path, GoBoardRenderer(9, 200))
+
+            self.assertEqual(sorted(calls), [3, 4, 5])
+            self.assertTrue(all(r is not None for r in service._index_cache))
+            results, _ = service.read_stored_results()
+            self.assertEqual(sorted(results), list(range(6)))
+            service._store.close()
+
+    def test_cursor_restarts_for_the_next_game(self):
+        with tempfile.TemporaryDirectory() as d:
+            paths = []
+            for name, data in (("first.sgf", SGF), ("second.sgf", b"(;SZ[9];B[cc];W[gg];B[ce])")):
+                paths.append(os.path.join(d, name))
+                with open(paths[-1], "wb") as f:
+                    f.write(data)
+
+            class _DeferredTasks:
+                """一括解析の開始直後（バックグラウンド処理の前）の状態を再現する"""
+                def __init__(self):
+                    self.tasks = []
+
+                def run_task(self, task_func, **kwargs):
+                    self.tasks.append(task_func)
+
+            tasks = _DeferredTasks()
+            service = analysis_service_module.AnalysisService(task_manager=tasks)
+            with mock.patch.object(analysis_service_module, "OUTPUT_BASE_DIR", d), \
+                    mock.patch.object(analysis_service_module.api_client, "analyze_move", return_value=result(0.4)), \
+                    mock.patch.object(analysis_service_module, "BULK_RENDER_WORKERS", 0):
+                renderer = GoBoardRenderer(9, 200)
+                service.start_sgf_analysis(paths[0], renderer)
+                tasks.tasks.pop()()
+                first, cursor = service.read_stored_results()
+                self.assertEqual(sorted(first), list(range(6)))
+
+                service.start_sgf_analysis(paths[1], renderer)
+                # 新しい対局のストアを開く前に前の対局の結果を読ませない
+                self.assertEqual(service.read_stored_results(cursor)[0], {})
+                tasks.tasks.pop()()
+                second, _ = service.read_stored_results(cursor)
+            self.assertEqual(sorted(second), list(range(4)))
+            service._store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
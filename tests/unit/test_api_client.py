@@ -0,0 +1,326 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from services.api_client import AsyncGoAPIClient, GoAPIClient, CircuitState, INTERACTIVE, BULK, PREFETCH
+from utils.deadline import Deadline
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """一定時間待ってから固定の解析結果を返す（status を設定するとエラーを返す）"""
+
+    def do_GET(self):
+        self._reply({"status": "ok"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, body))
+        time.sleep(server.delay)
+        if "histories" in body:
+            self._reply({"results": [self._analysis(h) for h in body["histories"]]})
+        else:
+            self._reply(self._analysis(body.get("history", [])))
+
+    def _analysis(self, history):
+        return {"winrate_black": 0.5 + 0.01 * len(history), "score_lead_black": 1.0,
+                "top_candidates": [{"move": "D4", "winrate": 0.5, "scoreLead": 1.0, "pv": ["D4", "Q16"]}]}
+
+    def _reply(self, payload):
+        status = self.server.status
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if getattr(self.server, "source", None):
+            self.send_header("X-Analysis-Source", self.server.source)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # 同時接続を受け付けられるようにする
+
+
+class TestAsyncGoAPIClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _StubServer(("127.0.0.1", 0), _StubHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.delay = 0.0
+        self.server.status = 200
+        self.server.source = None
+        self.client = AsyncGoAPIClient(self.base_url)
+
+    def test_concurrent_requests_share_one_thread(self):
+        self.server.delay = 0.3
+        histories = [[["B", f"D{i}"]] for i in range(1, 20)]
+
+        async def run():
+            return await asyncio.gather(*(self.client.analyze_move(h, include_pv=False) for h in histories))
+
+        t0 = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - t0
+        self.assertEqual(len(self.server.requests), len(histories))
+        self.assertTrue(all(r is not None and r.winrate == 0.51 for r in results))
+        # 直列なら 19 × 0.3 秒かかる
+        self.assertLess(elapsed, 3.0)
+
+    def test_identical_requests_are_deduplicated_across_loops(self):
+        self.server.delay = 0.3
+        history = [["B", "D4"], ["W", "Q16"]]
+
+        def call_from_new_loop(out):
+            out.append(asyncio.run(self.client.analyze_move(history)))
+
+        out = []
+        threads = [threading.Thread(target=call_from_new_loop, args=(out,)) for _ in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(out), 4)
+        self.assertEqual(self.client.coalescing_stats()["absorbed"], 3)
+
+    def test_http_errors_open_the_breaker(self):
+        self.server.status = 500
+        for _ in range(3):
+            self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "K10"]])))
+        self.assertEqual(self.client.breaker.state, CircuitState.OPEN)
+        self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "K10"]])))
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_urgency_compares_positions_at_the_same_visits(self):
+        history = [["B", "D4"], ["W", "Q16"]]
+        deadline = Deadline(10)
+        deadline.expires_at = time.monotonic() + 2.5  # 探索数が縮められる
+        res = asyncio.run(self.client.analyze_urgency(history, visits=200, deadline=deadline))
+        self.assertEqual(len(self.server.requests), 1)
+        path, body = self.server.requests[0]
+        self.assertEqual(path, "/analyze/batch")
+        self.assertEqual(body["histories"], [history, history + [["B", "pass"]]])
+        self.assertLess(body["visits"], 200)
+        self.assertEqual(res["next_player"], "B")
+        self.assertEqual(res["opponent_pv"], ["D4", "Q16"])
+
+    def test_urgency_reuses_current_analysis(self):
+        history = [["B", "D4"], ["W", "Q16"]]
+        deadline = Deadline(10)
+        deadline.expires_at = time.monotonic() + 2.5  # 現在局面は探索数を縮めて解析される
+        current = asyncio.run(self.client.analyze_move(history, visits=200, deadline=deadline))
+        self.assertLess(current.visits, 200)
+        self.server.requests = []
+        res = asyncio.run(self.client.analyze_urgency(history, visits=200, current=current))
+        self.assertEqual(len(self.server.requests), 1)
+        path, body = self.server.requests[0]
+        self.assertEqual((path, body["history"][-1]), ("/analyze", ["B", "pass"]))
+        self.assertEqual(body["visits"], current.visits)  # パスした局面も同じ探索数で比べる
+        self.assertEqual(res["next_player"], "B")
+        self.assertEqual(res["opponent_pv"], ["D4", "Q16"])
+
+    def test_urgency_checks_run_concurrently(self):
+        self.server.delay = 0.3
+        histories = [[["B", f"C{i}"]] for i in range(1, 9)]
+        t0 = time.perf_counter()
+        results = asyncio.run(self.client.analyze_urgency_many(histories))
+        self.assertLess(time.perf_counter() - t0, 1.5)
+        self.assertEqual(len(self.server.requests), len(histories))
+        self.assertTrue(all(r["next_player"] == "W" for r in results))
+
+    def test_deadline_is_forwarded_and_shrinks_visits(self):
+        deadline = Deadline(10)
+        deadline.expires_at = time.monotonic() + 2.5  # 予算の 1/4 が残っている
+        asyncio.run(self.client.analyze_move([["B", "E5"]], visits=200, deadline=deadline))
+        body = self.server.requests[0][1]
+        self.assertLessEqual(body["deadline_ms"], 2500)
+        self.assertLess(body["visits"], 200)
+
+        self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "E6"]], deadline=Deadline(0))))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_deadline_callers_do_not_share_with_unbounded_callers(self):
+        self.server.delay = 0.3
+        history = [["B", "E7"], ["W", "C3"]]
+
+        async def run():
+            return await asyncio.gather(self.client.analyze_move(history),
+                                        self.client.analyze_move(history, deadline=Deadline(5)),
+                                        self.client.analyze_move(history, deadline=Deadline(5)))
+
+        asyncio.run(run())
+        # 締め切りの無い要求と締め切りのある要求は別々に送り、締め切りが同程度の要求同士はまとめる
+        self.assertEqual(sorted("deadline_ms" in body for _, body in self.server.requests), [False, True])
+
+    def test_deadline_errors_do_not_open_the_breaker(self):
+        self.server.status = 504
+        for _ in range(4):
+            self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "K11"]], deadline=Deadline(5))))
+        self.assertEqual(self.client.breaker.state, CircuitState.CLOSED)
+
+    def test_cancel_tag_aborts_in_flight_requests(self):
+        self.server.delay = 1.0
+
+        async def run():
+            tagged = [asyncio.ensure_future(self.client.analyze_move([["B", f"J{i}"]], request_class=BULK,
+                                                                     cancel_tag="run-1")) for i in range(1, 4)]
+            other = asyncio.ensure_future(self.client.analyze_move([["B", "J9"]]))
+            await asyncio.sleep(0.2)
+            t0 = time.perf_counter()
+            cancel = asyncio.ensure_future(self.client.cancel("run-1"))
+            results = await asyncio.gather(*tagged)
+            elapsed = time.perf_counter() - t0
+            return results, elapsed, await cancel, await other
+
+        results, elapsed, cancelled, other = asyncio.run(run())
+        self.assertEqual(results, [None] * 3)
+        self.assertLess(elapsed, 0.5)  # サーバーの応答（1秒）を待たない
+        self.assertEqual(cancelled["client"], 3)
+        self.assertIsNotNone(other)
+        self.assertIn(("/cancel", {"tag": "run-1"}), self.server.requests)
+        # 打ち切り済みの tag の要求は送信しない
+        sent = len(self.server.requests)
+        self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "J5"]], cancel_tag="run-1")))
+        self.assertEqual(len(self.server.requests), sent)
+        self.assertEqual(self.client.breaker.state, CircuitState.CLOSED)
+
+    def test_cancelling_the_caller_is_not_swallowed(self):
+        self.server.delay = 1.0
+
+        async def run():
+            task = asyncio.ensure_future(self.client._request_analysis([["B", "H8"]], 19, 150, True, cancel_tag="caller-1"))
+            await asyncio.sleep(0.2)
+            task.cancel()  # cancel_tag とは無関係な取り消しは呼び出し元に伝わる
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return self.client._tagged_tasks.get("caller-1")
+
+        self.assertIsNone(asyncio.run(run()))
+
+    def test_sent_reports_requests_on_the_wire(self):
+        self.server.delay = 0.3
+
+        async def run():
+            task = asyncio.ensure_future(self.client.analyze_move([["B", "K3"]], request_class=PREFETCH,
+                                                                  cancel_tag="pf-1"))
+            await asyncio.sleep(0.1)
+            during = self.client.sent("pf-1")
+            await task
+            return during
+
+        self.assertFalse(self.client.sent("pf-1"))
+        self.assertTrue(asyncio.run(run()))
+        self.assertFalse(self.client.sent("pf-1"))
+
+    def test_sent_counts_requests_sharing_a_tag(self):
+        self.server.delay = 0.3
+
+        async def run():
+            first = asyncio.ensure_future(self.client.analyze_move([["B", "K4"]], cancel_tag="run-9"))
+            await asyncio.sleep(0.15)
+            second = asyncio.ensure_future(self.client.analyze_move([["B", "K5"]], cancel_tag="run-9"))
+            await first
+            during = self.client.sent("run-9")  # 2件目はまだ応答待ち
+            await second
+            return during
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertFalse(self.client.sent("run-9"))
+
+    def test_mirrored_position_is_served_from_the_transposition_table(self):
+        game = [["B", "D4"], ["W", "Q16"], ["B", "C17"]]
+        mirrored = [["B", "Q4"], ["W", "D16"], ["B", "R17"]]
+        first = asyncio.run(self.client.analyze_move(game, request_class=BULK))
+        shared = asyncio.run(self.client.analyze_move(mirrored, request_class=BULK))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(first.candidates[0].pv, ["D4", "Q16"])
+        self.assertEqual(shared.candidates[0].pv, ["Q4", "D16"])
+        self.assertAlmostEqual(self.client.transposition_stats()["hit_rate"][BULK], 0.5)
+
+    def test_request_classes_have_separate_budgets(self):
+        self.server.delay = 0.2
+        self.client.limiters[BULK].limit = 1
+
+        async def run():
+            bulk = [self.client.analyze_move([["B", f"F{i}"]], request_class=BULK) for i in range(1, 4)]
+            interactive = [self.client.analyze_move([["B", f"G{i}"]]) for i in range(1, 4)]
+            t0 = time.perf_counter()
+            await asyncio.gather(*interactive)
+            t_interactive = time.perf_counter() - t0
+            await asyncio.gather(*bulk)
+            return t_interactive
+
+        # 一括解析の枠が詰まっていても画面操作の解析は待たされない
+        self.assertLess(asyncio.run(run()), 0.5)
+        self.assertEqual(len(self.server.requests), 6)
+
+    def test_congestion_sheds_prefetch_and_degrades_bulk(self):
+        interactive = self.client.limiters[INTERACTIVE]
+        interactive.latency_baseline, interactive.latency_avg = 0.1, 1.0  # 応答時間が基準の10倍
+        self.assertTrue(self.client.congested())
+
+        self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "H1"]], request_class=PREFETCH)))
+        self.assertEqual(self.server.requests, [])
+        self.assertIsNotNone(asyncio.run(self.client.analyze_move([["B", "H2"]], visits=200, request_class=BULK)))
+        self.assertIsNotNone(asyncio.run(self.client.analyze_move([["B", "H3"]], visits=200)))
+        self.assertEqual([body["visits"] for _, body in self.server.requests], [100, 200])
+        self.assertEqual(self.client.concurrency_stats()[PREFETCH]["shed"], 1)
+
+    def test_reused_results_do_not_move_the_baseline(self):
+        limiter = self.client.limiters[INTERACTIVE]
+        self.server.delay = 0.05
+        for i in range(1, 6):
+            asyncio.run(self.client.analyze_move([["B", f"J{i}"]]))
+        baseline = limiter.latency_baseline
+        # エンジン側のキャッシュから即座に返った応答は基準に入れない
+        self.server.delay, self.server.source = 0.0, "cache"
+        for i in range(1, 6):
+            asyncio.run(self.client.analyze_move([["B", f"L{i}"]]))
+        self.assertEqual(limiter.latency_baseline, baseline)
+        # 締め切り超過（504）も同様
+        self.server.source, self.server.status = None, 504
+        self.assertIsNone(asyncio.run(self.client.analyze_move([["B", "M1"]])))
+        self.assertEqual(limiter.latency_baseline, baseline)
+        self.assertFalse(self.client.congested(BULK))
+
+    def test_sync_wrapper_delegates(self):
+        client = GoAPIClient()
+        old_url = client.base_url
+        client.base_url = self.base_url
+        client.breaker.record_success()  # 他のテストで遮断された状態を戻す
+        try:
+            self.assertEqual(client.async_client.base_url, self.base_url)
+            self.assertTrue(client.health_check())
+            res = client.analyze_urgency([["B", "D4"]])
+            self.assertEqual(res["next_player"], "W")
+            self.assertEqual([p for p, _ in self.server.requests], ["/analyze/batch"])
+        finally:
+            client.base_url = old_url
+
+
+if __name__ == "__main__":
+    unittest.main()
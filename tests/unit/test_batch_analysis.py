@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_archive import AnalysisArchive, ARCHIVE_FILENAME
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from services.analysis_store import AnalysisStore, STORE_FILENAME, sgf_content_hash
+import services.batch_analysis as batch_module
+from services.batch_analysis import (BatchAnalyzer, BatchJobQueue, discover_sgf_files, game_output_dir,
+                                     load_sgf_histories, PENDING, RUNNING, DONE, FAILED)
+
+GAMES = {
+    "a.sgf": b"(;SZ[9];B[ee];W[cc];B[gg])",
+    "b.sgf": b"(;SZ[9];B[ee];W[gc];B[cg];W[])",
+    os.path.join("club", "c.sgf"): b"(;SZ[9];B[cc];W[gg])",
+    os.path.join("club", "a.sgf"): b"(;SZ[9];B[gg];W[cc])",  # 別のディレクトリにある同名の対局
+}
+
+
+def result(n):
+    return AnalysisResult(winrate=0.5 + 0.01 * n, score_lead=float(n), ownership=[0.0] * 81,
+                          candidates=[MoveCandidate("E5", 0.5, 0.0, pv=["E5"])])
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "sgf")
+        self.out = os.path.join(self.tmp.name, "out")
+        for name, data in GAMES.items():
+            path = os.path.join(self.src, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self.queue = BatchJobQueue(os.path.join(self.tmp.name, "jobs.db"))
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_discover_and_enqueue_without_duplicates(self):
+        files = discover_sgf_files([self.src, os.path.join(self.src, "*.sgf")])
+        self.assertEqual(len(files), 4)
+        self.assertEqual(sum(self.queue.enqueue(p) for p in files), 4)
+        self.assertEqual(sum(self.queue.enqueue(p) for p in files), 0)
+        self.assertEqual(self.queue.counts()[PENDING], 4)
+
+    def test_histories_include_root_and_passes(self):
+        board_size, histories = load_sgf_histories(GAMES["b.sgf"])
+        self.assertEqual(board_size, 9)
+        self.assertEqual(histories[0], [])
+        self.assertEqual(histories[1], [["B", "E5"]])
+        self.assertEqual(histories[-1][-1], ["W", "pass"])
+
+    def test_interrupted_jobs_are_recovered(self):
+        for p in discover_sgf_files([self.src]):
+            self.queue.enqueue(p)
+        job = self.queue.claim()
+        self.assertEqual(self.queue.counts()[RUNNING], 1)
+        self.queue.close()
+        self.queue = BatchJobQueue(os.path.join(self.tmp.name, "jobs.db"))
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.queue.claim().id, job.id)
+
+    def test_run_analyzes_all_games_and_resumes(self):
+        for p in discover_sgf_files([self.src]):
+            self.queue.enqueue(p)
+        # b.sgf は途中まで解析済み（前回の中断）
+        b_hash = sgf_content_hash(GAMES["b.sgf"])
+        b_dir = game_output_dir(self.out, os.path.join(self.src, "b.sgf"), b_hash)
+        os.makedirs(b_dir)
+        store = AnalysisStore(os.path.join(b_dir, STORE_FILENAME))
+        store.open_game(b_hash, 9, 5)
+        store.put(b_hash, 0, result(0))
+        store.put(b_hash, 1, result(1))
+        store.close()
+
+        calls = []
+        lock = threading.Lock()
+
+        def fake_analyze(history, board_size, **kwargs):
+            with lock:
+                calls.append(len(history))
+            return result(len(history))
+
+        done = []
+        analyzer = BatchAnalyzer(self.queue, out_base=self.out, game_workers=2, move_workers=2)
+        with mock.patch.object(batch_module.api_client, "analyze_move", side_effect=fake_analyze):
+            stats = analyzer.run(lambda job, s: done.append(os.path.basename(job.sgf_path)))
+
+        self.assertEqual(sorted(done), ["a.sgf", "a.sgf", "b.sgf", "c.sgf"])
+        self.assertEqual(stats["queue"][DONE], 4)
+        self.assertEqual(stats["moves_analyzed"], 4 + 3 + 3 + 3)  # b.sgf は 0, 1 手目を解析しない
+        self.assertEqual(len(calls), 13)
+        self.assertGreater(stats["games_per_hour"], 0)
+        # 同名の対局もそれぞれの出力先にアーカイブを書き出す
+        self.assertEqual(len([d for d in os.listdir(self.out) if d.startswith("a-")]), 2)
+        archive = AnalysisArchive(os.path.join(b_dir, ARCHIVE_FILENAME))
+        self.assertEqual(len(archive), 5)
+        self.assertTrue(all(archive.has(i) for i in range(5)))
+        archive.close()
+
+        # 完了済みのジョブは再実行しても解析しない
+        with mock.patch.object(batch_module.api_client, "analyze_move", side_effect=fake_analyze):
+            BatchAnalyzer(self.queue, out_base=self.out).run()
+        self.assertEqual(len(calls), 13)
+
+    def test_failed_moves_retry_then_fail_the_job(self):
+        self.queue.enqueue(os.path.join(self.src, "a.sgf"))
+        analyzer = BatchAnalyzer(self.queue, out_base=self.out, game_workers=1, max_attempts=2, retry_delay=0.01)
+        with mock.patch.object(batch_module.api_client, "analyze_move", return_value=None), \
+                mock.patch.object(batch_module.api_client, "health_check", return_value=True):
+            stats = analyzer.run()
+        self.assertEqual(stats["queue"][FAILED], 1)
+        self.assertEqual(stats["games_failed"], 1)
+        self.assertIn("could not be analyzed", self.queue.failures()[0][1])
+        self.assertEqual(self.queue.retry_failed(), 1)
+
+    def test_outage_requeues_without_using_attempts(self):
+        self.queue.enqueue(os.path.join(self.src, "a.sgf"))
+        analyzer = BatchAnalyzer(self.queue, out_base=self.out, game_workers=1, max_attempts=1, retry_delay=0.01)
+        checks = []
+
+        def server_down():
+            checks.append(1)
+            if len(checks) == 3:
+                analyzer.stop()
+            return False
+
+        with mock.patch.object(batch_module.api_client, "analyze_move", return_value=None), \
+                mock.patch.object(batch_module.api_client, "health_check", side_effect=server_down), \
+                mock.patch.object(batch_module.api_client, "cancel"):
+            stats = analyzer.run()
+        self.assertEqual(len(checks), 3)
+        self.assertEqual(stats["queue"][PENDING], 1)
+        self.assertEqual(stats["games_failed"], 0)
+        self.assertEqual(self.queue.claim().attempts, 1)  # 停止中の失敗は試行回数に数えない
+
+
+if __name__ == "__main__":
+    unittest.main()
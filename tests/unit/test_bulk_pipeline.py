@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.game_board import GameBoard, Color
+from core.point import Point
+from services.bulk_pipeline import BulkPipeline, Stage, ImageRenderPool
+from utils.board_renderer import GoBoardRenderer
+
+
+class TestBulkPipeline(unittest.TestCase):
+    def test_items_flow_through_all_stages(self):
+        seen = []
+        lock = threading.Lock()
+
+        def collect(x):
+            with lock:
+                seen.append(x)
+
+        pipeline = BulkPipeline([
+            Stage("double", lambda x: x * 2, workers=3, queue_size=4),
+            Stage("skip_odd_input", lambda x: None if x % 4 else x, workers=2, queue_size=4),  # None は次へ渡さない
+            Stage("collect", collect, workers=1, queue_size=4),
+        ])
+        stats = pipeline.run(range(20))
+        self.assertEqual(sorted(seen), [x * 2 for x in range(20) if (x * 2) % 4 == 0])
+        self.assertEqual(stats["double"]["processed"], 20)
+        self.assertEqual(stats["collect"]["processed"], 10)
+        self.assertIn("double", pipeline.throughput_text())
+
+    def test_slow_stage_applies_backpressure_without_blocking_upstream_work(self):
+        fetched = []
+        peak = {"queued": 0}
+        slow = Stage("slow", lambda x: time.sleep(0.02), workers=1, queue_size=2)
+
+        def fetch(x):
+            fetched.append(x)
+            peak["queued"] = max(peak["queued"], slow.queue.qsize())
+            return x
+
+        BulkPipeline([Stage("fetch", fetch, workers=2, queue_size=2), slow]).run(range(15))
+        self.assertEqual(len(fetched), 15)
+        self.assertLessEqual(peak["queued"], 2)  # 遅い段のキューは上限を超えない
+
+    def test_failures_are_counted_and_do_not_stop_the_pipeline(self):
+        def flaky(x):
+            if x == 3:
+                raise ValueError("boom")
+            return x
+
+        out = []
+        stats = BulkPipeline([Stage("flaky", flaky, workers=2), Stage("out", out.append)]).run(range(6))
+        self.assertEqual(stats["flaky"]["failed"], 1)
+        self.assertEqual(sorted(out), [0, 1, 2, 4, 5])
+
+    def test_stop_returns_promptly(self):
+        pipeline = BulkPipeline([Stage("wait", lambda x: time.sleep(0.05), workers=1, queue_size=1)])
+        timer = threading.Timer(0.2, pipeline.stop)
+        timer.start()
+        t0 = time.perf_counter()
+        stats = pipeline.run(range(1000))
+        self.assertLess(time.perf_counter() - t0, 2.0)
+        self.assertTrue(pipeline.stopped)
+        self.assertLess(stats["wait"]["processed"], 1000)
+
+
+class TestImageRenderPool(unittest.TestCase):
+    def _render(self, workers):
+        board = GameBoard(9)
+        board.play(Point(4, 4), Color.BLACK)
+        pool = ImageRenderPool(GoBoardRenderer(9, 200), workers)
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "move_001.png")
+                self.assertEqual(pool.render(board, path, analysis_text="Move 1", history=[["B", "E5"]]), path)
+                self.assertGreater(os.path.getsize(path), 0)
+        finally:
+            pool.close()
+
+    def test_renders_in_worker_process(self):
+        self._render(workers=1)
+
+    def test_renders_in_thread_when_pool_disabled(self):
+        self._render(workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.board_simulator import BoardSimulator
+from core.context_cache import ContextCache
+
+# 取り（E4 の白石を打ち上げる）とパスを含む手順
+HISTORY = [["B", "D4"], ["W", "E4"], ["B", "F4"], ["W", "Q16"], ["B", "E5"], ["W", "pass"], ["B", "E3"],
+           ["W", "C3"], ["B", "R4"]]
+
+
+def snapshot(ctx):
+    return (sorted((p.to_gtp(), c.key) for p, c in ctx.board.list_occupied_points()),
+            sorted((p.to_gtp(), c.key) for p, c in ctx.prev_board.list_occupied_points()),
+            ctx.last_move, ctx.last_color, ctx.board.ko_point)
+
+
+class TestContextCache(unittest.TestCase):
+    def setUp(self):
+        self.simulator = BoardSimulator()
+        self.cache = ContextCache(self.simulator, max_entries=4)
+
+    def full(self, history):
+        with redirect_stdout(io.StringIO()):
+            return self.simulator.reconstruct_to_context(list(history), 19)
+
+    def test_incremental_matches_full_replay(self):
+        for n in range(len(HISTORY) + 1):
+            ctx = self.cache.get(HISTORY[:n], 19)
+            self.assertEqual(snapshot(ctx), snapshot(self.full(HISTORY[:n])), f"mismatch at move {n}")
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["prefix_hits"], len(HISTORY))
+        self.assertEqual(stats["moves_applied"], len(HISTORY))
+
+    def test_extension_applies_only_new_moves(self):
+        self.cache.get(HISTORY[:5], 19)
+        with redirect_stdout(io.StringIO()) as out:
+            ctx = self.cache.get(HISTORY, 19)
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(self.cache.stats()["moves_applied"], 5 + len(HISTORY) - 5)
+        self.assertEqual(snapshot(ctx), snapshot(self.full(HISTORY)))
+
+    def test_exact_hit_and_divergent_line(self):
+        first = self.cache.get(HISTORY[:6], 19)
+        self.assertIs(self.cache.get([list(m) for m in HISTORY[:6]], 19), first)
+        self.assertEqual(self.cache.stats()["exact_hits"], 1)
+
+        # 分岐した手順は共通部分の局面から復元される
+        branch = HISTORY[:4] + [["B", "K10"]]
+        self.cache.get(HISTORY[:4], 19)
+        ctx = self.cache.get(branch, 19)
+        self.assertEqual(snapshot(ctx), snapshot(self.full(branch)))
+        self.assertIs(self.cache.get(HISTORY[:6], 19), first)
+
+    def test_lru_eviction(self):
+        for n in range(1, 7):
+            self.cache.get(HISTORY[:n], 19)
+        self.assertEqual(self.cache.stats()["entries"], 4)
+        self.cache.get(HISTORY[:1], 19)
+        self.assertEqual(self.cache.stats()["exact_hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
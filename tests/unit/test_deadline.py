@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.deadline import Deadline
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining_and_timeout(self):
+        d = Deadline(10)
+        self.assertAlmostEqual(d.remaining(), 10, delta=0.1)
+        self.assertFalse(d.expired)
+        self.assertEqual(d.timeout(cap=3), 3)
+        self.assertAlmostEqual(d.timeout(reserve=4), 6, delta=0.1)
+        self.assertEqual(d.timeout(reserve=20), 0.0)
+
+    def test_expiry(self):
+        d = Deadline(0.05)
+        time.sleep(0.1)
+        self.assertTrue(d.expired)
+        self.assertEqual(d.remaining(), 0.0)
+        self.assertEqual(d.to_ms(), 0)
+
+    def test_child_ends_earlier(self):
+        parent = Deadline(10)
+        child = parent.child(4)
+        self.assertAlmostEqual(child.remaining(), 6, delta=0.1)
+        self.assertLess(child.expires_at, parent.expires_at)
+        self.assertTrue(parent.child(20).expired)
+
+    def test_ms_roundtrip(self):
+        self.assertIsNone(Deadline.from_ms(None))
+        self.assertAlmostEqual(Deadline.from_ms(Deadline(2).to_ms()).remaining(), 2, delta=0.1)
+
+    def test_bucket_separates_different_budgets(self):
+        self.assertIsNone(Deadline.bucket(None))
+        self.assertEqual(Deadline.bucket(Deadline(3.0)), Deadline.bucket(Deadline(2.5)))
+        self.assertNotEqual(Deadline.bucket(Deadline(3.0)), Deadline.bucket(Deadline(1.0)))
+
+    def test_scale_visits(self):
+        d = Deadline(1.0)
+        self.assertEqual(d.scale_visits(200), 200)
+        d.expires_at = time.monotonic() + 0.25  # 予算の 1/4 が残っている
+        self.assertAlmostEqual(d.scale_visits(200), 100, delta=5)
+        d.expires_at = time.monotonic()
+        self.assertEqual(d.scale_visits(200, min_visits=16), 16)
+        self.assertEqual(d.scale_visits(8, min_visits=16), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import stat
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import config
+from config import FAKE_KATAGO_SCRIPT
+from drivers.katago_driver import KataGoDriver
+from drivers.broker_client import BrokerEngineClient
+from engine_broker import EngineBroker
+
+HISTORY = [["B", "D4"], ["W", "Q16"], ["B", "D16"]]
+
+
+@unittest.skipIf(sys.platform == "win32", "Unix ソケットで検証する")
+class TestEngineBroker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # ドライバは katago_debug.log をカレントに書き出すため一時ディレクトリで実行する
+        cls._cwd = os.getcwd()
+        cls._tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls._tmp.name)
+        KataGoDriver._instance = None
+        cls.driver = KataGoDriver(FAKE_KATAGO_SCRIPT, "fake.cfg", "fake.bin.gz")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.driver.close()
+        KataGoDriver._instance = None
+        os.chdir(cls._cwd)
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        self.address = os.path.join(self._tmp.name, f"broker-{self._testMethodName}.sock")
+        self.broker = EngineBroker(self.driver, self.address, authkey=b"test").start()
+        self.clients = []
+
+    def tearDown(self):
+        for c in self.clients:
+            c.close()
+        self.broker.close()
+
+    def client(self):
+        c = BrokerEngineClient(self.address, authkey=b"test", timeout=10)
+        self.clients.append(c)
+        return c
+
+    def test_same_results_as_direct_driver(self):
+        res = self.client().analyze_situation(HISTORY, visits=20)
+        direct = self.driver.analyze_situation(HISTORY, visits=20)
+        self.assertNotIn("error", res)
+        self.assertEqual(res["winrate"], direct["winrate"])
+        self.assertEqual(len(res["ownership"]), 361)
+        self.assertTrue(self.client().is_alive())
+
+    def test_cache_is_shared_between_clients(self):
+        a, b = self.client(), self.client()
+        r1 = a.analyze_situation(HISTORY, visits=20)
+        r2 = b.analyze_situation(HISTORY, visits=20)
+        self.assertEqual(r1["winrate"], r2["winrate"])
+        self.assertNotIn("cached", r1)
+        self.assertTrue(r2["cached"])
+        status = b.status()
+        self.assertEqual(status["cache"]["misses"], 1)
+        self.assertEqual(status["cache"]["hits"], 1)
+        self.assertEqual(status["clients"], 2)
+
+    def test_concurrent_requests_over_one_connection(self):
+        c = self.client()
+        histories = [HISTORY[:1] + [["W", m]] for m in ("Q16", "Q4", "D16", "K10", "C3", "R17")]
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda h: c.analyze_situation(h, visits=10), histories))
+        for h, res in zip(histories, results):
+            self.assertEqual(res["winrate"], self.driver.analyze_situation(h, visits=10)["winrate"])
+
+    def test_unknown_operation_and_disconnect_return_errors(self):
+        c = self.client()
+        c.connect_timeout = 0.5
+        self.assertIn("error", c._call("nope"))
+        self.broker.close()
+        # 切断の検知が送信より先か後かで文言は変わるが、いずれもエラーとして返り、次の呼び出しは再接続を試みる
+        self.assertIn("error", c.analyze_situation(HISTORY[:2], visits=10))
+        self.assertIn("unavailable", c.analyze_situation(HISTORY[:2], visits=10)["error"])
+
+    def test_client_with_another_key_is_rejected(self):
+        c = BrokerEngineClient(self.address, authkey=b"other", timeout=5, connect_timeout=0.5)
+        self.clients.append(c)
+        self.assertIn("authentication", c.analyze_situation(HISTORY, visits=10)["error"])
+        self.assertNotIn("error", self.client().analyze_situation(HISTORY, visits=10))
+
+
+@unittest.skipIf(sys.platform == "win32", "Unix のパーミッションで検証する")
+class TestBrokerAuthKey(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patches = [mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": self.tmp.name}),
+                   mock.patch.object(config, "ENGINE_BROKER_AUTHKEY", None)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_generated_key_is_private_and_reused(self):
+        key = config.load_broker_authkey()
+        self.assertGreaterEqual(len(key), 32)
+        self.assertEqual(config.load_broker_authkey(), key)
+        runtime_dir = config.private_runtime_dir()
+        self.assertEqual(stat.S_IMODE(os.stat(runtime_dir).st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(runtime_dir, "engine-broker.key")).st_mode), 0o600)
+        self.assertEqual(os.listdir(runtime_dir), ["engine-broker.key"])
+
+    def test_shared_runtime_dir_is_refused(self):
+        os.makedirs(os.path.join(self.tmp.name, "goai"), mode=0o777)
+        os.chmod(os.path.join(self.tmp.name, "goai"), 0o777)
+        with self.assertRaises(PermissionError):
+            config.load_broker_authkey()
+
+
+if __name__ == "__main__":
+    unittest.main()
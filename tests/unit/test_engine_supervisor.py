@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from drivers.engine_supervisor import EngineSupervisor
+
+
+class _AliveDriver:
+    """プロセスが生きたままのドライバ（再起動は呼ばれない想定）"""
+    process = None
+
+    def is_alive(self):
+        return True
+
+    def spawn_process(self, log_mode="a"):
+        raise AssertionError("alive driver must not be restarted")
+
+
+class TestEngineSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = EngineSupervisor(_AliveDriver(), poll_interval=0.05)
+        self.addCleanup(self.supervisor.stop)
+
+    def test_spurious_crash_notice_keeps_engine_ready(self):
+        self.supervisor.start()
+        self.supervisor.notify_crash()  # 読み取り側の誤検知（プロセスは生きている）
+        self.assertTrue(self.supervisor.wait_until_ready(1))
+        self.assertEqual(self.supervisor.restart_count, 0)
+
+    def test_alive_engine_becomes_ready_again(self):
+        self.supervisor.start()
+        self.supervisor._ready.clear()  # 再起動と競合して受付停止のまま残った状態
+        self.assertTrue(self.supervisor.wait_until_ready(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
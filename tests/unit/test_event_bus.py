@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.event_bus import event_bus, AppEvents, merge_analysis_progress
+
+
+class TestCoalescedEvents(unittest.TestCase):
+    def setUp(self):
+        self.scheduled = []
+        self.received = []
+        event_bus.set_dispatcher(lambda delay, fn: self.scheduled.append((delay, fn)))
+        self.addCleanup(event_bus.set_dispatcher, None)
+
+    def _subscribe(self, topic):
+        event_bus.subscribe(topic, self.received.append)
+        self.addCleanup(event_bus.unsubscribe, topic, self.received.append)
+
+    def test_latest_state_is_delivered_once_per_interval(self):
+        event_bus.coalesce("TEST_LATEST", 100)
+        self._subscribe("TEST_LATEST")
+        for i in range(50):
+            event_bus.publish("TEST_LATEST", i)
+        self.assertEqual(self.received, [])
+        self.assertEqual(len(self.scheduled), 1)  # 配信予定は1回だけ
+        self.scheduled.pop()[1]()
+        self.assertEqual(self.received, [49])
+        # 配信直後の発行は間隔を空けて配信する
+        event_bus.publish("TEST_LATEST", 50)
+        self.assertGreater(self.scheduled[0][0], 0)
+
+    def test_progress_deltas_are_merged(self):
+        event_bus.coalesce("TEST_PROGRESS", 100, merge=merge_analysis_progress)
+        self._subscribe("TEST_PROGRESS")
+        published = [{"updates": {i: f"r{i}"}, "completed": i, "total": 10} for i in (3, 1, 3, 7)]
+        for data in published:
+            event_bus.publish("TEST_PROGRESS", data)
+        event_bus.flush("TEST_PROGRESS")
+        self.assertEqual(self.received, [{"updates": {3: "r3", 1: "r1", 7: "r7"}, "completed": 7, "total": 10}])
+        # 発行元が渡した辞書は書き換えない
+        self.assertEqual(published[0], {"updates": {3: "r3"}, "completed": 3, "total": 10})
+        self.scheduled.pop()[1]()  # 予定時刻には配信するものが残っていない
+        self.assertEqual(len(self.received), 1)
+
+    def test_plain_events_stay_synchronous(self):
+        self._subscribe("TEST_PLAIN")
+        event_bus.publish("TEST_PLAIN", 1)
+        event_bus.publish("TEST_PLAIN", 2)
+        self.assertEqual(self.received, [1, 2])
+        self.assertEqual(self.scheduled, [])
+
+    def test_timer_is_used_without_dispatcher(self):
+        event_bus.set_dispatcher(None)
+        delivered = threading.Event()
+        event_bus.coalesce("TEST_TIMER", 10)
+        event_bus.subscribe("TEST_TIMER", lambda data: delivered.set())
+        self.addCleanup(event_bus._subscribers.pop, "TEST_TIMER", None)
+        event_bus.publish("TEST_TIMER", "x")
+        self.assertTrue(delivered.wait(2))
+
+    def test_only_bulk_deltas_are_coalesced(self):
+        self.assertIn(AppEvents.ANALYSIS_PROGRESS, event_bus._coalesced)
+        # ステータス・進捗は発行したスレッドで、1件ずつ配信する
+        for topic in (AppEvents.PROGRESS_UPDATED, AppEvents.STATUS_MSG_UPDATED):
+            self.assertNotIn(topic, event_bus._coalesced)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from config import FAKE_KATAGO_SCRIPT
+from drivers.fake_katago import FakeAnalysis
+from drivers.katago_driver import KataGoDriver, CANCELLED
+
+
+def start_fake_driver(supervise=True, **fake_env):
+    """偽エンジンを使う新しいドライバを起動する（シングルトンをリセット）"""
+    for k, v in fake_env.items():
+        os.environ[f"FAKE_KATAGO_{k.upper()}"] = str(v)
+    try:
+        KataGoDriver._instance = None
+        return KataGoDriver(FAKE_KATAGO_SCRIPT, "fake.cfg", "fake.bin.gz", supervise=supervise)
+    finally:
+        for k in fake_env:
+            os.environ.pop(f"FAKE_KATAGO_{k.upper()}", None)
+
+
+class TestFakeAnalysis(unittest.TestCase):
+    def test_deterministic_per_position(self):
+        ana = FakeAnalysis(seed=1)
+        q = {"id": "a", "moves": [["B", "D4"], ["W", "Q16"]], "boardXSize": 19,
+             "includeOwnership": True, "includeInfluence": True, "maxVisits": 10}
+        r1 = ana.analyze(q)
+        r2 = ana.analyze(dict(q, id="b"))
+        self.assertEqual(r1["rootInfo"], r2["rootInfo"])
+        self.assertEqual(r1["ownership"], r2["ownership"])
+        self.assertEqual(len(r1["ownership"]), 361)
+        self.assertEqual(len(r1["influence"]), 361)
+        self.assertTrue(all(len(m["pv"]) >= 1 for m in r1["moveInfos"]))
+
+        other = ana.analyze(dict(q, moves=[["B", "D4"]]))
+        self.assertNotEqual(r1["ownership"], other["ownership"])
+
+    def test_side_to_move_perspective(self):
+        ana = FakeAnalysis()
+        q = {"id": "a", "moves": [["B", "K10"]], "boardXSize": 19, "includeOwnership": True}
+        res = ana.analyze(q)
+        # 白番の局面: 黒石の地点は手番側(白)視点で負になる
+        self.assertEqual(res["rootInfo"]["currentPlayer"], "W")
+        self.assertLess(res["ownership"][9 * 19 + 9], 0)
+
+
+class TestFakeEngineWithDriver(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # ドライバは katago_debug.log をカレントに書き出すため一時ディレクトリで実行する
+        cls._cwd = os.getcwd()
+        cls._tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls._tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls._cwd)
+        cls._tmp.cleanup()
+        KataGoDriver._instance = None
+
+    def tearDown(self):
+        if KataGoDriver._instance:
+            KataGoDriver._instance.close()
+
+    def test_analyze_situation_roundtrip(self):
+        driver = start_fake_driver(latency_ms=5)
+        history = [["B", "D4"], ["W", "Q16"], ["B", "D16"]]
+        r1 = driver.analyze_situation(history, visits=20)
+        r2 = driver.analyze_situation(history, visits=20)
+        self.assertNotIn("error", r1)
+        self.assertEqual(r1["winrate"], r2["winrate"])
+        self.assertEqual(len(r1["ownership"]), 361)
+        self.assertTrue(r1["top_candidates"])
+
+    def test_malformed_lines_are_skipped(self):
+        driver = start_fake_driver(malformed_rate=1.0)
+        res = driver.analyze_situation([["B", "D4"]], visits=5)
+        self.assertNotIn("error", res)
+
+    def test_injected_crash_is_reported(self):
+        driver = start_fake_driver(supervise=False, crash_after=1)
+        res = driver.query([["B", "D4"]], visits=5, priority=True)
+        self.assertIn("error", res)
+
+    def test_supervisor_restarts_and_replays(self):
+        # 環境変数は起動直後に戻されるため、再起動後のエンジンはクラッシュしない
+        driver = start_fake_driver(crash_after=2)
+        self.assertNotIn("error", driver.analyze_situation([["B", "D4"]], visits=5, priority=True))
+        res = driver.analyze_situation([["B", "D4"], ["W", "Q16"]], visits=5, priority=True)
+        self.assertNotIn("error", res)
+
+        # 再送はウォームアップより先に行われるため、準備完了は応答の後になり得る
+        self.assertTrue(driver.supervisor.wait_until_ready(10))
+        stats = driver.supervisor.stats()
+        self.assertEqual(stats["restart_count"], 1)
+        self.assertEqual(stats["replayed_queries"], 1)
+        self.assertIsNotNone(stats["last_time_to_ready"])
+        self.assertTrue(stats["ready"])
+
+    def test_concurrent_queries_are_multiplexed(self):
+        # 応答は ID で振り分けられるため、同時に投げたクエリが直列化されない
+        driver = start_fake_driver(latency_ms=200, concurrency=8)
+        histories = [[["B", "D4"]] + [["W", f"Q{n}"]] for n in range(3, 11)]
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda h: driver.query(h, visits=5), histories))
+        elapsed = time.time() - t0
+        self.assertTrue(all("error" not in r for r in results))
+        self.assertEqual(len({r["id"] for r in results}), len(histories))
+        self.assertLess(elapsed, 1.2)
+
+
+    def test_max_time_bounds_search(self):
+        # 500 visits × 10ms の探索でも maxTime で打ち切られる
+        driver = start_fake_driver(ms_per_visit=10)
+        t0 = time.time()
+        res = driver.query([["B", "D4"]], visits=500, max_time=0.2)
+        self.assertNotIn("error", res)
+        self.assertLess(time.time() - t0, 1.5)
+        self.assertEqual(driver._build_query([], 19, 5, False, False, max_time=0.2)["overrideSettings"], {"maxTime": 0.2})
+
+    def test_cancel_by_tag_terminates_engine_queries(self):
+        # 5秒かかる探索でも、cancel(tag) で待機側は即座に戻り、他の tag のクエリは影響を受けない
+        driver = start_fake_driver(ms_per_visit=10, concurrency=8)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            tagged = [pool.submit(driver.query, [["B", "D4"], ["W", f"Q{n}"]], visits=500, tag="run-1")
+                      for n in (3, 4)]
+            other = pool.submit(driver.query, [["B", "C3"]], visits=20)
+            time.sleep(0.3)
+            t0 = time.time()
+            self.assertEqual(driver.cancel("run-1"), 2)
+            results = [f.result() for f in tagged]
+            self.assertLess(time.time() - t0, 1.0)
+            self.assertNotIn("error", other.result())
+        self.assertEqual(results, [{"error": CANCELLED}] * 2)
+        self.assertEqual(driver.cancel("run-1"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
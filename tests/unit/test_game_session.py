@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.board_simulator import BoardSimulator
+from core.game_board import Color
+from core.game_session import GameSession, SessionStore, StalePositionError
+from core.zobrist import get_zobrist_table
+
+# 黒が白1子を打ち上げ、その後コウが生じる手順
+CAPTURE_LINE = [["B", "D4"], ["W", "E4"], ["B", "E5"], ["W", "F5"], ["B", "F4"],
+                ["W", "G4"], ["B", "E3"], ["W", "F3"], ["B", "Q16"], ["W", "D5"], ["B", "pass"], ["W", "E6"]]
+
+
+def full_key(history, board_size=19):
+    ctx = BoardSimulator(board_size).reconstruct_to_context(history, board_size)
+    next_color = Color.from_str(history[-1][0]).opposite() if history else Color.BLACK
+    return get_zobrist_table(board_size).board_key(ctx.board, next_color)
+
+
+class TestGameSession(unittest.TestCase):
+    def test_incremental_key_matches_full_recompute(self):
+        session = GameSession("s1")
+        session.set_line(CAPTURE_LINE)
+        for n in range(len(CAPTURE_LINE) + 1):
+            self.assertEqual(session.key_at(n), full_key(CAPTURE_LINE[:n]), f"mismatch at move {n}")
+
+    def test_transposition_has_same_key(self):
+        a = GameSession("a")
+        a.push([["B", "D4"], ["W", "Q16"], ["B", "D16"]])
+        b = GameSession("b")
+        b.push([["B", "D16"], ["W", "Q16"], ["B", "D4"]])
+        self.assertEqual(a.key_at(), b.key_at())
+        self.assertNotEqual(a.key_at(2), b.key_at(2))
+
+    def test_pop_and_jump_reuse_built_contexts(self):
+        session = GameSession("s")
+        session.set_line(CAPTURE_LINE)
+        ctx_5 = session.context_at(5)
+        session.pop(4)
+        self.assertEqual(session.current, len(CAPTURE_LINE) - 4)
+        session.jump(5)
+        self.assertIs(session.context_at(), ctx_5)
+        self.assertEqual(session.context_at().history, CAPTURE_LINE[:5])
+
+    def test_push_discards_forward_line(self):
+        session = GameSession("s")
+        session.set_line(CAPTURE_LINE, move_index=3)
+        session.push([["W", "K10"]])
+        self.assertEqual(session.history_up_to(), CAPTURE_LINE[:3] + [["W", "K10"]])
+        self.assertEqual(session.key_at(), full_key(CAPTURE_LINE[:3] + [["W", "K10"]]))
+
+    def test_set_line_keeps_common_prefix(self):
+        session = GameSession("s")
+        session.set_line(CAPTURE_LINE)
+        ctx_4 = session.context_at(4)
+        session.set_line(CAPTURE_LINE[:6] + [["B", "K10"]])
+        self.assertIs(session.context_at(4), ctx_4)
+        self.assertEqual(len(session.line), 7)
+
+
+class TestSessionStore(unittest.TestCase):
+    def test_position_id_detects_stale_line(self):
+        store = SessionStore()
+        session = store.create("s", 19)
+        session.set_line(CAPTURE_LINE)
+        pid = session.position_id(6)
+        self.assertEqual(store.resolve_position(pid), (session, 6))
+
+        session.set_line(CAPTURE_LINE[:5] + [["W", "K10"]] + CAPTURE_LINE[6:])
+        with self.assertRaises(StalePositionError):
+            store.resolve_position(pid)
+        with self.assertRaises(KeyError):
+            store.resolve_position("missing:0:0")
+
+    def test_lru_eviction(self):
+        store = SessionStore(max_sessions=2)
+        store.create("a"); store.create("b")
+        store.get("a")
+        store.create("c")
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNone(store.get("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
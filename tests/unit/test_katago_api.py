@@ -0,0 +1,282 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import config
+from core.analysis_dto import AnalysisResult
+from core.board_map import msgpack, MSGPACK_MEDIA_TYPE
+
+# 本物の KataGo の代わりに偽エンジンで API サーバーを起動する
+config.KATAGO_EXE = config.FAKE_KATAGO_SCRIPT
+_TMP = tempfile.TemporaryDirectory()
+_CWD = os.getcwd()
+os.chdir(_TMP.name)  # katago_debug.log の出力先
+try:
+    from drivers.katago_driver import KataGoDriver
+    KataGoDriver._instance = None
+    import katago_api
+finally:
+    os.chdir(_CWD)
+
+HISTORY = [["B", "D4"], ["W", "Q16"], ["B", "D16"], ["W", "Q4"]]
+
+
+class TestAnalyzeEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # 同時リクエストを同じイベントループで処理させるため、コンテキスト内で使う
+        cls.client = TestClient(katago_api.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_list_encoding_is_default(self):
+        resp = self.client.post("/analyze", json={"history": HISTORY, "visits": 5, "include_pv_shapes": False})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertIsInstance(data["ownership"], list)
+        self.assertEqual(len(data["ownership"]), 361)
+
+    def test_f16b64_encoding_roundtrip(self):
+        base = {"history": HISTORY, "visits": 5, "include_pv_shapes": False}
+        as_list = self.client.post("/analyze", json=base).json()
+        packed = self.client.post("/analyze", json=dict(base, map_encoding="f16b64")).json()
+        self.assertEqual(packed["ownership"]["dtype"], "float16")
+
+        res = AnalysisResult.from_dict(packed)
+        self.assertEqual(res.ownership.dtype, np.float32)
+        np.testing.assert_allclose(res.ownership, np.asarray(as_list["ownership"]), atol=1e-3)
+        self.assertEqual(len(res.to_dict()["influence"]), 361)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_negotiation(self):
+        resp = self.client.post("/analyze", json={"history": HISTORY, "visits": 5, "include_pv_shapes": False},
+                                headers={"Accept": MSGPACK_MEDIA_TYPE})
+        self.assertTrue(resp.headers["content-type"].startswith(MSGPACK_MEDIA_TYPE))
+        res = AnalysisResult.from_dict(msgpack.unpackb(resp.content, raw=False))
+        self.assertEqual(res.ownership.shape, (361,))
+
+
+    def test_pv_shape_analysis_is_attached(self):
+        resp = self.client.post("/analyze", json={"history": HISTORY, "visits": 5})
+        self.assertEqual(resp.status_code, 200)
+        cands = resp.json()["top_candidates"]
+        self.assertTrue(cands)
+        self.assertTrue(all(isinstance(c["future_shape_analysis"], str) for c in cands))
+
+    def test_health_responds_during_analysis(self):
+        # 解析中もイベントループが塞がれず /health が即座に応答すること
+        original = katago_api.katago.analyze_situation
+        def slow_analyze(*args, **kwargs):
+            time.sleep(1.0)
+            return original(*args, **kwargs)
+        katago_api.katago.analyze_situation = slow_analyze
+        try:
+            worker = threading.Thread(target=self.client.post, args=("/analyze",),
+                                      kwargs={"json": {"history": HISTORY, "visits": 5, "include_pv_shapes": False}})
+            worker.start()
+            time.sleep(0.2)
+            t0 = time.time()
+            self.assertEqual(self.client.get("/health").status_code, 200)
+            self.assertLess(time.time() - t0, 0.5)
+            worker.join()
+        finally:
+            del katago_api.katago.analyze_situation
+
+    def test_identical_concurrent_requests_are_coalesced(self):
+        original = katago_api.katago.analyze_situation
+        calls = []
+        def slow_analyze(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.5)
+            return original(*args, **kwargs)
+        katago_api.katago.analyze_situation = slow_analyze
+        before = katago_api.analysis_flight.stats()["absorbed"]
+        body = {"history": HISTORY + [["B", "C3"]], "visits": 7, "include_pv_shapes": False}
+        sources = []
+        try:
+            workers = [threading.Thread(target=lambda: sources.append(
+                self.client.post("/analyze", json=body).headers["X-Analysis-Source"])) for _ in range(3)]
+            for w in workers: w.start()
+            for w in workers: w.join()
+        finally:
+            del katago_api.katago.analyze_situation
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(katago_api.analysis_flight.stats()["absorbed"] - before, 2)
+        # 相乗りした応答は、応答時間がエンジンの負荷を表さないことを示す
+        self.assertEqual(sorted(sources), ["engine", "shared", "shared"])
+
+    def test_deadline_requests_are_not_coalesced_with_unbounded_ones(self):
+        original = katago_api.katago.analyze_situation
+        seen = []
+        def slow_analyze(*args, **kwargs):
+            seen.append(kwargs.get("max_time"))
+            time.sleep(0.5)
+            return original(*args, **kwargs)
+        katago_api.katago.analyze_situation = slow_analyze
+        body = {"history": HISTORY + [["B", "C4"]], "visits": 7, "include_pv_shapes": False}
+        try:
+            workers = [threading.Thread(target=self.client.post, args=("/analyze",), kwargs={"json": b})
+                       for b in (body, dict(body, deadline_ms=5000))]
+            for w in workers: w.start()
+            for w in workers: w.join()
+        finally:
+            del katago_api.katago.analyze_situation
+        # 締め切りの無い呼び出し元は探索時間を制限された結果を受け取らない
+        self.assertEqual(len(seen), 2)
+        self.assertIn(None, seen)
+
+    def test_deadline_limits_engine_and_skips_pv_shapes(self):
+        original = katago_api.katago.analyze_situation
+        seen = []
+        def slow_analyze(*args, **kwargs):
+            seen.append(kwargs.get("max_time"))
+            time.sleep(0.7)
+            return original(*args, **kwargs)
+        katago_api.katago.analyze_situation = slow_analyze
+        try:
+            resp = self.client.post("/analyze", json={"history": HISTORY + [["B", "R10"]], "visits": 5, "deadline_ms": 1100})
+            expired = self.client.post("/analyze", json={"history": HISTORY + [["B", "R11"]], "visits": 5, "deadline_ms": 0})
+        finally:
+            del katago_api.katago.analyze_situation
+        self.assertEqual(resp.status_code, 200)
+        # 探索時間は残り時間から応答用の猶予を除いた分に制限され、間に合わない PV形状解析は省かれる
+        self.assertLessEqual(seen[0], 1.1 - katago_api.ENGINE_RESPONSE_RESERVE)
+        self.assertTrue(all("省略" in c["future_shape_analysis"] for c in resp.json()["top_candidates"]))
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(expired.status_code, 504)
+
+    def test_cancelled_tag_is_not_sent_to_engine(self):
+        resp = self.client.post("/cancel", json={"tag": "run-x"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"tag": "run-x", "terminated": 0})
+        original = katago_api.katago.analyze_situation
+        calls = []
+        katago_api.katago.analyze_situation = lambda *a, **kw: calls.append(kw) or original(*a, **kw)
+        try:
+            cancelled = self.client.post("/analyze", json={"history": HISTORY + [["B", "S2"]], "visits": 5,
+                                                           "cancel_tag": "run-x"})
+            other = self.client.post("/analyze", json={"history": HISTORY + [["B", "S2"]], "visits": 5,
+                                                       "cancel_tag": "run-y", "include_pv_shapes": False})
+        finally:
+            del katago_api.katago.analyze_situation
+        self.assertEqual(cancelled.status_code, 499)
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual([kw["tag"] for kw in calls], ["run-y"])
+
+    def test_metrics_endpoint(self):
+        self.client.post("/analyze", json={"history": HISTORY, "visits": 5})
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("text/plain"))
+        text = resp.text
+        for name in ("katago_engine_query_seconds_count", "katago_driver_queue_wait_seconds_count",
+                     "katago_engine_visits_per_second_count", "api_pv_shape_seconds_count",
+                     'api_response_bytes_count{endpoint="/analyze"}', 'api_analysis_coalescing{kind="absorbed"}'):
+            self.assertIn(name, text)
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(katago_api.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_results_follow_request_order_and_dedup(self):
+        a = HISTORY
+        b = HISTORY + [["B", "K10"]]
+        a_variant = [[c.lower(), m.lower()] for c, m in HISTORY]  # 表記揺れは同一局面として扱う
+        resp = self.client.post("/analyze/batch", json={
+            "histories": [a, b, a_variant], "visits": 5, "include_pv_shapes": False
+        })
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["unique_positions"], 2)
+        results = data["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], results[2])
+        self.assertNotEqual(results[0]["winrate_black"], results[1]["winrate_black"])
+
+        single = self.client.post("/analyze", json={"history": b, "visits": 5, "include_pv_shapes": False}).json()
+        self.assertEqual(single["winrate_black"], results[1]["winrate_black"])
+
+    def test_f16b64_maps_in_batch(self):
+        resp = self.client.post("/analyze/batch", json={
+            "histories": [HISTORY], "visits": 5, "include_pv_shapes": False, "map_encoding": "f16b64"
+        })
+        res = AnalysisResult.from_dict(resp.json()["results"][0])
+        self.assertEqual(res.ownership.shape, (361,))
+
+
+class TestSessionEndpoints(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(katago_api.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_navigation_by_deltas(self):
+        state = self.client.post("/sessions", json={"session_id": "nav", "history": HISTORY, "move_index": 2}).json()
+        self.assertEqual((state["current_move_index"], state["total_moves"]), (2, 4))
+
+        state = self.client.post("/sessions/nav/jump", json={"move_index": 4}).json()
+        self.assertEqual(state["current_move_index"], 4)
+        state = self.client.post("/sessions/nav/pop", json={"count": 1}).json()
+        self.assertEqual(state["current_move_index"], 3)
+        state = self.client.post("/sessions/nav/push", json={"moves": [["W", "K10"]]}).json()
+        self.assertEqual((state["current_move_index"], state["total_moves"]), (4, 4))
+
+        # MCP 向けの /game/state は最後に更新されたセッションの局面を返す
+        game_state = self.client.get("/game/state").json()
+        self.assertEqual(game_state["history"], HISTORY[:3] + [["W", "K10"]])
+        self.assertEqual(self.client.post("/sessions/nav/jump", json={"move_index": 9}).status_code, 400)
+
+    def test_position_id_replaces_history(self):
+        state = self.client.post("/sessions", json={"session_id": "pid", "history": HISTORY}).json()
+        pid = state["position_id"]
+
+        by_id = self.client.post("/detect", json={"position_id": pid}).json()
+        by_history = self.client.post("/detect", json={"history": HISTORY}).json()
+        self.assertEqual(by_id, by_history)
+
+        analysis = self.client.post("/analyze", json={"position_id": pid, "visits": 5, "include_pv_shapes": False}).json()
+        direct = self.client.post("/analyze", json={"history": HISTORY, "visits": 5, "include_pv_shapes": False}).json()
+        self.assertEqual(analysis["winrate_black"], direct["winrate_black"])
+
+        # 手順が書き換わると古い局面IDは 409 になる
+        self.client.post("/sessions", json={"session_id": "pid", "history": HISTORY[:3] + [["W", "C3"]]})
+        self.assertEqual(self.client.post("/detect/ids", json={"position_id": pid}).status_code, 409)
+        self.assertEqual(self.client.post("/detect", json={"position_id": "nope:0:0"}).status_code, 404)
+
+    def test_detect_extends_cached_prefix(self):
+        line = HISTORY + [["B", "K10"], ["W", "C3"]]
+        self.client.post("/detect", json={"history": line[:5]})
+        before = katago_api.context_cache.stats()
+        self.assertEqual(self.client.post("/detect/ids", json={"history": line}).status_code, 200)
+        after = katago_api.context_cache.stats()
+        self.assertEqual(after["prefix_hits"] - before["prefix_hits"], 1)
+        self.assertEqual(after["moves_applied"] - before["moves_applied"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
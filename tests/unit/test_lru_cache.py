@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+from PIL import Image
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from utils.lru_cache import SizedLRUCache, estimate_size
+
+
+class TestSizedLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used_to_stay_within_byte_budget(self):
+        evicted = []
+        cache = SizedLRUCache("test_budget", max_bytes=300, sizeof=lambda v: v,
+                              on_evict=lambda k, v: evicted.append(k))
+        cache["a"] = 100
+        cache["b"] = 100
+        cache["c"] = 100
+        self.assertEqual(cache.get("a"), 100)  # a を最近使ったことにする
+        cache["d"] = 100
+        self.assertEqual(evicted, ["b"])
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.bytes, 300)
+
+        cache["e"] = 250  # 大きな値は複数件を追い出す
+        self.assertEqual(evicted, ["b", "c", "a", "d"])
+        self.assertEqual(len(cache), 1)
+
+    def test_oversized_value_is_kept_alone(self):
+        cache = SizedLRUCache("test_oversize", max_bytes=10, sizeof=lambda v: v)
+        cache["x"] = 5
+        cache["big"] = 50
+        self.assertEqual(list(cache._entries), ["big"])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_replacing_a_key_reaccounts_its_size(self):
+        cache = SizedLRUCache("test_replace", max_bytes=100, sizeof=lambda v: v)
+        cache["a"] = 60
+        cache["a"] = 30
+        self.assertEqual(cache.bytes, 30)
+        self.assertEqual(cache.pop("a"), 30)
+        self.assertEqual(cache.bytes, 0)
+
+    def test_hit_rate_and_entry_limit(self):
+        cache = SizedLRUCache("test_stats", max_bytes=10 ** 9, max_entries=2)
+        for i in range(3):
+            cache[i] = str(i)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(2), "2")
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_clear_calls_on_evict(self):
+        closed = []
+        cache = SizedLRUCache("test_clear", max_bytes=10 ** 9, on_evict=lambda k, v: closed.append(k))
+        cache[1] = "x"
+        cache.clear()
+        self.assertEqual(closed, [1])
+        self.assertEqual((len(cache), cache.bytes), (0, 0))
+
+
+class TestEstimateSize(unittest.TestCase):
+    def test_counts_board_maps_and_images(self):
+        own = np.zeros(361, dtype=np.float32)
+        r = AnalysisResult(winrate=0.5, score_lead=0.0, ownership=own, influence=own,
+                           candidates=[MoveCandidate("D4", 0.5, 0.0, pv=["D4", "Q16"])])
+        self.assertGreaterEqual(estimate_size(r), 2 * own.nbytes)
+        self.assertGreater(estimate_size(r), estimate_size(AnalysisResult(winrate=0.5, score_lead=0.0)))
+        self.assertGreaterEqual(estimate_size(Image.new("RGB", (100, 50))), 100 * 50 * 3)
+        self.assertEqual(estimate_size(own), own.nbytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        c = self.registry.counter("requests_total", "Requests")
+        c.inc(endpoint="analyze")
+        c.inc(2, endpoint="analyze")
+        c.inc(endpoint="detect")
+        self.assertEqual(c.value(endpoint="analyze"), 3)
+        text = self.registry.render()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{endpoint="analyze"} 3', text)
+        self.assertIn('requests_total{endpoint="detect"} 1', text)
+
+    def test_same_name_returns_same_metric(self):
+        self.assertIs(self.registry.counter("x"), self.registry.counter("x"))
+        with self.assertRaises(ValueError):
+            self.registry.gauge("x")
+
+    def test_histogram_buckets_are_cumulative(self):
+        h = self.registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 0.7, 3.0):
+            h.observe(v)
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("latency_seconds_count 4", text)
+        self.assertAlmostEqual(h.total(), 4.25)
+
+    def test_gauge_function_is_read_at_render_time(self):
+        state = {"v": 1}
+        g = self.registry.gauge("circuit_state")
+        g.set_function(lambda: state["v"])
+        state["v"] = 2
+        self.assertIn("circuit_state 2", self.registry.render())
+        self.assertEqual(g.value(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
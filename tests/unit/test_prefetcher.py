@@ -0,0 +1,198 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+import services.prefetcher as prefetcher_module
+from services.prefetcher import AnalysisPrefetcher, prefetch_targets
+from services.api_client import PREFETCH
+from services.analysis_service import AnalysisService
+
+LINE = [["B", "D4"], ["W", "Q16"], ["B", "D16"], ["W", "Q4"], ["B", "C3"], ["W", "R17"]]
+
+
+def result(history):
+    return AnalysisResult(winrate=0.5, score_lead=0.0, candidates=[MoveCandidate("K10", 0.5, 0.0),
+                                                                   MoveCandidate("C17", 0.5, 0.0)])
+
+
+def wait_until(cond, timeout=3.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class _InlineTasks:
+    """AsyncTaskManager の代わりに呼び出し元のスレッドで実行する"""
+
+    def run_task(self, task_func, on_success=None, on_error=None, pre_task=None):
+        res = task_func()
+        if on_success:
+            on_success(res)
+
+
+class TestPrefetchTargets(unittest.TestCase):
+    def test_order_and_replies(self):
+        targets = prefetch_targets(LINE, 2, radius=3, replies=["K10"])
+        self.assertEqual(targets[0], LINE[:2] + [["B", "K10"]])
+        self.assertEqual([len(t) for t in targets[1:]], [3, 1, 4, 0, 5])
+        self.assertEqual(prefetch_targets(LINE, 1, radius=1, replies=["pass"])[0], [["B", "D4"], ["W", "pass"]])
+
+
+class TestAnalysisPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.cache = {}
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.cancelled = []
+
+        def fake_analyze(history, board_size, **kwargs):
+            self.calls.append((len(history), kwargs["request_class"], kwargs["cancel_tag"]))
+            self.release.wait(3)
+            return None if kwargs["cancel_tag"] in self.cancelled else result(history)
+
+        self.sent = True
+        patches = [mock.patch.object(prefetcher_module.api_client, "analyze_move", side_effect=fake_analyze),
+                   mock.patch.object(prefetcher_module.api_client, "cancel", side_effect=self.cancelled.append),
+                   mock.patch.object(prefetcher_module.api_client, "sent", side_effect=lambda tag: self.sent)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.busy = False
+        self.prefetcher = AnalysisPrefetcher(key=lambda h: str(len(h)) + repr(h[-1:]), is_cached=self.cache.__contains__,
+                                             on_result=lambda k, h, r: self.cache.__setitem__(k, r),
+                                             is_busy=lambda: self.busy, workers=2)
+        self.addCleanup(self.prefetcher.close)
+
+    def test_neighbours_are_analyzed_at_prefetch_priority(self):
+        self.prefetcher.schedule(LINE, 3, 19)
+        self.assertTrue(wait_until(lambda: len(self.cache) == 6))  # 0〜6手目のうち現在の3手目以外
+        self.assertEqual({c[1] for c in self.calls}, {PREFETCH})
+        # 解析済みの局面は再び先読みしない
+        self.prefetcher.schedule(LINE, 4, 19)
+        time.sleep(0.1)
+        self.assertEqual(len(self.calls), 6 + 1)  # 新たに対象になった4手目のみ
+
+    def test_reschedule_cancels_only_stale_work(self):
+        self.release.clear()
+        self.prefetcher.schedule(LINE, 0, 19)  # 1手目・2手目が実行中になる
+        self.assertTrue(wait_until(lambda: len(self.calls) == 2))
+        in_flight = {c[0]: c[2] for c in self.calls}
+        self.prefetcher.schedule(LINE, 5, 19)  # 2手目は新しい予定にも含まれる
+        self.assertEqual(self.cancelled, [in_flight[1]])
+        self.release.set()
+        self.assertTrue(wait_until(lambda: self.prefetcher.stats() == {"pending": 0, "in_flight": 0}))
+        self.assertTrue(any(k.startswith("2") for k in self.cache))
+        self.assertFalse(any(k.startswith("1") for k in self.cache))
+
+    def test_nothing_is_sent_while_busy(self):
+        self.busy = True
+        self.prefetcher.schedule(LINE, 3, 19)
+        self.assertTrue(wait_until(lambda: self.prefetcher.stats()["pending"] == 0))
+        time.sleep(0.05)
+        self.assertEqual(self.calls, [])
+
+    def test_only_sent_prefetch_can_be_joined(self):
+        self.release.clear()
+        self.prefetcher.schedule(LINE, 0, 19)
+        self.assertTrue(wait_until(lambda: len(self.calls) == 2))
+        key = "1" + repr(LINE[:1][-1:])
+        self.sent = False  # 枠待ちの先読みは待たない
+        self.assertIsNone(self.prefetcher.join(key))
+        self.sent = True
+        future = self.prefetcher.join(key)
+        self.release.set()
+        self.assertIsNotNone(future.result(3))
+
+    def test_drop_cancels_in_flight_and_queued_work(self):
+        self.release.clear()
+        self.prefetcher.schedule(LINE, 0, 19)
+        self.assertTrue(wait_until(lambda: len(self.calls) == 2))
+        tag = {c[0]: c[2] for c in self.calls}[1]
+        self.prefetcher.drop("1" + repr(LINE[:1][-1:]))
+        self.prefetcher.drop("3" + repr(LINE[:3][-1:]))  # まだ予定表にある局面
+        self.assertEqual(self.cancelled, [tag])
+        self.release.set()
+        self.assertTrue(wait_until(lambda: self.prefetcher.stats() == {"pending": 0, "in_flight": 0}))
+        self.assertNotIn(3, [c[0] for c in self.calls])
+
+
+class TestServicePrefetch(unittest.TestCase):
+    def test_next_move_is_served_from_prefetch(self):
+        calls = []
+
+        def fake_analyze(history, board_size, **kwargs):
+            calls.append((len(history), kwargs.get("request_class")))
+            return result(history)
+
+        service = AnalysisService(_InlineTasks())
+        with mock.patch("services.analysis_service.api_client.analyze_move", side_effect=fake_analyze), \
+                mock.patch.object(prefetcher_module.api_client, "analyze_move", side_effect=fake_analyze), \
+                mock.patch("services.analysis_service.event_bus.publish"):
+            service.request_analysis(LINE[:2], 19, line=LINE, prefetch_replies=True)
+            self.assertTrue(wait_until(lambda: service._prefetcher.stats() == {"pending": 0, "in_flight": 0}
+                                       and len(calls) >= 1 + 2 + 5))
+            before = len(calls)
+            service.request_analysis(LINE[:3], 19)
+            service.request_analysis(LINE[:2] + [["B", "C17"]], 19)
+        self.assertEqual(len(calls), before)  # 次の手・候補手への応手は先読み済み
+        self.assertEqual(calls[0], (2, None))
+        service.cancel_prefetch()
+        service._prefetcher.close()
+
+    def _run_with_blocked_prefetch(self, sent: bool):
+        """次の手の先読みが結果を返さない間に、その局面を画面操作として要求する"""
+        release = threading.Event()
+        calls, cancelled = [], []
+
+        def fake_analyze(history, board_size, **kwargs):
+            calls.append((len(history), kwargs.get("request_class")))
+            if kwargs.get("request_class") == PREFETCH:
+                release.wait(3)
+                if kwargs["cancel_tag"] in cancelled:
+                    return None
+            return result(history)
+
+        service = AnalysisService(_InlineTasks())
+        self.addCleanup(lambda: service._prefetcher and service._prefetcher.close())
+        with mock.patch.object(prefetcher_module.api_client, "analyze_move", side_effect=fake_analyze), \
+                mock.patch.object(prefetcher_module.api_client, "cancel", side_effect=cancelled.append), \
+                mock.patch.object(prefetcher_module.api_client, "sent", return_value=sent), \
+                mock.patch("services.analysis_service.PREFETCH_JOIN_TIMEOUT", 0.2), \
+                mock.patch("services.analysis_service.event_bus.publish"):
+            service.request_analysis(LINE[:2], 19, line=LINE)
+            self.assertTrue(wait_until(lambda: (3, PREFETCH) in calls))
+            start = time.time()
+            service.request_analysis(LINE[:3], 19)
+            elapsed = time.time() - start
+            release.set()
+        return calls, cancelled, elapsed
+
+    def test_unsent_prefetch_is_replaced_by_interactive_request(self):
+        calls, cancelled, elapsed = self._run_with_blocked_prefetch(sent=False)
+        self.assertIn((3, None), calls)
+        self.assertEqual(len(cancelled), 1)
+        self.assertLess(elapsed, 0.2)  # 先読みの結果を待たない
+
+    def test_stalled_sent_prefetch_is_waited_for_briefly(self):
+        calls, cancelled, elapsed = self._run_with_blocked_prefetch(sent=True)
+        self.assertIn((3, None), calls)
+        self.assertEqual(len(cancelled), 1)
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
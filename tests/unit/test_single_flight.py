@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow(x):
+            calls.append(x)
+            started.set()
+            time.sleep(0.2)
+            return x * 2
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            first = pool.submit(flight.do, "k", slow, 21)
+            started.wait(1)
+            rest = [pool.submit(flight.do, "k", slow, 21) for _ in range(4)]
+            results = [first.result()] + [f.result() for f in rest]
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {"executed": 1, "absorbed": 4, "in_flight": 0})
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        flight.do("k", lambda: 1)
+        flight.do("k", lambda: 1)
+        self.assertEqual(flight.stats()["executed"], 2)
+
+    def test_exception_is_shared_and_key_released(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(flight.do("k", lambda: "ok"), "ok")
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_coroutines_share_one_task(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow(x):
+            calls.append(x)
+            await asyncio.sleep(0.05)
+            return {"value": x}
+
+        async def main():
+            return await asyncio.gather(*[flight.do(("pos", 1), slow, 1) for _ in range(3)],
+                                        flight.do(("pos", 2), slow, 2))
+
+        results = asyncio.run(main())
+        self.assertEqual([r["value"] for r in results], [1, 1, 1, 2])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.stats(), {"executed": 2, "absorbed": 2, "in_flight": 0})
+
+    def test_cancelled_waiter_does_not_cancel_shared_task(self):
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            waiter = asyncio.ensure_future(flight.do("k", slow))
+            other = asyncio.ensure_future(flight.do("k", slow))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await other
+
+        self.assertEqual(asyncio.run(main()), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
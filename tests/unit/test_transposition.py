@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# プロジェクトのルートをパスに追加
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.analysis_dto import AnalysisResult, MoveCandidate
+from core.transposition import (SYMMETRIES, TranspositionTable, board_after, canonical_key, transform_map,
+                                transform_move)
+
+# 左下の星から打ち始めた対局と、それを左右反転・90度回転した対局
+GAME = [["B", "D4"], ["W", "Q16"], ["B", "C16"], ["W", "R4"]]
+MIRRORED = [["B", "Q4"], ["W", "D16"], ["B", "R16"], ["W", "C4"]]
+ROTATED = [["B", "D16"], ["W", "Q4"], ["B", "Q17"], ["W", "D3"]]
+
+
+def kata_index(move, n=19):
+    """GTP 座標に対応するマップの添字（上の行から並ぶ）"""
+    col = "ABCDEFGHJKLMNOPQRST".index(move[0])
+    row = int(move[1:]) - 1
+    return (n - 1 - row) * n + col
+
+
+def key(history, n=19):
+    return canonical_key(*board_after(history, n))[0]
+
+
+class TestSymmetry(unittest.TestCase):
+    def test_move_round_trip(self):
+        for sym in range(len(SYMMETRIES)):
+            for move in ("D4", "Q16", "K10", "A19", "T1"):
+                self.assertEqual(transform_move(transform_move(move, sym, 19), sym, 19, inverse=True), move)
+            self.assertEqual(transform_move("pass", sym, 19), "pass")
+        self.assertEqual(len({transform_move("C4", sym, 19) for sym in range(8)}), 8)
+
+    def test_map_follows_moves(self):
+        for sym in range(len(SYMMETRIES)):
+            own = np.zeros(361, dtype=np.float32)
+            own[kata_index("C4")] = 1.0
+            moved = transform_map(own, sym, 19)
+            self.assertEqual(int(np.argmax(moved)), kata_index(transform_move("C4", sym, 19)))
+            np.testing.assert_array_equal(transform_map(moved, sym, 19, inverse=True), own)
+
+    def test_canonical_key_ignores_orientation(self):
+        self.assertEqual(key(GAME), key(MIRRORED))
+        self.assertEqual(key(GAME), key(ROTATED))
+        self.assertNotEqual(key(GAME), key(GAME[:3]))
+        self.assertNotEqual(key(GAME), key(GAME[:3] + [["W", "R5"]]))
+        # 同じ石の配置でも手番が違えば別の局面
+        self.assertNotEqual(key(GAME[:2]), key([["B", "D4"], ["B", "Q16"]]))
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_result_is_transformed_to_the_querying_orientation(self):
+        table = TranspositionTable(max_bytes=10 ** 7)
+        own = np.zeros(361, dtype=np.float32)
+        own[kata_index("D4")] = 1.0
+        table.put(table.key_for(GAME, 19, 150), 19, AnalysisResult(
+            winrate=0.55, score_lead=1.5, ownership=own,
+            candidates=[MoveCandidate("C3", 0.55, 1.5, pv=["C3", "D3", "pass"])]))
+
+        shared = table.get(table.key_for(MIRRORED, 19, 150), 19, "bulk")
+        self.assertAlmostEqual(shared.winrate, 0.55)
+        self.assertEqual(shared.candidates[0].move, "R3")
+        self.assertEqual(shared.candidates[0].pv, ["R3", "Q3", "pass"])
+        self.assertEqual(int(np.argmax(shared.ownership)), kata_index("Q4"))
+        self.assertIsNone(table.get(table.key_for(MIRRORED, 19, 300), 19, "bulk"))  # 探索数が違う
+        self.assertAlmostEqual(table.hit_rate("bulk"), 0.5)
+        self.assertEqual(table.stats()["transformed_hits"], 1)
+
+    def test_late_positions_are_not_shared(self):
+        table = TranspositionTable(max_bytes=10 ** 7, max_moves=3)
+        self.assertIsNone(table.key_for(GAME, 19))
+        self.assertIsNone(table.get(None, 19))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,7 @@ from core.board_simulator import SimulationContext
 from core.analysis_dto import AnalysisResult, MoveCandidate
 from services.providers.strategy import StrategicFactProvider
 from core.stability_analyzer import StabilityAnalyzer
+from services.analysis_memo import AnalysisMemo
 from core.analysis_config import AnalysisConfig
 from utils.logger import logger
 
@@ -59,7 +60,7 @@ async def run_verification():
     )
     
     collector = FactCollector()
-    await provider.provide_facts(collector, ctx, analysis)
+    await provider.provide_facts(collector, ctx, analysis, AnalysisMemo(ctx.history, 19, ctx, analysis, analyzer, prev_analysis=analysis))
     
     atsumi_facts = [f for f in collector.facts if "厚み" in f.description]
     print(f"Facts found (Default): {len(atsumi_facts)}")
@@ -88,7 +89,7 @@ async def run_verification():
         print(f"Debug Group: {grp.stones}, Status: {grp.status}, Stability: {grp.stability}")
     
     collector2 = FactCollector()
-    await provider.provide_facts(collector2, ctx, analysis)
+    await provider.provide_facts(collector2, ctx, analysis, AnalysisMemo(ctx.history, 19, ctx, analysis, analyzer, prev_analysis=analysis))
     
     atsumi_facts2 = [f for f in collector2.facts if "厚み" in f.description]
     print(f"Facts found (Lowered): {len(atsumi_facts2)}")
@@ -13,6 +13,7 @@ from core.analysis_dto import AnalysisResult, MoveCandidate
 from core.stability_analyzer import StabilityAnalyzer
 from core.analysis_config import AnalysisConfig
 from services.providers.strategy import StrategicFactProvider
+from services.analysis_memo import AnalysisMemo
 
 async def main():
     print("=== Starting Scrap Stone Logic v2 Verification ===")
@@ -76,7 +77,9 @@ async def main():
     )
     
     collector = FactCollector()
-    await provider.provide_facts(collector, context, analysis)
+    # 着手 C3 の1手前の解析結果としてメモに渡す
+    memo = AnalysisMemo([["B", "C3"]], 19, context, analysis, analyzer, prev_analysis=prev_analysis)
+    await provider.provide_facts(collector, context, analysis, memo)
     
     print(f"Facts found (Test 1): {len(collector.facts)}")
     for f in collector.facts:
@@ -100,7 +103,8 @@ async def main():
     )
     
     collector_low = FactCollector()
-    await provider.provide_facts(collector_low, context, analysis_low_loss)
+    memo_low = AnalysisMemo([["B", "C3"]], 19, context, analysis_low_loss, analyzer, prev_analysis=prev_analysis)
+    await provider.provide_facts(collector_low, context, analysis_low_loss, memo_low)
     
     print(f"Facts found (Test 2): {len(collector_low.facts)}")
     for f in collector_low.facts: